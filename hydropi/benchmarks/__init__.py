@@ -0,0 +1,12 @@
+"""Benchmarks for runtime hot paths.
+
+Run scenarios against the simulated plant (requires DEVMODE) and a fake DB:
+
+    python -m hydropi.benchmarks --output results.json
+    python -m hydropi.benchmarks --baseline results.json --scenario 'analog.*'
+
+Exits non-zero if any scenario has regressed against the baseline.
+"""
+
+from .runner import run, compare, load, save
+from .scenarios import SCENARIOS, scenario
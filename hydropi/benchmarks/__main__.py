@@ -0,0 +1,117 @@
+"""Run benchmarks from the command line."""
+
+import sys
+import json
+import logging
+from argparse import ArgumentParser
+
+from . import runner
+
+logger = logging.getLogger('hydropi')
+
+
+def get_args():
+    """Parse command line arguments."""
+    ap = ArgumentParser(description="Benchmark hydropi runtime hot paths.")
+    ap.add_argument(
+        '--scenario',
+        dest='patterns',
+        action='append',
+        help="Glob pattern of scenarios to run (may be repeated)",
+    )
+    ap.add_argument(
+        '--list',
+        action='store_true',
+        help="List scenarios and exit",
+    )
+    ap.add_argument(
+        '--repeat',
+        type=int,
+        default=runner.DEFAULT_REPEAT,
+        help="Timing repeats per scenario",
+    )
+    ap.add_argument(
+        '--min-seconds',
+        type=float,
+        default=runner.DEFAULT_MIN_SECONDS,
+        help="Minimum duration of each timing repeat",
+    )
+    ap.add_argument(
+        '--db-latency',
+        type=float,
+        default=0,
+        help="Simulated round trip per database query (seconds)",
+    )
+    ap.add_argument(
+        '--output',
+        help="Write results to this JSON file (default: stdout)",
+    )
+    ap.add_argument(
+        '--baseline',
+        help="Compare against results in this JSON file",
+    )
+    ap.add_argument(
+        '--tolerance',
+        type=float,
+        default=runner.DEFAULT_TOLERANCE,
+        help="Fraction slower than baseline to flag as a regression",
+    )
+    ap.add_argument(
+        '--verbose',
+        action='store_true',
+        help="Show log output from scenarios",
+    )
+    return ap.parse_args()
+
+
+def quiet_console():
+    """Raise console log level so that scenario output doesn't flood it."""
+    for handler in logger.handlers:
+        if handler.name == 'console':
+            handler.setLevel(logging.ERROR)
+
+
+def main():
+    """Run benchmarks, report and compare to baseline."""
+    args = get_args()
+    if args.list:
+        for name in runner.select(args.patterns):
+            print(name)
+        return 0
+    if not args.verbose:
+        quiet_console()
+
+    results = runner.run(
+        args.patterns,
+        repeat=args.repeat,
+        min_seconds=args.min_seconds,
+        db_latency=args.db_latency)
+
+    if args.output:
+        runner.save(results, args.output)
+    else:
+        print(json.dumps(results, indent=2))
+
+    for name, r in results['results'].items():
+        print(
+            f"{name:<28} {r['median_s'] * 1000:>10.3f} ms"
+            f" {r['ops_per_second']:>10.1f} ops/s"
+            f" {r['db_queries']:>6.1f} queries",
+            file=sys.stderr)
+
+    if args.baseline:
+        regressed = False
+        for c in runner.compare(
+                results, runner.load(args.baseline), args.tolerance):
+            flag = 'REGRESSED' if c['regressed'] else 'ok'
+            print(
+                f"{c['name']:<28} {c['ratio']:>6.2f}x baseline  {flag}",
+                file=sys.stderr)
+            regressed = regressed or c['regressed']
+        if regressed:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Run benchmark scenarios and compare results against a baseline.
+
+Results are a JSON-serializable dict:
+
+    {
+        "meta": {"timestamp": ..., "python": ..., "machine": ..., ...},
+        "results": {
+            "<scenario>": {
+                "number": ...,          # Calls per repeat
+                "repeat": ...,
+                "min_s": ...,           # Seconds per call
+                "median_s": ...,
+                "mean_s": ...,
+                "stdev_s": ...,
+                "ops_per_second": ...,  # From median
+                "db_queries": ...,      # Fake DB queries per call
+            },
+        },
+    }
+"""
+
+import json
+import random
+import fnmatch
+import logging
+import platform
+import statistics
+import timeit
+from datetime import datetime
+
+from hydropi.fakes import backends
+from .scenarios import SCENARIOS
+
+logger = logging.getLogger('hydropi')
+
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_SECONDS = 0.2
+DEFAULT_TOLERANCE = 0.25
+RANDOM_SEED = 0
+
+
+def select(patterns=None):
+    """Return scenario names matching any of the given glob patterns."""
+    if not patterns:
+        return list(SCENARIOS)
+    return [
+        name for name in SCENARIOS
+        if any(fnmatch.fnmatch(name, p) for p in patterns)
+    ]
+
+
+def run_scenario(name, repeat=DEFAULT_REPEAT, min_seconds=DEFAULT_MIN_SECONDS,
+                 db_latency=0):
+    """Time a single scenario and return its result."""
+    random.seed(RANDOM_SEED)
+    with backends(db_latency=db_latency) as db:
+        operation = SCENARIOS[name]()
+        operation()  # Warm up caches and lazy setup
+        timer = timeit.Timer(operation)
+        number, elapsed = timer.autorange()
+        while elapsed < min_seconds:
+            number *= 2
+            elapsed = timer.timeit(number)
+        queries = db.queries
+        times = [t / number for t in timer.repeat(repeat, number)]
+        db_queries = (db.queries - queries) / (repeat * number)
+
+    median = statistics.median(times)
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min_s': min(times),
+        'median_s': median,
+        'mean_s': statistics.mean(times),
+        'stdev_s': statistics.stdev(times) if repeat > 1 else 0,
+        'ops_per_second': 1 / median if median else None,
+        'db_queries': db_queries,
+    }
+
+
+def run(patterns=None, repeat=DEFAULT_REPEAT,
+        min_seconds=DEFAULT_MIN_SECONDS, db_latency=0):
+    """Run matching scenarios and return results."""
+    results = {}
+    for name in select(patterns):
+        logger.info(f"Benchmark: {name}")
+        results[name] = run_scenario(
+            name,
+            repeat=repeat,
+            min_seconds=min_seconds,
+            db_latency=db_latency)
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'node': platform.node(),
+            'repeat': repeat,
+            'db_latency_s': db_latency,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare best time per call against a baseline.
+
+    The minimum of the repeats is compared, as it is least affected by other
+    load on the machine.
+
+    Return a list of comparisons for scenarios present in both, flagged as
+    regressed where more than <tolerance> (fraction) slower than baseline.
+    """
+    comparisons = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base or not base['min_s']:
+            continue
+        ratio = result['min_s'] / base['min_s']
+        comparisons.append({
+            'name': name,
+            'baseline_s': base['min_s'],
+            'current_s': result['min_s'],
+            'ratio': ratio,
+            'regressed': ratio > 1 + tolerance,
+        })
+    return comparisons
+
+
+def load(path):
+    """Load results from JSON file."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(results, path):
+    """Write results to JSON file."""
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
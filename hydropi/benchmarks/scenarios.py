@@ -0,0 +1,109 @@
+"""Benchmark scenarios for runtime hot paths.
+
+Each scenario is a setup function registered with @scenario. Setup runs once
+with fake backends installed and returns a callable, which is the operation
+that gets timed.
+"""
+
+import time
+import http.client
+from threading import Thread
+from socket import socket
+
+from hydropi.config import config
+from hydropi.config.main import DB_CONFIG_KEYS
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register a benchmark setup function."""
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+@scenario('config.yml_key')
+def config_yml_key():
+    """Read a config key from config.yml."""
+    key = next(k for k in config.yml if k not in DB_CONFIG_KEYS)
+    return lambda: getattr(config, key)
+
+
+@scenario('config.db_key')
+def config_db_key():
+    """Read a live config key from the database."""
+    key = sorted(k for k in DB_CONFIG_KEYS if k in config.yml)[0]
+    return lambda: getattr(config, key)
+
+
+def analog_read(n):
+    """Return setup for reading the pH sensor with <n> samples."""
+    def setup():
+        from hydropi.interfaces.sensors import PHSensor
+        sensor = PHSensor()
+        return lambda: sensor.read(n=n)
+    return setup
+
+
+for n in (5, 25, 200):
+    scenario(f'analog.read_n{n}')(analog_read(n))
+
+
+@scenario('depth.read')
+def depth_read():
+    """Read reservoir volume from the depth sensor."""
+    from hydropi.interfaces.sensors import DepthSensor
+    sensor = DepthSensor()
+    return sensor.read
+
+
+@scenario('process.sweep_and_restore')
+def sweep_and_restore():
+    """Check and balance all parameters once."""
+    from hydropi.process.maintenance import sweep_and_restore
+    return sweep_and_restore
+
+
+@scenario('server.get_status')
+def get_status():
+    """Build the status response for the web app."""
+    from hydropi.server.handlers.generic import get_status
+    return get_status
+
+
+@scenario('server.http_request')
+def http_request():
+    """Request status from the local HTTP daemon."""
+    from hydropi.server.http import server
+
+    # Find a free port for the daemon
+    with socket() as sock:
+        sock.bind((server.HOST, 0))
+        port = sock.getsockname()[1]
+    Thread(
+        target=server.listen,
+        kwargs={'port': port},
+        name='benchmark-http',
+        daemon=True,
+    ).start()
+
+    def request():
+        connection = http.client.HTTPConnection(server.HOST, port, timeout=10)
+        try:
+            connection.request('GET', '/')
+            response = connection.getresponse()
+            response.read()
+            assert response.status == 200, f"HTTP {response.status}"
+        finally:
+            connection.close()
+
+    # Wait for the daemon to start listening
+    for i in range(50):
+        try:
+            request()
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.1)
+    return request
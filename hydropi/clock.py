@@ -0,0 +1,173 @@
+"""Injectable clock for all process and controller timing.
+
+Process and controller code calls clock.sleep(), clock.now() etc. instead of
+the time and datetime modules directly. By default these pass straight
+through to the system clock. For simulation, install a VirtualClock:
+
+    from hydropi import clock
+    clock.set_clock(clock.VirtualClock())
+
+Virtual time is discrete-event: it only moves forward when every thread
+using the clock is asleep, and then jumps straight to the earliest wake-up.
+A simulated week of misting and sweeps then runs as fast as the code between
+sleeps allows.
+"""
+
+import time as systime
+import threading
+from datetime import datetime
+
+
+class Clock:
+    """System wall clock."""
+
+    def timestamp(self):
+        """Return seconds since the epoch."""
+        return systime.time()
+
+    def monotonic(self):
+        """Return seconds from a clock that never goes backwards."""
+        return systime.monotonic()
+
+    def now(self):
+        """Return current local datetime."""
+        return datetime.now()
+
+    def sleep(self, seconds):
+        """Sleep for <seconds>."""
+        systime.sleep(seconds)
+
+    def wait_for(self, condition, predicate, timeout=None):
+        """Wait on a held threading.Condition until predicate() is true.
+
+        Return the last value of predicate().
+        """
+        return condition.wait_for(predicate, timeout=timeout)
+
+
+class VirtualClock(Clock):
+    """Discrete-event clock for accelerated simulation.
+
+    Every running thread takes part in the simulation, and time advances to
+    the earliest wake-up only when all of them are asleep. A thread that has
+    been busy for more than STALL_SECONDS of real time (e.g. blocked on a
+    queue, a real lock or a network request) is assumed to be waiting on
+    something outside the simulation, and time is allowed to advance without
+    it.
+
+    Condition waits (see wait_for) sleep for the full timeout in virtual
+    time, so state changes made by other threads are seen on wake-up rather
+    than immediately.
+    """
+
+    STALL_SECONDS = 0.5
+    POLL_SECONDS = 0.01
+
+    def __init__(self, start=None):
+        """Create clock starting at <start> (a datetime, default now)."""
+        start = start or datetime.now()
+        self.epoch = start.timestamp()
+        self.elapsed = 0.0
+        self.condition = threading.Condition()
+        self.sleepers = {}
+        self.active_since = {}
+
+    def timestamp(self):
+        """Return virtual seconds since the epoch."""
+        return self.epoch + self.elapsed
+
+    def monotonic(self):
+        """Return virtual seconds since the clock was created."""
+        return self.elapsed
+
+    def now(self):
+        """Return virtual local datetime."""
+        return datetime.fromtimestamp(self.timestamp())
+
+    def sleep(self, seconds):
+        """Sleep for <seconds> of virtual time."""
+        thread = threading.current_thread()
+        with self.condition:
+            wake = self.elapsed + max(seconds or 0, 0)
+            self.sleepers[thread] = wake
+            self._advance()
+            while self.elapsed < wake:
+                self.condition.wait(timeout=self.POLL_SECONDS)
+                self._advance()
+            del self.sleepers[thread]
+            self.active_since[thread] = systime.monotonic()
+
+    def wait_for(self, condition, predicate, timeout=None):
+        """Sleep in virtual time, then return predicate()."""
+        result = predicate()
+        if result or timeout is None:
+            # Indefinite waits can't be simulated - wait in real time
+            return result or condition.wait_for(predicate)
+        condition.release()
+        try:
+            self.sleep(timeout)
+        finally:
+            condition.acquire()
+        return predicate()
+
+    def _advance(self):
+        """Move time to the earliest wake-up if no thread is busy."""
+        real = systime.monotonic()
+        alive = threading.enumerate()
+        for thread in list(self.active_since):
+            if thread not in alive:
+                del self.active_since[thread]
+        busy = False
+        for thread in alive:
+            if thread in self.sleepers:
+                continue
+            if thread not in self.active_since:
+                # New thread - give it time to reach its first sleep
+                self.active_since[thread] = real
+            if real - self.active_since[thread] < self.STALL_SECONDS:
+                busy = True
+        if busy or not self.sleepers:
+            return
+        wake = min(self.sleepers.values())
+        if wake > self.elapsed:
+            self.elapsed = wake
+        self.condition.notify_all()
+
+
+_clock = Clock()
+
+
+def get_clock():
+    """Return the installed clock."""
+    return _clock
+
+
+def set_clock(clock):
+    """Install a clock for all hydropi timing."""
+    global _clock
+    _clock = clock
+
+
+def timestamp():
+    """Return seconds since the epoch."""
+    return _clock.timestamp()
+
+
+def monotonic():
+    """Return seconds from a clock that never goes backwards."""
+    return _clock.monotonic()
+
+
+def now():
+    """Return current local datetime."""
+    return _clock.now()
+
+
+def sleep(seconds):
+    """Sleep for <seconds>."""
+    _clock.sleep(seconds)
+
+
+def wait_for(condition, predicate, timeout=None):
+    """Wait on a held threading.Condition until predicate() is true."""
+    return _clock.wait_for(condition, predicate, timeout=timeout)
@@ -0,0 +1,266 @@
+"""Partitioned datalog storage with hourly rollups and retention.
+
+The datalog table is partitioned by month on its datetime column, with one
+partition per month named <table>_pYYYYMM. Partitions for the current and
+next month are created ahead of time, so inserts always have a home.
+
+Once a whole month is older than DATALOG_ROLLUP_AFTER_DAYS, its raw rows are
+averaged per hour into <table>_hourly (also partitioned by month) and the raw
+partition is dropped. Hourly partitions older than DATALOG_RETENTION_MONTHS
+are dropped in turn. Dropping partitions rather than deleting rows keeps
+vacuum and backups cheap on an SD card, and bounds storage size.
+
+An existing unpartitioned datalog table is converted in place on first run.
+"""
+
+import re
+import logging
+from datetime import datetime, timedelta
+
+from hydropi import clock
+
+logger = logging.getLogger('hydropi')
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+NUMERIC_TYPES = (
+    'smallint', 'integer', 'bigint', 'real', 'double precision', 'numeric')
+
+
+def month_start(dt, months=0):
+    """Return the first of the month of <dt>, offset by <months>."""
+    index = dt.year * 12 + dt.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    """Return name of the <table> partition for <month>."""
+    return f'{table}_p{month:%Y%m}'
+
+
+def partition_month(name):
+    """Return the month of a partition from its name, or None."""
+    match = PARTITION_SUFFIX.search(name)
+    if match:
+        return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+class DatalogStore:
+    """Maintain datalog partitions, rollups and retention."""
+
+    def __init__(self, db, rollup_after_days=31, retention_months=24):
+        """Create store for the datalog table of <db>."""
+        self.db = db
+        self.table = db.DATALOG_TABLE_NAME
+        self.hourly = f'{self.table}_hourly'
+        self.rollup_after_days = rollup_after_days
+        self.retention_months = retention_months
+
+    def _select(self, cursor, query, params=()):
+        """Execute <query> on <cursor> and return all rows."""
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def _transaction(self, work, *args):
+        """Run <work>(cursor, *args) in a single transaction."""
+        connection = self.db.connection
+        cursor = connection.cursor()
+        try:
+            result = work(cursor, *args)
+            connection.commit()
+            return result
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def maintain(self, now=None):
+        """Create upcoming partitions, compact old months and drop expired.
+
+        Each step is its own transaction.
+        """
+        now = now or clock.now()
+        self._transaction(self._partition, now)
+        compacted = self._transaction(self._compact, now)
+        dropped = self._transaction(self._enforce_retention, now)
+        if compacted or dropped:
+            logger.info(
+                f"Datalog maintenance: compacted {compacted},"
+                f" dropped {dropped}")
+        return compacted, dropped
+
+    # Steps
+    # -------------------------------------------------------------------------
+
+    def _partition(self, cursor, now):
+        """Convert datalog to a partitioned table and add partitions."""
+        if not self._is_partitioned(cursor, self.table):
+            self._convert(cursor, now)
+        if not self._is_partitioned(cursor, self.hourly):
+            self._create_hourly(cursor)
+        for months in (0, 1):
+            month = month_start(now, months)
+            self._create_partition(cursor, self.table, month)
+            self._create_partition(cursor, self.hourly, month)
+
+    def _compact(self, cursor, now):
+        """Roll up and drop raw partitions older than the rollup age.
+
+        Return names of compacted partitions.
+        """
+        from psycopg2 import sql
+        cutoff = now - timedelta(days=self.rollup_after_days)
+        columns = self._numeric_columns(cursor)
+        compacted = []
+        for name, month in self._partitions(cursor, self.table):
+            if month_start(month, 1) > cutoff:
+                continue
+            self._create_partition(cursor, self.hourly, month)
+            cursor.execute(sql.SQL(
+                """
+                INSERT INTO {hourly} (datetime, samples, {columns})
+                SELECT date_trunc('hour', datetime), count(*), {averages}
+                FROM {partition}
+                GROUP BY 1
+                ON CONFLICT (datetime) DO NOTHING
+                """
+            ).format(
+                hourly=sql.Identifier(self.hourly),
+                partition=sql.Identifier(name),
+                columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+                averages=sql.SQL(', ').join(
+                    sql.SQL('avg({})').format(sql.Identifier(c))
+                    for c in columns),
+            ))
+            cursor.execute(sql.SQL("DROP TABLE {}").format(
+                sql.Identifier(name)))
+            compacted.append(name)
+        return compacted
+
+    def _enforce_retention(self, cursor, now):
+        """Drop partitions older than the retention period.
+
+        Return names of dropped partitions.
+        """
+        from psycopg2 import sql
+        cutoff = month_start(now, -self.retention_months)
+        dropped = []
+        for table in (self.hourly, self.table):
+            for name, month in self._partitions(cursor, table):
+                if month < cutoff:
+                    cursor.execute(sql.SQL("DROP TABLE {}").format(
+                        sql.Identifier(name)))
+                    dropped.append(name)
+        return dropped
+
+    # Schema
+    # -------------------------------------------------------------------------
+
+    def _is_partitioned(self, cursor, table):
+        """Return True if <table> exists as a partitioned table."""
+        rows = self._select(
+            cursor,
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+            (table,))
+        return bool(rows) and rows[0][0] == 'p'
+
+    def _numeric_columns(self, cursor):
+        """Return names of the numeric reading columns of the datalog."""
+        rows = self._select(
+            cursor,
+            """
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_name = %s
+            ORDER BY ordinal_position
+            """,
+            (self.table,))
+        return [
+            name for name, data_type in rows
+            if data_type in NUMERIC_TYPES and name != 'id'
+        ]
+
+    def _partitions(self, cursor, table):
+        """Return (name, month) of each partition of <table>, oldest first."""
+        rows = self._select(
+            cursor,
+            """
+            SELECT c.relname
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            """,
+            (table,))
+        partitions = [(name, partition_month(name)) for name, in rows]
+        return sorted(
+            (p for p in partitions if p[1] is not None),
+            key=lambda p: p[1])
+
+    def _create_partition(self, cursor, table, month):
+        """Create the monthly partition of <table> if it doesn't exist."""
+        from psycopg2 import sql
+        cursor.execute(sql.SQL(
+            """
+            CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table}
+            FOR VALUES FROM (%s) TO (%s)
+            """
+        ).format(
+            partition=sql.Identifier(partition_name(table, month)),
+            table=sql.Identifier(table),
+        ), (month, month_start(month, 1)))
+
+    def _create_hourly(self, cursor):
+        """Create the partitioned hourly rollup table."""
+        from psycopg2 import sql
+        columns = self._numeric_columns(cursor)
+        cursor.execute(sql.SQL(
+            """
+            CREATE TABLE {hourly} (
+                datetime TIMESTAMP WITH TIME ZONE NOT NULL,
+                samples INTEGER NOT NULL,
+                {columns},
+                UNIQUE (datetime)
+            ) PARTITION BY RANGE (datetime)
+            """
+        ).format(
+            hourly=sql.Identifier(self.hourly),
+            columns=sql.SQL(', ').join(
+                sql.SQL('{} DOUBLE PRECISION').format(sql.Identifier(c))
+                for c in columns),
+        ))
+        logger.info(f"Created hourly datalog rollup table {self.hourly}")
+
+    def _convert(self, cursor, now):
+        """Convert an unpartitioned datalog table to monthly partitions.
+
+        Rows are copied into the new table, and the id sequence is moved to
+        it before the old table is dropped.
+        """
+        from psycopg2 import sql
+        old = f'{self.table}_unpartitioned'
+        table, old_table = sql.Identifier(self.table), sql.Identifier(old)
+        logger.warning(
+            f"Converting datalog table {self.table} to monthly partitions")
+        cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+            table, old_table))
+        cursor.execute(sql.SQL(
+            """
+            CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS)
+            PARTITION BY RANGE (datetime)
+            """
+        ).format(table, old_table))
+        first, last = self._select(cursor, sql.SQL(
+            "SELECT min(datetime), max(datetime) FROM {}"
+        ).format(old_table))[0]
+        month = month_start(first or now)
+        while month <= month_start(last or now):
+            self._create_partition(cursor, self.table, month)
+            month = month_start(month, 1)
+        cursor.execute(sql.SQL("INSERT INTO {} SELECT * FROM {}").format(
+            table, old_table))
+        sequence, = self._select(
+            cursor, "SELECT pg_get_serial_sequence(%s, 'id')", (old,))[0]
+        if sequence:
+            cursor.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.id").format(
+                sql.SQL(sequence), table))
+        cursor.execute(sql.SQL("DROP TABLE {}").format(old_table))
+        cursor.execute(sql.SQL("CREATE INDEX ON {} (datetime)").format(table))
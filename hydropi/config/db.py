@@ -1,8 +1,16 @@
-"""Manage optional database interface for dynamic app configuration."""
+"""Manage optional database interface for dynamic app configuration.
 
+Config and datalog queries run as server-side prepared statements: each is
+planned once per connection (on first use) and executed with bound
+parameters, so values are never interpolated into SQL. Table and field names
+from config.yml are quoted as identifiers.
+"""
+
+import time
 import logging
-import psycopg2
-from datetime import datetime
+
+from hydropi import clock
+from hydropi.instrument import metrics
 
 logger = logging.getLogger('hydropi')
 
@@ -25,6 +33,7 @@ class DB:
 
     def __init__(self, config, assert_schema=True):
         """Initiate database connection."""
+        import psycopg2  # Deferred: slow to import and only needed here
         self.connection = psycopg2.connect(
             dbname=config.DATABASE['PG_DBNAME'],
             user=config.DATABASE['PG_USER'],
@@ -36,24 +45,33 @@ class DB:
         self.CONFIG_KEY_FIELD = config.DATABASE['CONFIG_KEY_FIELD']
         self.CONFIG_VALUE_FIELD = config.DATABASE['CONFIG_VALUE_FIELD']
         self.CONFIG_TYPE_FIELD = config.DATABASE['CONFIG_TYPE_FIELD']
+        self.METRICS_TABLE_NAME = config.DATABASE.get('METRICS_TABLE_NAME')
         self.config = config
+        self._prepared = set()
+        self._datalog_statements = {}
         if assert_schema:
             self._assert_schema()
+        if self.METRICS_TABLE_NAME:
+            self.execute(self.sql_create_metrics_table())
 
     # SQL Execution
     # -------------------------------------------------------------------------
 
     def execute(self, sql):
         """Execute SQL and log SQL statement if error."""
+        started = time.perf_counter()
         try:
             cursor = self.connection.cursor()
             cursor.execute(sql)
             self.connection.commit()
         except Exception as exc:
+            metrics.DB_WRITE_ERRORS.labels().inc()
             logger.error(f'SQL: {sql}')
             raise exc
         finally:
             cursor.close()
+            metrics.DB_WRITE_SECONDS.labels().observe(
+                time.perf_counter() - started)
 
     def select(self, sql):
         """Perform a SQL select and return the data."""
@@ -69,17 +87,74 @@ class DB:
 
         return data
 
+    def run(self, name, params=(), fetch=False):
+        """Execute prepared statement <name> with bound <params>.
+
+        Return fetched rows if <fetch>, otherwise commit.
+        """
+        started = time.perf_counter()
+        cursor = self.connection.cursor()
+        try:
+            self._execute(cursor, name, params)
+            if fetch:
+                return cursor.fetchall()
+            self.connection.commit()
+        except Exception as exc:
+            self._reset_prepared()
+            if not fetch:
+                metrics.DB_WRITE_ERRORS.labels().inc()
+            logger.error(f"SQL: {name} {params}")
+            raise exc
+        finally:
+            cursor.close()
+            if not fetch:
+                metrics.DB_WRITE_SECONDS.labels().observe(
+                    time.perf_counter() - started)
+
+    def _execute(self, cursor, name, params=(), many=False):
+        """Prepare statement <name> if required and execute on <cursor>.
+
+        With <many>, <params> is a sequence of parameter tuples.
+        """
+        from psycopg2 import sql
+        if name not in self._prepared:
+            cursor.execute(
+                sql.SQL("PREPARE {} AS ").format(sql.Identifier(name))
+                + self._statement(name))
+            self._prepared.add(name)
+        n = len(params[0] if many else params) if params else 0
+        execute = sql.SQL("EXECUTE {}").format(sql.Identifier(name))
+        if n:
+            execute += sql.SQL(" ({})").format(
+                sql.SQL(', ').join(sql.Placeholder() * n))
+        if many:
+            cursor.executemany(execute, params)
+        else:
+            cursor.execute(execute, params)
+
+    def _reset_prepared(self):
+        """Roll back and deallocate prepared statements after an error."""
+        self.connection.rollback()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("DEALLOCATE ALL")
+            self.connection.commit()
+            cursor.close()
+        except Exception as exc:
+            logger.error(f"DB: failed to deallocate statements: {exc}")
+            self.connection.rollback()
+        self._prepared.clear()
+
     # Queries
     # -------------------------------------------------------------------------
 
     def keys(self):
         """Return list of keys in config table."""
-        keys = self.select(self.sql_get_config_keys())
-        return [x[0] for x in keys]
+        return [x[0] for x in self.run('config_keys', fetch=True)]
 
     def get(self, key):
         """Return value for given field."""
-        r = self.select(self.sql_get_key(key))
+        r = self.run('config_get', (key,), fetch=True)
         if r:
             v, type_str = r[0]
             return TYPECAST[type_str](v)
@@ -89,40 +164,123 @@ class DB:
         if value == '' or value is None:
             raise ValueError(
                 f"config.set received empty config value: {value}")
-        if self.get(key) is None:
-            sql = self.sql_add_key(key, value)
-            logger.info("SQL ADD KEY:\n" + sql)
-        else:
-            # Assert that value can be cast to field type
-            type_str = self.select(self.sql_get_key(key))[0][1]
-            try:
-                TYPECAST[type_str](value)
-            except ValueError as exc:
-                logger.error(
-                    'Failed to cast type while setting config value:'
-                    f' key={key}; value={value}; type={type_str}')
-                raise exc
-            sql = self.sql_set_key(key, value)
-            logger.info("SQL SET KEY:\n" + sql)
-        self.execute(sql)
+        r = self.run('config_get', (key,), fetch=True)
+        if not r:
+            logger.info(f"Add config key: {key} = {value}")
+            self.run('config_add', (key, *self.get_param_value_type(value)))
+            return
+        # Assert that value can be cast to field type
+        type_str = r[0][1]
+        try:
+            param, type_str = self.get_param_value_type(value, type_str)
+        except ValueError as exc:
+            logger.error(
+                'Failed to cast type while setting config value:'
+                f' key={key}; value={value}; type={type_str}')
+            raise exc
+        logger.info(f"Set config key: {key} = {param}")
+        self.run('config_set', (key, param, type_str))
 
     def rm(self, key):
         """Remove a config key from the database."""
-        self.execute(self.sql_rm_key(key))
+        self.run('config_rm', (key,))
+
+    def sync(self, data):
+        """Add absent keys and remove redundant keys in one transaction.
+
+        Keys of <data> define the schema, and values are written only for
+        keys absent from the table. Return (added, removed) key lists.
+        """
+        started = time.perf_counter()
+        cursor = self.connection.cursor()
+        try:
+            self._execute(cursor, 'config_keys')
+            db_keys = {row[0] for row in cursor.fetchall()}
+            added = sorted(set(data) - db_keys)
+            removed = sorted(db_keys - set(data))
+            rows = []
+            for key in added:
+                value = data[key]
+                if value == '' or value is None:
+                    raise ValueError(
+                        f"config.sync received empty config value for {key}")
+                rows.append((key, *self.get_param_value_type(value)))
+            if rows:
+                self._execute(cursor, 'config_add', rows, many=True)
+            if removed:
+                self._execute(
+                    cursor, 'config_rm', [(k,) for k in removed], many=True)
+            self.connection.commit()
+        except Exception as exc:
+            self._reset_prepared()
+            metrics.DB_WRITE_ERRORS.labels().inc()
+            logger.error(f"DB.sync: failed to sync config table: {exc}")
+            raise exc
+        finally:
+            cursor.close()
+            metrics.DB_WRITE_SECONDS.labels().observe(
+                time.perf_counter() - started)
+        if added:
+            logger.info(f"Config keys added to database: {added}")
+        if removed:
+            logger.info(f"Config keys removed from database: {removed}")
+        return added, removed
 
     def table_exists(self, name):
         """Return True if table exists in DB."""
         return name in self.sql_get_tables()
 
     def log_data(self, data):
-        """Write current readings to the database."""
-        dt = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f') + "+10"
+        """Write current readings to the database.
+
+        Return the datetime string of the new row, or None on failure.
+        """
+        dt = clock.now().strftime('%Y-%m-%d %H:%M:%S.%f') + "+10"
         data['datetime'] = dt
         try:
-            self.execute(self.sql_write_datalog(data))
+            name = self._datalog_statement(tuple(data))
+            self.run(name, tuple(data.values()))
         except Exception as exc:
             logger.error(
                 f"DB.log_data: exception writing to database:\n{exc}")
+            return
+        return dt
+
+    def get_data(self, since=None, limit=1000):
+        """Return up to <limit> datalog rows after <since>, oldest first.
+
+        Rows are dicts with datetime as an ISO 8601 string.
+        """
+        rows = self.run(
+            'datalog_since', (since or '-infinity', limit), fetch=True)
+        return [row for row, in rows]
+
+    def log_metrics(self, dt, rows):
+        """Write span timings for the datalog row at <dt>.
+
+        Does nothing unless DATABASE.METRICS_TABLE_NAME is configured.
+        """
+        if not self.METRICS_TABLE_NAME or not rows:
+            return
+        params = [
+            (dt, r['name'], r['calls'], r['wall_ms'], r['samples'],
+             r['bus_wait_ms'], r['retries'])
+            for r in rows
+        ]
+        started = time.perf_counter()
+        cursor = self.connection.cursor()
+        try:
+            self._execute(cursor, 'metrics_insert', params, many=True)
+            self.connection.commit()
+        except Exception as exc:
+            self._reset_prepared()
+            metrics.DB_WRITE_ERRORS.labels().inc()
+            logger.error(
+                f"DB.log_metrics: exception writing to database:\n{exc}")
+        finally:
+            cursor.close()
+            metrics.DB_WRITE_SECONDS.labels().observe(
+                time.perf_counter() - started)
 
     # Assertions
     # -------------------------------------------------------------------------
@@ -156,110 +314,91 @@ class DB:
     # SQL generation
     # -------------------------------------------------------------------------
 
-    def get_sql_value_type(self, key, value):
-        """Return value SQL string and type."""
-        type_str = self.get_key_type(key) or type(value).__name__
+    def get_param_value_type(self, value, type_str=None):
+        """Return value as a query parameter and its type string.
+
+        Raise ValueError if <value> can't be cast to <type_str>, which
+        defaults to the type of <value>.
+        """
+        type_str = type_str or type(value).__name__
         assert type_str in TYPECAST, (
             "Config value type not recognised.\n"
-            f"{key}: {type_str}")
-        if type_str == 'str':
-            value = f"'{value}'"
+            f"{value}: {type_str}")
         if type_str == 'bool':
             if str(value).lower() in ('true', '1'):
-                value = 1
-            else:
-                value = 0
-        if type_str == 'int':
-            value = int(value)
-        if type_str == 'float':
-            value = float(value)
-        return value, type_str
-
-    def get_key_type(self, key):
-        """Return type of config key from database."""
-        r = self.select(self.sql_get_key(key))
-        if r:
-            v, type_str = r[0]
-            return type_str
-
-    def sql_add_key(self, key, value):
-        """Generate SQL to add a new config key: value pair."""
-        value, value_type = self.get_sql_value_type(key, value)
+                return '1', type_str
+            return '0', type_str
+        return str(TYPECAST[type_str](value)), type_str
+
+    def _datalog_statement(self, columns):
+        """Return name of the datalog insert statement for <columns>."""
+        if columns not in self._datalog_statements:
+            self._datalog_statements[columns] = (
+                f'datalog_insert_{len(self._datalog_statements)}')
+        return self._datalog_statements[columns]
+
+    def _statement(self, name):
+        """Return SQL to prepare for statement <name>.
+
+        Parameters are positional ($1, $2...) and their types are inferred
+        from the target columns.
+        """
+        from psycopg2 import sql
+        fields = {
+            'table': sql.Identifier(self.CONFIG_TABLE_NAME),
+            'key': sql.Identifier(self.CONFIG_KEY_FIELD),
+            'value': sql.Identifier(self.CONFIG_VALUE_FIELD),
+            'type': sql.Identifier(self.CONFIG_TYPE_FIELD),
+        }
+        statements = {
+            'config_keys': "SELECT {key} FROM {table}",
+            'config_get': (
+                "SELECT {value}, {type} FROM {table} WHERE {key} = $1"),
+            'config_add': (
+                "INSERT INTO {table} ({key}, {value}, {type})"
+                " VALUES ($1, $2, $3)"),
+            'config_set': (
+                "UPDATE {table} SET {value} = $2, {type} = $3"
+                " WHERE {key} = $1"),
+            'config_rm': "DELETE FROM {table} WHERE {key} = $1",
+        }
+        if name in statements:
+            return sql.SQL(statements[name]).format(**fields)
+        if name == 'metrics_insert':
+            return sql.SQL(
+                "INSERT INTO {} (datetime, span, calls, wall_ms, samples,"
+                " bus_wait_ms, retries) VALUES ($1, $2, $3, $4, $5, $6, $7)"
+            ).format(sql.Identifier(self.METRICS_TABLE_NAME))
+        if name == 'datalog_since':
+            return sql.SQL(
+                "SELECT row_to_json(t) FROM (SELECT * FROM {} WHERE datetime"
+                " > $1 ORDER BY datetime LIMIT $2) t"
+            ).format(sql.Identifier(self.DATALOG_TABLE_NAME))
+        for columns, statement_name in self._datalog_statements.items():
+            if statement_name == name:
+                return sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+                    sql.Identifier(self.DATALOG_TABLE_NAME),
+                    sql.SQL(', ').join(map(sql.Identifier, columns)),
+                    sql.SQL(', ').join(
+                        sql.SQL(f'${i + 1}') for i in range(len(columns))),
+                )
+        raise KeyError(f"No SQL statement named '{name}'")
+
+    def sql_create_metrics_table(self):
+        """Generate SQL to create the sweep metrics table if absent."""
         return (
             f"""
-            INSERT into {self.CONFIG_TABLE_NAME}
+            CREATE TABLE IF NOT EXISTS {self.METRICS_TABLE_NAME}
             (
-                {self.CONFIG_KEY_FIELD},
-                {self.CONFIG_VALUE_FIELD},
-                {self.CONFIG_TYPE_FIELD}
+                id SERIAL PRIMARY KEY,
+                datetime TIMESTAMP WITH TIME ZONE NOT NULL,
+                span VARCHAR(255) NOT NULL,
+                calls INTEGER,
+                wall_ms REAL,
+                samples INTEGER,
+                bus_wait_ms REAL,
+                retries INTEGER
             )
-            VALUES ('{key}', {value}, '{value_type}')
-            """
-        )
-
-    def sql_get_key(self, key):
-        """Generate SQL to fetch value for config key."""
-        return (
-            f"""
-            SELECT {self.CONFIG_VALUE_FIELD}, {self.CONFIG_TYPE_FIELD}
-            from {self.CONFIG_TABLE_NAME}
-            WHERE {self.CONFIG_KEY_FIELD} = '{key}'
-            """
-        )
-
-    def sql_set_key(self, key, value):
-        """Generate SQL to fetch value for config key."""
-        value, value_type = self.get_sql_value_type(key, value)
-        return (
-            f"""
-            UPDATE {self.CONFIG_TABLE_NAME}
-            SET {self.CONFIG_VALUE_FIELD} = {value},
-                {self.CONFIG_TYPE_FIELD} = '{value_type}'
-            WHERE {self.CONFIG_KEY_FIELD} = '{key}'
-            """
-        )
-
-    def sql_get_config_keys(self):
-        """Generate SQL to fetch keys from config table."""
-        return (
-            f"""
-            SELECT {self.CONFIG_KEY_FIELD}
-            FROM {self.CONFIG_TABLE_NAME}
-            """
-        )
-
-    def sql_rm_key(self, key):
-        """Remove config key entry."""
-        return (
-            f"""
-            DELETE
-            FROM {self.CONFIG_TABLE_NAME}
-            WHERE {self.CONFIG_KEY_FIELD} = '{key}'
-            """
-        )
-
-    def sql_write_datalog(self, data):
-        """Generate SQL to write row on datalog table."""
-        def get_sql_str(field):
-            """Return field (name, object) as SQL string."""
-            col, val = field
-            if col == 'datetime':
-                return f"'{val}'"
-            if val is None:
-                return "NULL"
-            return val
-
-        fields = data.items()
-        columns = [x[0] for x in fields]
-        values = [
-            get_sql_str(f) for f in fields
-        ]
-
-        return (
-            f"""
-            INSERT INTO {self.DATALOG_TABLE_NAME}
-            ({', '.join(columns)})
-            VALUES ({",".join([str(x) for x in values])})
             """
         )
 
@@ -0,0 +1,135 @@
+"""Structured event log written as compact JSON lines.
+
+Every log record is written as one JSON object per line to
+``<CONFIG_DIR>/hydro.events.jsonl``, which makes the log cheap to filter by
+level, module and time without regex parsing of the text log.
+
+High-frequency debug records (e.g. per-sample ADC reads) can be sampled per
+module with EVENT_LOG_SAMPLING in config.yml, where each value is the fraction
+of DEBUG records to keep for that module. INFO and above are always kept.
+
+Query the log from the command line:
+
+    $ python -m hydropi.config.logquery --module analog --since "2022-01-16"
+"""
+
+import os
+import json
+import copy
+import logging
+import logging.handlers
+from queue import Queue
+
+EVENT_LOG_FILENAME = 'hydro.events.jsonl'
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format log records as single-line JSON objects."""
+
+    def format(self, record):
+        """Return record as a compact JSON string."""
+        event = {
+            'ts': round(record.created, 3),
+            'lvl': record.levelname,
+            'mod': record.module,
+            'thr': record.threadName,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            event['exc'] = self.formatException(record.exc_info)
+        return json.dumps(event, separators=(',', ':'), default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fixed fraction of DEBUG records per module.
+
+    Sampling is deterministic - a rate of 0.1 keeps every tenth record - so
+    that a burst of samples is thinned evenly rather than randomly.
+    """
+
+    def __init__(self, rates=None):
+        """Create filter from a {module: rate} mapping."""
+        super().__init__()
+        self.every = {
+            module: max(1, round(1 / rate)) if rate else None
+            for module, rate in (rates or {}).items()
+        }
+        self.seen = {}
+
+    def filter(self, record):
+        """Return True if the record should be logged."""
+        if record.levelno > logging.DEBUG or record.module not in self.every:
+            return True
+        every = self.every[record.module]
+        if every is None:
+            return False
+        count = self.seen.get(record.module, 0)
+        self.seen[record.module] = count + 1
+        return count % every == 0
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records without formatting them on the calling thread.
+
+    The default QueueHandler merges the message and traceback before
+    enqueueing so that records can be pickled. Our queue never leaves the
+    process, so formatting is left to the listener thread.
+    """
+
+    def prepare(self, record):
+        """Return a shallow copy of the record for the queue."""
+        return copy.copy(record)
+
+
+def start_listener(handlers):
+    """Start a queue listener thread for the given handlers.
+
+    Return (queue_handler, listener). Attach the queue handler to a logger and
+    call listener.stop() on exit to flush pending records.
+    """
+    queue = Queue(-1)
+    listener = logging.handlers.QueueListener(
+        queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return DeferredQueueHandler(queue), listener
+
+
+def get_log_paths(log_dir):
+    """Return event log file paths from oldest to newest."""
+    path = os.path.join(log_dir, EVENT_LOG_FILENAME)
+    backups = []
+    i = 1
+    while os.path.exists(f'{path}.{i}'):
+        backups.append(f'{path}.{i}')
+        i += 1
+    backups.reverse()
+    if os.path.exists(path):
+        backups.append(path)
+    return backups
+
+
+def query(log_dir, level=None, module=None, since=None, until=None,
+          contains=None):
+    """Yield events from the event log that match all given filters."""
+    min_level = logging.getLevelName(level.upper()) if level else 0
+    since = since.timestamp() if since else None
+    until = until.timestamp() if until else None
+    for path in get_log_paths(log_dir):
+        with open(path) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Partial line from an interrupted write
+                    continue
+                if logging.getLevelName(event['lvl']) < min_level:
+                    continue
+                if module and event['mod'] != module:
+                    continue
+                if since and event['ts'] < since:
+                    continue
+                if until and event['ts'] > until:
+                    continue
+                if contains and contains not in event['msg']:
+                    continue
+                yield event
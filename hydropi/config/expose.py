@@ -67,6 +67,12 @@ EXPOSED_CONFIG = {
             'help': ('Volume of nutrient to deliver before mix and re-check'
                      ' (ml). 30ml per 10L tap water.'),
         },
+        {
+            'key': 'EC_MAX_DOSE_ML',
+            'type': 'number',
+            'help': ('Maximum volume of nutrient for a dose computed from'
+                     ' tank volume (ml)'),
+        },
     ),
     'ph': (
         {
@@ -85,6 +91,12 @@ EXPOSED_CONFIG = {
             'help': ('Volume of pH-down to deliver before mix and re-check'
                      ' (ml). 5ml per 10L tap water.'),
         },
+        {
+            'key': 'PH_MAX_DOSE_ML',
+            'type': 'number',
+            'help': ('Maximum volume of pH-down for a dose computed from'
+                     ' tank volume (ml)'),
+        },
     ),
     'mix': (
         {
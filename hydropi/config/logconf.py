@@ -1,9 +1,20 @@
 """Logging configuration."""
 
 import os
+import atexit
 import logging
 import logging.config
 
+from .eventlog import (
+    EVENT_LOG_FILENAME,
+    JsonLinesFormatter,
+    SamplingFilter,
+    start_listener,
+)
+
+# Handlers that write to disk are run from a queue listener thread
+QUEUED_HANDLERS = ('file', 'debug_file', 'events')
+
 
 def configure(config):
     """Configure app logger."""
@@ -23,6 +34,15 @@ def configure(config):
                 'datefmt': '%Y-%m-%d %H:%M:%S',
                 'style': "%",
             },
+            'jsonl': {
+                '()': JsonLinesFormatter,
+            },
+        },
+        'filters': {
+            'sampling': {
+                '()': SamplingFilter,
+                'rates': config.yml.get('EVENT_LOG_SAMPLING'),
+            },
         },
         'handlers': {
             'file': {
@@ -45,6 +65,18 @@ def configure(config):
                 'mode': 'a',
                 'formatter': 'standard',
             },
+            'events': {
+                'delay': True,
+                'level': 'DEBUG',
+                'class': 'logging.handlers.RotatingFileHandler',
+                'maxBytes': 1000000,
+                'backupCount': 5,
+                'filename': os.path.join(
+                    config.CONFIG_DIR, EVENT_LOG_FILENAME),
+                'mode': 'a',
+                'formatter': 'jsonl',
+                'filters': ['sampling'],
+            },
             'console': {
                 'class': 'logging.StreamHandler',
                 'level': console_log_level,
@@ -54,8 +86,17 @@ def configure(config):
         'loggers': {
             'hydropi': {
                 'level': 'DEBUG',
-                'handlers': ['console', 'file', 'debug_file'],
+                'handlers': ['console', *QUEUED_HANDLERS],
                 'propagate': True,
             },
         }
     })
+
+    # Move disk writes and formatting off the calling threads
+    logger = logging.getLogger('hydropi')
+    handlers = [h for h in logger.handlers if h.name in QUEUED_HANDLERS]
+    for h in handlers:
+        logger.removeHandler(h)
+    queue_handler, listener = start_listener(handlers)
+    logger.addHandler(queue_handler)
+    atexit.register(listener.stop)
@@ -0,0 +1,66 @@
+"""Query the structured event log from the command line.
+
+$ python -m hydropi.config.logquery --level warning --since "2022-01-16 08:00"
+"""
+
+from datetime import datetime
+from argparse import ArgumentParser
+
+from hydropi.config import config
+from .eventlog import query
+
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+
+
+def parse_datetime(value):
+    """Parse a datetime string from the command line."""
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(
+        f"Unrecognised datetime: {value}\n"
+        f"Expected one of: {', '.join(DATETIME_FORMATS)}")
+
+
+def get_args():
+    """Parse command line arguments."""
+    ap = ArgumentParser(description='Query the hydropi event log.')
+    ap.add_argument('--level', type=str, help="Minimum level e.g. INFO")
+    ap.add_argument('--module', type=str, help="Module name e.g. analog")
+    ap.add_argument('--since', type=parse_datetime, help="YYYY-MM-DD HH:MM")
+    ap.add_argument('--until', type=parse_datetime, help="YYYY-MM-DD HH:MM")
+    ap.add_argument('--contains', type=str, help="Message substring")
+    ap.add_argument(
+        '--count',
+        action='store_true',
+        help="Print the number of matching events only",
+    )
+    return ap.parse_args()
+
+
+def main():
+    """Print matching events from the event log."""
+    args = get_args()
+    events = query(
+        config.CONFIG_DIR,
+        level=args.level,
+        module=args.module,
+        since=args.since,
+        until=args.until,
+        contains=args.contains,
+    )
+    if args.count:
+        return print(sum(1 for _ in events))
+    for event in events:
+        dt = datetime.fromtimestamp(event['ts']).strftime('%Y-%m-%d %H:%M:%S')
+        print(
+            f"{event['lvl'][:4]} | {dt} | {event['mod']:<12}|"
+            f" {event['msg']}")
+        if event.get('exc'):
+            print(event['exc'])
+
+
+if __name__ == '__main__':
+    main()
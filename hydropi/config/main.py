@@ -11,11 +11,14 @@ These are default values that may be overwritten at runtime.
 Config is initialized from a config.yml file which must exist in the runtime
 directory. Optionally, this file contains a DATABASE section with connection
 parameters for a SQLite database. If exists, this connection will be tried
-automatically. If successful, config will be written to the DB (if it
-doesn't yet exist) and future calls for config attributes will be fetched from
-the database. This allows for 'live config', where the application can update
-config on-the-fly. Which is great for when users want to modify config through
-a web interface.
+on first use of config.db (i.e. the first live config lookup), so that
+importing config is cheap for processes that don't need it. If successful,
+config will be written to the DB (if it doesn't yet exist) and future calls
+for config attributes will be fetched from the database. This allows for
+'live config', where the application can update config on-the-fly. Which is
+great for when users want to modify config through a web interface. If the
+connection fails, config is read from config.yml and the connection is
+retried after DB_RETRY_SECONDS (e.g. if Postgres is still starting at boot).
 
 From here, config.yml is not redundant. It can be used to remove old keys from
 the database and set new ones (so that covers key renaming... although the
@@ -24,8 +27,10 @@ different, it should reflect the schema of the database table.
 """
 
 import os
+import time
 import yaml
 import logging
+import threading
 
 from .db import DB, SchemaError
 from .logconf import configure as configure_logger
@@ -42,7 +47,7 @@ DB_CONFIG_KEYS = {
 class Config:
     """Read in, store and update config."""
 
-    db = None
+    DB_RETRY_SECONDS = 300
 
     def __init__(self, fname):
         """Read in config from yaml."""
@@ -54,27 +59,63 @@ class Config:
                 'For an example see: https://github.com/neoformit/hydropi'
                 '/blob/main/config.yml.sample')
 
+        self._db_lock = threading.RLock()
+        self._db_failed_at = None
         self.yml = self.parse(fname)
         if not os.path.exists(self.TEMP_DIR):
             os.makedirs(self.TEMP_DIR)
         configure_logger(self)
 
-        if 'DATABASE' in self.yml:
+    def connect_db(self):
+        """Connect to the database and sync config schema.
+
+        Return the DB instance, or None if there is no usable database. A
+        failed connection is retried on access after DB_RETRY_SECONDS.
+        """
+        with self._db_lock:
+            if 'db' in self.__dict__:
+                # Connected by another thread while waiting for the lock
+                return self.db
+            if 'DATABASE' not in self.yml:
+                self.db = None
+                return None
+            retry = self._db_failed_at is not None
+            if retry and (time.monotonic() - self._db_failed_at
+                          < self.DB_RETRY_SECONDS):
+                return None
             try:
-                self.db = DB(self)
-                self.sync_db()
-            except SchemaError as exc:
-                logger.error(str(exc))
+                db = DB(self)
+                self.sync_db(db)
+            except Exception as exc:
+                self._db_failed_at = time.monotonic()
+                if retry:
+                    logger.debug(f"Database retry failed: {exc}")
+                    return None
+                if isinstance(exc, SchemaError):
+                    logger.error(str(exc))
+                    hint = "Migrating the database may fix this."
+                else:
+                    logger.error(f"Could not connect to database: {exc}")
+                    hint = "Reading config from config.yml."
                 logger.warning(
-                    "Live config is disabled without database."
-                    " Migrating the database may fix this.")
+                    "Live config is disabled without database. " + hint
+                    + f" Retrying every {self.DB_RETRY_SECONDS} seconds.")
+                return None
+            if retry:
+                logger.info("Connected to database: live config enabled")
+            self._db_failed_at = None
+            self.db = db
+            return db
 
     def __getattr__(self, key):
         """Retrieve config value by key.
 
         Return attribute preferentially from database, then YAML file.
         Only keys that are in DB_CONFIG_KEYS will be fetched from the database.
+        The database is connected on first access of config.db.
         """
+        if key == 'db':
+            return self.connect_db()
         if key not in DB_CONFIG_KEYS:
             return self.yml[key]
         if self.db and key in self.db.keys():
@@ -120,19 +161,17 @@ class Config:
                 logger.error(
                     f"Trying to set unreferenced config attribute {k}")
 
-    def sync_db(self):
-        """Sync database to match config.yml schema."""
-        if not self.db:
+    def sync_db(self, db=None):
+        """Sync database to match config.yml schema.
+
+        Absent keys are added with values from config.yml and redundant keys
+        are removed, in a single transaction.
+        """
+        db = db or self.db
+        if not db:
             logger.warning("Trying update config from DB without connection.")
             return
-
-        db_keys = set(self.db.keys())
-        db_absent_keys = DB_CONFIG_KEYS - db_keys
-        db_redundant_keys = db_keys - DB_CONFIG_KEYS
-        for k in db_absent_keys:
-            self.set(k, self.yml[k])
-        for k in db_redundant_keys:
-            self.db.rm(k)
+        db.sync({k: self.yml[k] for k in DB_CONFIG_KEYS})
 
 
 class STATUS:
@@ -0,0 +1,138 @@
+"""Fake backends for running unit tests and benchmarks off-device.
+
+Hardware is provided by the DEVMODE plant simulation. The database is
+replaced with an in-memory FakeDB, and sleeps are skipped by a SkipClock so
+that tests run quickly and benchmarks measure the code between sleeps rather
+than the sleeps.
+"""
+
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.config.db import TYPECAST
+from hydropi.config.main import DB_CONFIG_KEYS
+
+logger = logging.getLogger('hydropi')
+
+
+class FakeDB:
+    """In-memory stand-in for config.db.
+
+    Each call that would run a query on the real DB counts towards
+    <queries> and blocks for <latency> seconds, to model the round trip.
+    """
+
+    def __init__(self, yml, latency=0):
+        """Populate config table from yml values."""
+        self.latency = latency
+        self.queries = 0
+        self.table = {
+            key: (str(yml[key]), type(yml[key]).__name__)
+            for key in DB_CONFIG_KEYS if key in yml
+        }
+        self.datalog = []
+        self.metrics = []
+
+    def _query(self):
+        """Record a query round trip."""
+        self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def keys(self):
+        """Return list of keys in config table."""
+        self._query()
+        return list(self.table)
+
+    def get(self, key):
+        """Return value for given field."""
+        self._query()
+        if key in self.table:
+            v, type_str = self.table[key]
+            return TYPECAST[type_str](v)
+
+    def set(self, key, value):
+        """Set config value for given field."""
+        self._query()
+        type_str = self.table.get(key, (None, type(value).__name__))[1]
+        self.table[key] = (str(TYPECAST[type_str](value)), type_str)
+
+    def rm(self, key):
+        """Remove a config key."""
+        self._query()
+        self.table.pop(key, None)
+
+    def log_data(self, data):
+        """Record readings in memory and return the row datetime."""
+        self._query()
+        data['datetime'] = clock.now().isoformat()
+        self.datalog.append(dict(data))
+        del self.datalog[:-1000]
+        return data['datetime']
+
+    def log_metrics(self, dt, rows):
+        """Record span timings in memory."""
+        self._query()
+        self.metrics.append((dt, rows))
+        del self.metrics[:-1000]
+
+
+class SkipClock(clock.Clock):
+    """Clock for a single test or benchmark thread that skips sleeps."""
+
+    def __init__(self):
+        """Create clock at zero offset from the system clock."""
+        self.offset = 0.0
+
+    def timestamp(self):
+        """Return seconds since the epoch, including skipped time."""
+        return time.time() + self.offset
+
+    def monotonic(self):
+        """Return monotonic seconds, including skipped time."""
+        return time.monotonic() + self.offset
+
+    def now(self):
+        """Return local datetime, including skipped time."""
+        return datetime.now() + timedelta(seconds=self.offset)
+
+    def sleep(self, seconds):
+        """Skip ahead <seconds> without sleeping."""
+        self.offset += max(seconds or 0, 0)
+
+    def wait_for(self, condition, predicate, timeout=None):
+        """Skip ahead <timeout> seconds, then return predicate()."""
+        result = predicate()
+        if result or timeout is None:
+            return result
+        self.sleep(timeout)
+        return predicate()
+
+
+@contextmanager
+def backends(db_latency=0):
+    """Install fake DB and skip clock for the duration of the context.
+
+    Yield the FakeDB instance.
+    """
+    if not config.DEVMODE:
+        raise RuntimeError(
+            "Fake backends require DEVMODE to read from the simulated"
+            " plant")
+    original_db = config.__dict__.get('db')
+    original_clock = clock.get_clock()
+    db = FakeDB(config.yml, latency=db_latency)
+    config.db = db
+    clock.set_clock(SkipClock())
+    try:
+        yield db
+    finally:
+        clock.set_clock(original_clock)
+        if original_db is None:
+            del config.db
+        else:
+            config.db = original_db
@@ -0,0 +1,4 @@
+"""Lightweight runtime instrumentation for sensors and controllers."""
+
+from .stats import Counter, Histogram
+from .trace import Tracer, get_tracer, summary
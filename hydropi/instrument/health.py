@@ -0,0 +1,174 @@
+"""Streaming health diagnostics for sensor channels.
+
+Each raw sample is fed to the channel's ChannelHealth, which keeps constant
+state regardless of the number of samples:
+
+- Running mean and variance (Welford's algorithm)
+- Flat-line: the same raw value repeated for <flat_samples> samples (and
+  at least <flat_seconds>, if given), as when an ADC channel is stuck or a
+  sensor is disconnected
+- Rail clipping: raw value at or beyond the <rails> (e.g. 0/1023 counts)
+  for <rail_samples> samples
+- Drift: a slow moving average outside of the <expected> calibrated range
+
+    health = get('PHSensor', rails=(0, 1023), expected=(1.9, 3.3))
+    health.observe(bits, volts)
+    if health.faulty: ...
+
+Faults are reported as flags, which clear when the condition does. A faulty
+sensor is not sampled between probes (see AnalogInterface.read), so that
+bad readings are not acted on.
+"""
+
+import logging
+import threading
+
+from hydropi import clock
+from . import metrics
+
+logger = logging.getLogger('hydropi')
+
+FLAT = 'flat'
+RAIL = 'rail'
+DRIFT = 'drift'
+
+_channels = {}
+_lock = threading.Lock()
+
+
+class ChannelHealth:
+    """Running statistics and fault flags for one sensor channel."""
+
+    DRIFT_ALPHA = 0.01      # Weight of each sample in the drift average
+    DRIFT_MIN_SAMPLES = 50  # Samples before drift can be flagged
+
+    def __init__(self, name, rails=None, expected=None, flat_samples=200,
+                 rail_samples=20, flat_seconds=None):
+        """Create health monitor for channel <name>."""
+        self.name = name
+        self.rails = rails
+        self.expected = expected
+        self.flat_samples = flat_samples
+        self.flat_seconds = flat_seconds
+        self.rail_samples = rail_samples
+        self.flags = set()
+        self.reset()
+
+    def reset(self):
+        """Forget all samples and clear flags."""
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.last_raw = None
+        self.flat_run = 0
+        self.flat_since = None
+        self.rail_run = 0
+        self.baseline = None
+        self.probed = None
+        self.flags.clear()
+
+    @property
+    def variance(self):
+        """Return sample variance of values observed since reset."""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def faulty(self):
+        """Return True if any fault is flagged."""
+        return bool(self.flags)
+
+    def probe_due(self, interval):
+        """Return True if a faulty channel is due to be sampled again.
+
+        Sampling a faulty channel every <interval> seconds lets faults clear
+        when the sensor recovers.
+        """
+        now = clock.monotonic()
+        if self.probed is not None and now - self.probed < interval:
+            return False
+        self.probed = now
+        return True
+
+    def observe(self, raw, value=None):
+        """Update with a raw sample and its value (e.g. volts).
+
+        The value is used for variance and drift, and defaults to <raw>.
+        """
+        if raw is None:
+            return
+        value = raw if value is None else value
+
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+        if raw == self.last_raw:
+            self.flat_run += 1
+        else:
+            self.flat_run = 1
+            self.flat_since = clock.monotonic()
+        self.last_raw = raw
+        self._flag(FLAT, self.flat_run >= self.flat_samples and (
+            not self.flat_seconds
+            or clock.monotonic() - self.flat_since >= self.flat_seconds))
+
+        if self.rails:
+            clipped = raw <= self.rails[0] or raw >= self.rails[1]
+            self.rail_run = self.rail_run + 1 if clipped else 0
+            self._flag(RAIL, self.rail_run >= self.rail_samples)
+
+        if self.baseline is None:
+            self.baseline = value
+        self.baseline += self.DRIFT_ALPHA * (value - self.baseline)
+        if self.expected and self.n >= self.DRIFT_MIN_SAMPLES:
+            low, high = self.expected
+            self._flag(DRIFT, not low <= self.baseline <= high)
+
+    def _flag(self, flag, state):
+        """Set or clear a fault flag, logging changes."""
+        if state == (flag in self.flags):
+            return
+        if state:
+            self.flags.add(flag)
+            logger.warning(
+                f"Sensor health: {self.name} fault '{flag}' detected"
+                f" (last raw value {self.last_raw})")
+        else:
+            self.flags.discard(flag)
+            logger.info(f"Sensor health: {self.name} fault '{flag}' cleared")
+
+    def as_dict(self):
+        """Return health summary."""
+        return {
+            'samples': self.n,
+            'mean': self.mean,
+            'variance': self.variance,
+            'baseline': self.baseline,
+            'flags': sorted(self.flags),
+        }
+
+
+def get(name, **kwargs):
+    """Return health monitor for channel <name>, creating it if new."""
+    health = _channels.get(name)
+    if health is None:
+        with _lock:
+            health = _channels.setdefault(name, ChannelHealth(name, **kwargs))
+    return health
+
+
+def report():
+    """Return health summary of all channels."""
+    return {name: h.as_dict() for name, h in list(_channels.items())}
+
+
+SENSOR_FAULT = metrics.gauge(
+    'hydropi_sensor_fault',
+    "Sensor fault flags currently raised (1 if flagged).",
+    labels=('sensor', 'fault'),
+    collect=lambda: {
+        (name, flag): 1
+        for name, h in list(_channels.items())
+        for flag in sorted(h.flags)
+    })
@@ -0,0 +1,322 @@
+"""Process metrics in OpenMetrics text format.
+
+Metrics are aggregated in-process as they happen, using the lock-free
+counters and histograms from stats, so rendering them for a scrape never
+touches hardware:
+
+    READS = metrics.histogram(
+        'hydropi_sensor_read_seconds', "Sensor read latency",
+        LATENCY_BUCKETS, labels=('sensor',))
+    READS.labels('PHSensor').observe(0.25)
+
+    metrics.exposition()  # -> text for GET /metrics
+
+Gauges may be given a <collect> function instead of being set, which is
+called at scrape time and returns {label_values: value}.
+
+/metrics is served by the HTTP daemon, which is a separate process from the
+control loop that records most metrics. The control process writes a
+snapshot of its metrics to TEMP_DIR every SNAPSHOT_INTERVAL_SECONDS (see
+run_snapshots), and the daemon renders that in place of its own families of
+the same name:
+
+    metrics.exposition(metrics.load_snapshot())
+"""
+
+import os
+import json
+import math
+import time
+import logging
+
+from hydropi import clock
+from .stats import Counter, Histogram
+
+logger = logging.getLogger('hydropi')
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DURATION_BUCKETS = (5, 10, 30, 60, 120, 300, 600, 1200)
+SAMPLE_BUCKETS = (1, 3, 5, 10, 25, 50, 100, 200)
+
+SNAPSHOT_FILENAME = 'metrics.snapshot.json'
+SNAPSHOT_INTERVAL_SECONDS = 15
+
+_families = {}
+
+
+class Gauge:
+    """A value that can go up and down."""
+
+    def __init__(self):
+        """Create gauge."""
+        self.value = math.nan
+
+    def set(self, value):
+        """Set current value."""
+        self.value = value
+
+
+class Family:
+    """A named metric and its children, one per set of label values."""
+
+    TYPES = {
+        'counter': Counter,
+        'gauge': Gauge,
+        'histogram': Histogram,
+    }
+
+    def __init__(self, name, type, help, labels=(), buckets=None,
+                 collect=None):
+        """Create metric family."""
+        self.name = name
+        self.type = type
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.buckets = buckets
+        self.collect = collect
+        self.children = {}
+        if not self.labelnames and not collect:
+            # Unlabelled metrics are reported from zero
+            self.labels()
+
+    def labels(self, *values):
+        """Return the child metric for the given label values."""
+        values = tuple(str(v) for v in values)
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"Metric {self.name} expects labels {self.labelnames}")
+            if self.type == 'histogram':
+                child = Histogram(self.buckets)
+            else:
+                child = self.TYPES[self.type]()
+            child = self.children.setdefault(values, child)
+        return child
+
+    def samples(self):
+        """Yield (suffix, labels, value) for each sample of this family."""
+        if self.collect:
+            for values, value in self.collect().items():
+                yield '', self._labels(values), value
+            return
+        for values, child in list(self.children.items()):
+            labels = self._labels(values)
+            if self.type == 'counter':
+                yield '_total', labels, child.value
+            elif self.type == 'gauge':
+                yield '', labels, child.value
+            else:
+                snap = child.snapshot()
+                for bound, count in snap['buckets'].items():
+                    le = bound if bound == '+Inf' else float(bound)
+                    yield '_bucket', labels + [('le', le)], count
+                yield '_count', labels, snap['count']
+                yield '_sum', labels, snap['sum']
+
+    def _labels(self, values):
+        """Return list of (name, value) label pairs."""
+        if not isinstance(values, tuple):
+            values = (values,)
+        return list(zip(self.labelnames, values))
+
+
+def _register(family):
+    """Register family, returning any existing family of the same name."""
+    return _families.setdefault(family.name, family)
+
+
+def counter(name, help, labels=()):
+    """Return counter family <name>, registering it if new."""
+    return _register(Family(name, 'counter', help, labels))
+
+
+def gauge(name, help, labels=(), collect=None):
+    """Return gauge family <name>, registering it if new."""
+    return _register(Family(name, 'gauge', help, labels, collect=collect))
+
+
+def histogram(name, help, buckets=LATENCY_BUCKETS, labels=()):
+    """Return histogram family <name>, registering it if new."""
+    return _register(Family(name, 'histogram', help, labels, buckets))
+
+
+def _format_value(value):
+    """Return sample value as OpenMetrics text."""
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    """Return label set as OpenMetrics text."""
+    if not labels:
+        return ''
+    pairs = []
+    for k, v in labels:
+        v = str(v).replace('\\', r'\\').replace('"', r'\"').replace(
+            '\n', r'\n')
+        pairs.append(f'{k}="{v}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def snapshot():
+    """Return all metrics of this process as data."""
+    return {
+        'time': time.time(),
+        'families': [
+            {
+                'name': family.name,
+                'type': family.type,
+                'help': family.help,
+                'samples': list(family.samples()),
+            }
+            for family in list(_families.values())
+        ],
+    }
+
+
+def _snapshot_path():
+    """Return path of the metrics snapshot file."""
+    # Deferred: config imports this module (via db)
+    from hydropi.config import config
+    return os.path.join(config.TEMP_DIR, SNAPSHOT_FILENAME)
+
+
+def save_snapshot(path=None):
+    """Write metrics of this process to file for the HTTP daemon."""
+    path = path or _snapshot_path()
+    try:
+        with open(path + '.tmp', 'w') as f:
+            json.dump(snapshot(), f)
+        os.replace(path + '.tmp', path)
+    except OSError as exc:
+        logger.warning(f"Could not write metrics snapshot: {exc}")
+
+
+def load_snapshot(path=None):
+    """Return the last snapshot written by save_snapshot."""
+    path = path or _snapshot_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as exc:
+        logger.warning(f"Could not read metrics snapshot: {exc}")
+
+
+def run_snapshots():
+    """Save a metrics snapshot every SNAPSHOT_INTERVAL_SECONDS."""
+    while True:
+        save_snapshot()
+        clock.sleep(SNAPSHOT_INTERVAL_SECONDS)
+
+
+def exposition(snapshot=None):
+    """Return all metrics as OpenMetrics text.
+
+    Families in <snapshot> (see load_snapshot) replace those of this process
+    with the same name, and the age of the snapshot is reported.
+    """
+    families = {
+        family.name: (family.type, family.help, family.samples())
+        for family in list(_families.values())
+    }
+    if snapshot:
+        for family in snapshot['families']:
+            families[family['name']] = (
+                family['type'], family['help'], family['samples'])
+        families['hydropi_metrics_snapshot_age_seconds'] = (
+            'gauge',
+            "Seconds since the control process saved its metrics.",
+            [('', [], time.time() - snapshot['time'])],
+        )
+    lines = []
+    for name, (type, help, samples) in families.items():
+        lines.append(f"# TYPE {name} {type}")
+        lines.append(f"# HELP {name} {help}")
+        for suffix, labels, value in samples:
+            lines.append(
+                f"{name}{suffix}{_format_labels(labels)}"
+                f" {_format_value(value)}")
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics reported across hydropi
+# -----------------------------------------------------------------------------
+
+SENSOR_VALUE = gauge(
+    'hydropi_sensor_value',
+    "Latest sensor reading in the sensor's display unit.",
+    labels=('sensor',))
+SENSOR_READ_TIMESTAMP = gauge(
+    'hydropi_sensor_last_read_timestamp_seconds',
+    "Time of the latest sensor reading.",
+    labels=('sensor',))
+SENSOR_AGE = gauge(
+    'hydropi_sensor_age_seconds',
+    "Seconds since the latest sensor reading.",
+    labels=('sensor',),
+    collect=lambda: {
+        values: time.time() - g.value
+        for values, g in list(SENSOR_READ_TIMESTAMP.children.items())
+    })
+SENSOR_READ_SECONDS = histogram(
+    'hydropi_sensor_read_seconds',
+    "Sensor read latency, including all median samples.",
+    labels=('sensor',))
+SENSOR_READ_SAMPLES = histogram(
+    'hydropi_sensor_read_samples',
+    "Samples taken per sensor reading.",
+    SAMPLE_BUCKETS,
+    labels=('sensor',))
+
+ACTUATOR_ON_SECONDS = counter(
+    'hydropi_actuator_on_seconds',
+    "Time that each output pin has been switched on.",
+    labels=('pin', 'controller'))
+ACTUATOR_ACTIVATIONS = counter(
+    'hydropi_actuator_activations',
+    "Number of times each output pin has been switched on.",
+    labels=('pin', 'controller'))
+
+REFILLS = counter(
+    'hydropi_pressure_refills',
+    "Pressure refill cycles by result.",
+    labels=('result',))
+REFILL_SECONDS = histogram(
+    'hydropi_pressure_refill_seconds',
+    "Pressure pump run time per refill cycle.",
+    DURATION_BUCKETS)
+
+DB_WRITE_SECONDS = histogram(
+    'hydropi_db_write_seconds',
+    "Database write latency.")
+DB_WRITE_ERRORS = counter(
+    'hydropi_db_write_errors',
+    "Database writes that raised an exception.")
+
+
+def observe_read(sensor, value, started, samples=None):
+    """Record a sensor reading and its latency.
+
+    <started> is the time.perf_counter() value when the read began.
+    """
+    SENSOR_READ_SECONDS.labels(sensor).observe(
+        time.perf_counter() - started)
+    if samples:
+        SENSOR_READ_SAMPLES.labels(sensor).observe(samples)
+    if value is not None:
+        SENSOR_VALUE.labels(sensor).set(value)
+        SENSOR_READ_TIMESTAMP.labels(sensor).set(time.time())
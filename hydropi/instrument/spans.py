@@ -0,0 +1,174 @@
+"""Span timings for sweeps and the sensor reads within them.
+
+A span records the real wall time of a block of work, along with the number
+of hardware samples taken, time spent waiting on the bus (ADC, I2C, 1-wire or
+network) and the number of retries. Spans nest per thread:
+
+    with spans.span('sweep') as sweep:
+        with spans.span('PHSensor.read'):
+            with spans.sample():
+                bits = mcp.read_adc(channel)
+
+Sample, bus wait and retry counts are added to every open span on the
+thread, so each span includes the totals of the spans inside it. Outside of
+an open span these calls do nothing, so instrumented code costs almost
+nothing when it is not being timed.
+
+The last finished sweep is written to TEMP_DIR so that other processes (e.g.
+the HTTP daemon) can report it.
+"""
+
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+
+from hydropi.config import config
+
+logger = logging.getLogger('hydropi')
+
+LAST_SWEEP_PATH = os.path.join(config.TEMP_DIR, 'sweep.spans.json')
+
+_local = threading.local()
+
+
+class Span:
+    """Timing of a named block of work.
+
+    Repeated spans of the same name within a parent are merged, with
+    <calls> counting the repeats.
+    """
+
+    def __init__(self, name):
+        """Create span."""
+        self.name = name
+        self.calls = 0
+        self.wall_s = 0
+        self.samples = 0
+        self.bus_wait_s = 0
+        self.retries = 0
+        self.children = {}
+
+    def as_dict(self):
+        """Return span and its children as nested dicts."""
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'wall_ms': round(self.wall_s * 1000, 3),
+            'samples': self.samples,
+            'bus_wait_ms': round(self.bus_wait_s * 1000, 3),
+            'retries': self.retries,
+            'spans': [c.as_dict() for c in self.children.values()],
+        }
+
+    def rows(self, prefix=''):
+        """Return flat list of span dicts with /-separated path names."""
+        path = f"{prefix}/{self.name}" if prefix else self.name
+        row = self.as_dict()
+        del row['spans']
+        row['name'] = path
+        rows = [row]
+        for child in self.children.values():
+            rows += child.rows(path)
+        return rows
+
+
+def _stack():
+    """Return the open spans for this thread."""
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as a span, nested in any open span."""
+    stack = _stack()
+    s = stack[-1].children.get(name) if stack else None
+    if s is None:
+        s = Span(name)
+        if stack:
+            stack[-1].children[name] = s
+    s.calls += 1
+    stack.append(s)
+    start = time.perf_counter()
+    try:
+        yield s
+    finally:
+        s.wall_s += time.perf_counter() - start
+        stack.pop()
+
+
+def timed(func):
+    """Decorate a method to time it as a span, if within an open span.
+
+    The span is named <class>.<method>. Recursive calls are timed as part of
+    the outer call.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        stack = _stack()
+        if not stack:
+            return func(self, *args, **kwargs)
+        name = f"{type(self).__name__}.{func.__name__}"
+        if stack[-1].name == name:
+            return func(self, *args, **kwargs)
+        with span(name):
+            return func(self, *args, **kwargs)
+    return wrapper
+
+
+def add(samples=0, bus_wait_s=0, retries=0):
+    """Add counts to all open spans."""
+    for s in _stack():
+        s.samples += samples
+        s.bus_wait_s += bus_wait_s
+        s.retries += retries
+
+
+@contextmanager
+def sample():
+    """Count one sample and time the enclosed block as bus wait."""
+    if not _stack():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(samples=1, bus_wait_s=time.perf_counter() - start)
+
+
+@contextmanager
+def bus_wait():
+    """Time the enclosed block as bus wait, without counting a sample."""
+    if not _stack():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(bus_wait_s=time.perf_counter() - start)
+
+
+def save_last_sweep(s, path=LAST_SWEEP_PATH):
+    """Write finished sweep span to file."""
+    try:
+        with open(path, 'w') as f:
+            json.dump(s.as_dict(), f)
+    except OSError as exc:
+        logger.warning(f"Could not write sweep spans: {exc}")
+
+
+def load_last_sweep(path=LAST_SWEEP_PATH):
+    """Return the last sweep span written by save_last_sweep."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,50 @@
+"""Startup profile: wall time and modules imported by each startup stage.
+
+    with startup.stage('import config'):
+        from hydropi.config import config
+    ...
+    print(startup.report())
+
+Stages are timed from the first import of this module, so import it before
+anything else that should be measured. Imports within a stage are counted
+from sys.modules, including those pulled in indirectly.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+
+STARTED = time.perf_counter()
+
+stages = []
+
+
+@contextmanager
+def stage(name):
+    """Record wall time and new module imports for a block of startup."""
+    modules = set(sys.modules)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        new = set(sys.modules) - modules
+        stages.append({
+            'name': name,
+            'wall_ms': round((time.perf_counter() - started) * 1000, 1),
+            'modules': len(new),
+            'hydropi_modules': sorted(
+                m for m in new if m.split('.')[0] == 'hydropi'),
+        })
+
+
+def report():
+    """Return a text table of startup stages."""
+    total_ms = (time.perf_counter() - STARTED) * 1000
+    lines = [f"{'Stage':<40} {'Wall (ms)':>10} {'Modules':>8}"]
+    for s in stages:
+        lines.append(
+            f"{s['name']:<40} {s['wall_ms']:>10.1f} {s['modules']:>8}")
+        for m in s['hydropi_modules']:
+            lines.append(f"    {m}")
+    lines.append(f"{'Total':<40} {total_ms:>10.1f} {len(sys.modules):>8}")
+    return '\n'.join(lines)
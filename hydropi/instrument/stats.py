@@ -0,0 +1,94 @@
+"""Aggregate counters and histograms that are cheap to update.
+
+Updates never take a lock. Each thread accumulates into its own cell, and
+cells are only summed when the value is read. Reads are therefore slightly
+more expensive than writes, which suits sampling loops that write thousands
+of times between each read.
+"""
+
+import threading
+
+
+class Counter:
+    """A monotonically increasing count."""
+
+    def __init__(self):
+        """Create counter."""
+        self._cells = {}
+
+    def inc(self, n=1):
+        """Increment counter by <n>."""
+        tid = threading.get_ident()
+        self._cells[tid] = self._cells.get(tid, 0) + n
+
+    @property
+    def value(self):
+        """Return current count."""
+        return sum(list(self._cells.values()))
+
+
+class Histogram:
+    """Distribution of observed values over fixed bucket boundaries.
+
+    Memory is constant regardless of the number of observations.
+    """
+
+    def __init__(self, buckets):
+        """Create histogram with ascending upper bucket bounds."""
+        self.buckets = tuple(sorted(buckets))
+        self._cells = {}
+
+    def _new_cell(self):
+        """Return empty cell: [count, sum, min, max, *bucket_counts]."""
+        return [0, 0.0, None, None] + [0] * (len(self.buckets) + 1)
+
+    def observe(self, value):
+        """Record a value."""
+        tid = threading.get_ident()
+        cell = self._cells.get(tid)
+        if cell is None:
+            cell = self._cells[tid] = self._new_cell()
+        cell[0] += 1
+        cell[1] += value
+        if cell[2] is None or value < cell[2]:
+            cell[2] = value
+        if cell[3] is None or value > cell[3]:
+            cell[3] = value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                cell[4 + i] += 1
+                return
+        cell[-1] += 1
+
+    def snapshot(self):
+        """Return summary statistics as a dict.
+
+        Bucket counts are cumulative, keyed by upper bound ('+Inf' for the
+        overflow bucket).
+        """
+        total = self._new_cell()
+        for cell in list(self._cells.values()):
+            total[0] += cell[0]
+            total[1] += cell[1]
+            if cell[2] is not None:
+                total[2] = cell[2] if total[2] is None else min(
+                    total[2], cell[2])
+                total[3] = cell[3] if total[3] is None else max(
+                    total[3], cell[3])
+            for i in range(4, len(total)):
+                total[i] += cell[i]
+
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + ('+Inf',), total[4:]):
+            cumulative += count
+            buckets[bound] = cumulative
+
+        return {
+            'count': total[0],
+            'sum': total[1],
+            'mean': total[1] / total[0] if total[0] else None,
+            'min': total[2],
+            'max': total[3],
+            'buckets': buckets,
+        }
@@ -0,0 +1,93 @@
+"""Cheap tracing for hot sampling paths.
+
+Sensors take up to hundreds of samples per reading, so anything done per
+sample should cost close to nothing when nobody is looking at it:
+
+- Tracer.debug() takes a %-style message and arguments, and only formats
+  them when sample tracing is enabled (TRACE_SAMPLES in config.yml) and the
+  hydropi logger is accepting DEBUG records.
+- Tracer.count() and Tracer.observe() always run, and aggregate into
+  counters and histograms that can be summarised at any time.
+
+Tracers are shared by name, so every instance of a sensor class feeds the
+same statistics:
+
+    tracer = get_tracer('PHSensor')
+    tracer.debug("READ BITS: %s", bits)
+    tracer.observe('volts', volts)
+"""
+
+import logging
+
+from .stats import Counter, Histogram
+
+logger = logging.getLogger('hydropi')
+
+DEFAULT_BUCKETS = (0.001, 0.01, 0.1, 1, 10, 100, 1000)
+
+_tracers = {}
+
+
+class Tracer:
+    """Instrumentation for a single sensor or controller."""
+
+    def __init__(self, name):
+        """Create tracer with the given display name."""
+        # Imported here so that config can be instrumented
+        from hydropi.config import config
+        self.name = name
+        self.counters = {}
+        self.histograms = {}
+        self.enabled = (
+            config.yml.get('TRACE_SAMPLES', False)
+            and logger.isEnabledFor(logging.DEBUG))
+
+    def debug(self, msg, *args):
+        """Log a lazily formatted debug message if tracing is enabled."""
+        if self.enabled:
+            logger.debug(f"{self.name} | {msg}", *args)
+
+    def count(self, key, n=1):
+        """Increment the named counter."""
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters.setdefault(key, Counter())
+        counter.inc(n)
+
+    def histogram(self, key, buckets=DEFAULT_BUCKETS):
+        """Return the named histogram, creating it with <buckets> if new."""
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms.setdefault(key, Histogram(buckets))
+        return hist
+
+    def observe(self, key, value):
+        """Record a value in the named histogram."""
+        self.histogram(key).observe(value)
+
+    def summary(self):
+        """Return aggregate statistics for this tracer."""
+        return {
+            'counters': {
+                k: v.value for k, v in self.counters.items()
+            },
+            'histograms': {
+                k: v.snapshot() for k, v in self.histograms.items()
+            },
+        }
+
+
+def get_tracer(name):
+    """Return the shared tracer for <name>."""
+    tracer = _tracers.get(name)
+    if tracer is None:
+        tracer = _tracers.setdefault(name, Tracer(name))
+    return tracer
+
+
+def summary():
+    """Return aggregate statistics for all tracers."""
+    return {
+        name: tracer.summary()
+        for name, tracer in list(_tracers.items())
+    }
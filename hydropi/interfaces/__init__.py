@@ -1,45 +1,71 @@
-"""Initialize hardware interfaces for consumption."""
-
-from .sensors import (
-    ECSensor,
-    PHSensor,
-    DepthSensor,
-    PressureSensor,
-    TankTemperatureSensor,
-    PipeTemperatureSensor,
-)
-from .controllers import (
-    ECController,
-    PHController,
-    MistController,
-    MixPumpController,
-    WaterController,
-    PressurePumpController,
-    clean,
-)
-from .controllers import clean
-
-SENSORS = {
-    'ec': ECSensor,
-    'ph': PHSensor,
-    'depth': DepthSensor,
-    'pressure': PressureSensor,
-    'temperature': TankTemperatureSensor,
+"""Initialize hardware interfaces for consumption.
+
+Interfaces are imported on first access (PEP 562), so that importing this
+package doesn't pay for hardware drivers that a process never touches.
+"""
+
+from importlib import import_module
+
+_LAZY = {
+    'ECSensor': '.sensors',
+    'PHSensor': '.sensors',
+    'DepthSensor': '.sensors',
+    'PressureSensor': '.sensors',
+    'TankTemperatureSensor': '.sensors',
+    'PipeTemperatureSensor': '.sensors',
+    'ECController': '.controllers',
+    'PHController': '.controllers',
+    'DosePlanner': '.controllers',
+    'MistController': '.controllers',
+    'MixPumpController': '.controllers',
+    'WaterController': '.controllers',
+    'PressurePumpController': '.controllers',
+}
+
+SENSOR_NAMES = {
+    'ec': 'ECSensor',
+    'ph': 'PHSensor',
+    'depth': 'DepthSensor',
+    'pressure': 'PressureSensor',
+    'temperature': 'TankTemperatureSensor',
 }
 
-CONTROLLERS = {
-    'ec': ECController,
-    'ph': PHController,
-    'mist': MistController,
-    'mix': MixPumpController,
-    'water': WaterController,
-    'pressure': PressurePumpController,
+CONTROLLER_NAMES = {
+    'ec': 'ECController',
+    'ph': 'PHController',
+    'mist': 'MistController',
+    'mix': 'MixPumpController',
+    'water': 'WaterController',
+    'pressure': 'PressurePumpController',
 }
 
 
+def __getattr__(name):
+    """Import interfaces on first access."""
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name], __name__), name)
+    elif name == 'SENSORS':
+        value = {k: __getattr__(v) for k, v in SENSOR_NAMES.items()}
+    elif name == 'CONTROLLERS':
+        value = {k: __getattr__(v) for k, v in CONTROLLER_NAMES.items()}
+    elif name == 'clean':
+        value = import_module('.controllers.clean', __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List lazy attributes alongside module globals."""
+    return sorted(
+        set(globals()) | set(_LAZY) | {'SENSORS', 'CONTROLLERS', 'clean'})
+
+
 def cleanup():
     """Clean up on termination."""
-    controllers.clean.deeds()
+    from .controllers import clean
+    clean.deeds()
 
     # This doesn't make sense until we have sensible __del__ methods:
     # for C in CONTROLLERS.values():
@@ -1,6 +1,27 @@
-from .ec import ECController
-from .ph import PHController
-from .mist import MistController
-from .mix import MixPumpController
-from .water import WaterController
-from .pressure import PressurePumpController
+"""Provide a set of interfaces for controllers, imported on first access."""
+
+from importlib import import_module
+
+_LAZY = {
+    'ECController': '.ec',
+    'PHController': '.ph',
+    'MistController': '.mist',
+    'MixPumpController': '.mix',
+    'DosePlanner': '.dose',
+    'WaterController': '.water',
+    'PressurePumpController': '.pressure',
+}
+
+
+def __getattr__(name):
+    """Import controllers on first access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List lazy attributes alongside module globals."""
+    return sorted(set(globals()) | set(_LAZY))
@@ -11,10 +11,17 @@ except ModuleNotFoundError:
     print("WARNING: Can't import Pi packages - assume developer mode")
     io = None
 
+from hydropi import clock
 from hydropi.config import config
+from hydropi.instrument import metrics
+from hydropi.process import pause
+from hydropi.simulation import get_plant
 
 logger = logging.getLogger('hydropi')
 
+# Monotonic time at which each output pin was last switched on
+_on_since = {}
+
 
 class AbstractController:
     """Control a single pin output device."""
@@ -78,16 +85,45 @@ class AbstractController:
         self.log(f"Switch output state to {self.OFF}:OFF")
         self._set_state(self.OFF)
 
+    def pulse(self, seconds):
+        """Activate the device for <seconds>.
+
+        The pulse ends early if services are paused while it is running.
+        Return True if the pulse ran to completion.
+        """
+        self.on()
+        try:
+            completed = pause.hold(seconds)
+        finally:
+            self.off()
+        if not completed:
+            self.log(f"Pulse of {seconds} seconds interrupted by pause")
+        return completed
+
     def _set_state(self, state):
         """Change the state of the controller."""
         self.state = state
+        self._record_state(state)
         if config.DEVMODE:
-            logger.warning("DEVMODE: spoofed IO operation")
+            get_plant().set_relay(self.PIN, state == self.ON)
             return
         io.setmode(io.BCM)
         io.setup(self.PIN, io.OUT)
         io.output(self.PIN, state)
 
+    def _record_state(self, state):
+        """Update actuator on-time metrics for the output pin."""
+        labels = (self.PIN, type(self).__name__)
+        if state == self.ON:
+            if self.PIN not in _on_since:
+                _on_since[self.PIN] = clock.monotonic()
+                metrics.ACTUATOR_ACTIVATIONS.labels(*labels).inc()
+        else:
+            since = _on_since.pop(self.PIN, None)
+            if since is not None:
+                metrics.ACTUATOR_ON_SECONDS.labels(*labels).inc(
+                    clock.monotonic() - since)
+
     def _get_owners(self):
         """Return list of owners of this interface."""
         if not os.path.exists(self._deed_dir):
@@ -1,10 +1,26 @@
-"""Abstract controller for a doser pump to be run with mixer pump."""
+"""Abstract controller for a doser pump to be run with mixer pump.
+
+Doses that are due together are delivered as a batch by DosePlanner, within
+a single mix cycle:
+
+    planner = DosePlanner()
+    planner.add(ECController(), 20)
+    planner.add(PHController(), 2)
+    delivered = planner.run()   # -> {'nutrient': 20.0, 'ph_down': 2.0}
+
+The mixer runs for MIX_ADDITION_DELAY_SECONDS before the first dose, then
+for MIX_PUMP_SECONDS after the last. Up to DOSER_MAX_CONCURRENT doser pumps
+run at once (e.g. as allowed by the power supply); doses are packed onto
+that many lanes, longest first, so that the batch finishes as early as
+possible.
+"""
 
-import time
 import logging
 from threading import Thread
 
+from hydropi import clock
 from hydropi.config import config
+from hydropi.process import pause
 
 from .controller import AbstractController
 from .mix import MixPumpController
@@ -26,22 +42,100 @@ class AbstractDoseController(AbstractController):
 
     """
 
+    ADDITIVE = None  # Must be set in subclass
     DEFAULT_ML = 10
     FLOW_RATE = 0.637  # Pump flow rate in ml/sec
 
     def deliver(self, ml=None):
-        """Deliver the specified volume of additive."""
-        ml = int(ml or self.DEFAULT_ML)
-        logger.info(f"ACTION: {type(self).__name__} deliver {ml}ml")
+        """Deliver the specified volume of additive with a mix cycle.
 
-        # Start mixing pump and delay
+        Return volume delivered (ml).
+        """
+        planner = DosePlanner()
+        planner.add(self, ml)
+        return planner.run()[self.ADDITIVE]
+
+    def dose(self, ml):
+        """Run doser pump for <ml> and return volume delivered (ml)."""
+        seconds = ml / self.FLOW_RATE
+        start = clock.monotonic()
+        if self.pulse(seconds):
+            return ml
+        elapsed = min(clock.monotonic() - start, seconds)
+        return round(elapsed * self.FLOW_RATE, 1)
+
+
+class DosePlanner:
+    """Deliver a batch of doses within a single mix cycle."""
+
+    def __init__(self):
+        """Create empty batch."""
+        self.doses = []
+
+    def add(self, controller, ml=None):
+        """Add a dose of <ml> from <controller> to the batch.
+
+        Doses of the same additive are merged, since they share a pump.
+        """
+        ml = round(ml or controller.DEFAULT_ML, 1)
+        for i, (c, existing_ml) in enumerate(self.doses):
+            if c.ADDITIVE == controller.ADDITIVE:
+                self.doses[i] = (c, round(existing_ml + ml, 1))
+                return
+        self.doses.append((controller, ml))
+
+    def lanes(self):
+        """Return doses packed onto DOSER_MAX_CONCURRENT sequential lanes."""
+        n = max(1, int(config.yml.get('DOSER_MAX_CONCURRENT', 1)))
+        lanes = [[] for i in range(min(n, len(self.doses)))]
+        totals = [0] * len(lanes)
+        for controller, ml in sorted(
+                self.doses,
+                key=lambda d: d[1] / d[0].FLOW_RATE,
+                reverse=True):
+            i = totals.index(min(totals))
+            lanes[i].append((controller, ml))
+            totals[i] += ml / controller.FLOW_RATE
+        return lanes
+
+    def run(self):
+        """Deliver all doses and return volume delivered per additive."""
+        delivered = {c.ADDITIVE: 0 for c, ml in self.doses}
+        if not self.doses:
+            return delivered
+
+        lanes = self.lanes()
+        dose_seconds = max(
+            sum(ml / c.FLOW_RATE for c, ml in lane)
+            for lane in lanes)
         delay = config.MIX_ADDITION_DELAY_SECONDS
-        logger.info(f"DELAY: {delay} seconds")
+        mix_seconds = delay + dose_seconds + config.MIX_PUMP_SECONDS
+        logger.info(
+            f"ACTION: deliver {len(self.doses)} dose(s) on {len(lanes)}"
+            f" doser lane(s) in {dose_seconds:.0f} seconds,"
+            f" mixing for {mix_seconds:.0f} seconds")
+
+        # Start mixing pump and delay
         mixer = MixPumpController()
-        Thread(target=mixer.mix).start()
-        time.sleep(delay)
+        Thread(target=mixer.mix, args=(mix_seconds,)).start()
+        logger.info(f"DELAY: {delay} seconds")
+        clock.sleep(delay)
+
+        def run_lane(lane):
+            for controller, ml in lane:
+                if pause.paused():
+                    logger.info(
+                        f"Skip {controller.ADDITIVE} dose while paused")
+                    continue
+                logger.info(
+                    f"ACTION: {type(controller).__name__} deliver {ml}ml")
+                delivered[controller.ADDITIVE] += controller.dose(ml)
+
+        threads = [Thread(target=run_lane, args=(lane,)) for lane in lanes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
 
-        # Deliver additive
-        self.on()
-        time.sleep(ml / self.FLOW_RATE)
-        self.off()
+        logger.info(f"Dose delivered (ml): {delivered}")
+        return delivered
@@ -20,5 +20,6 @@ class ECController(AbstractDoseController):
     """
 
     PIN = config.PIN_NUTRIENT_PUMP
+    ADDITIVE = 'nutrient'
 
     # def balance()  # When EC sensor working
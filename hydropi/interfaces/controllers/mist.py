@@ -1,6 +1,9 @@
-"""Operate solenoid valve to control nutrient release from pressure tank."""
+"""Operate solenoid valves to control nutrient release from pressure tank.
 
-import time
+There is a valve for each mist zone (see mist_zones).
+"""
+
+import os
 import logging
 
 from hydropi.config import config
@@ -15,13 +18,34 @@ class MistController(AbstractController):
 
     PIN = config.PIN_MIST_VALVE
 
-    def mist(self):
-        """Deliver a mist pulse."""
-        seconds = (
-            config.MIST_DURATION_NIGHT_SECONDS if is_quiet_time()
-            else config.MIST_DURATION_SECONDS
-        )
-        logger.debug(f"ACTION: MIST {seconds} SECONDS")
-        self.on()
-        time.sleep(seconds)
-        self.off()
+    def __init__(self, pin=None):
+        """Initialize interface for the valve on <pin>."""
+        if pin is not None:
+            self.PIN = pin
+        super().__init__()
+
+    @property
+    def _deed_dir(self):
+        """Return path of the deed directory for this valve.
+
+        Each zone valve is owned separately.
+        """
+        path = os.path.join(
+            config.TEMP_DIR, 'deeds', f"{type(self).__name__}-{self.PIN}")
+        if not os.path.exists(path):
+            os.makedirs(path)
+        return path
+
+    def mist(self, seconds=None):
+        """Deliver a mist pulse and return seconds delivered.
+
+        Duration defaults to the configured day or night duration.
+        """
+        if seconds is None:
+            seconds = (
+                config.MIST_DURATION_NIGHT_SECONDS if is_quiet_time()
+                else config.MIST_DURATION_SECONDS
+            )
+        logger.debug(f"ACTION: MIST {seconds} SECONDS ON PIN {self.PIN}")
+        completed = self.pulse(seconds)
+        return seconds if completed else 0
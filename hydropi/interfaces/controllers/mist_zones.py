@@ -0,0 +1,42 @@
+"""Mist zones: one valve per grow bed.
+
+Zones are listed in config.yml:
+
+    MIST_ZONES:
+      - name: bed1
+        pin: 15
+      - name: bed2
+        pin: 24
+        interval_minutes: 8
+        duration_seconds: 2
+
+Zone interval_minutes, duration_seconds, night_interval_minutes and
+night_duration_seconds default to the live MIST_* config. Without MIST_ZONES,
+a single zone 'main' drives PIN_MIST_VALVE.
+"""
+
+from hydropi.config import config
+
+# Zone settings that override global config
+ZONE_KEYS = {
+    'MIST_INTERVAL_MINUTES': 'interval_minutes',
+    'MIST_INTERVAL_NIGHT_MINUTES': 'night_interval_minutes',
+    'MIST_DURATION_SECONDS': 'duration_seconds',
+    'MIST_DURATION_NIGHT_SECONDS': 'night_duration_seconds',
+}
+
+
+def zones():
+    """Return configured mist zones as dicts with at least name and pin."""
+    listed = config.yml.get('MIST_ZONES') or [
+        {'name': 'main', 'pin': config.PIN_MIST_VALVE}]
+    return [
+        dict(zone, name=str(zone.get('name', zone['pin'])))
+        for zone in listed
+    ]
+
+
+def setting(zone, key):
+    """Return mist config <key> for <zone>, falling back to global config."""
+    value = zone.get(ZONE_KEYS.get(key)) if zone else None
+    return getattr(config, key) if value is None else value
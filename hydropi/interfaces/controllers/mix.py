@@ -1,6 +1,5 @@
 """Operate solenoid valve to control nutrient flow from pressure tank."""
 
-import time
 import logging
 
 from hydropi.config import config
@@ -14,9 +13,11 @@ class MixPumpController(AbstractController):
 
     PIN = config.PIN_MIX_PUMP
 
-    def mix(self):
-        """Run pump to mix nutrient tank additions."""
-        logger.debug(f"ACTION: Mix tank for {config.MIX_PUMP_SECONDS} seconds")
-        self.on()
-        time.sleep(config.MIX_PUMP_SECONDS)
-        self.off()
+    def mix(self, seconds=None):
+        """Run pump to mix nutrient tank additions.
+
+        Mix for MIX_PUMP_SECONDS unless <seconds> is given.
+        """
+        seconds = seconds or config.MIX_PUMP_SECONDS
+        logger.debug(f"ACTION: Mix tank for {seconds} seconds")
+        self.pulse(seconds)
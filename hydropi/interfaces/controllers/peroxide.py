@@ -21,3 +21,4 @@ class PeroxideController(AbstractDoseController):
 
     # Not yet configured
     PIN = config.PIN_PEROXIDE_PUMP
+    ADDITIVE = 'peroxide'
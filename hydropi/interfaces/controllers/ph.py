@@ -22,6 +22,7 @@ class PHController(AbstractDoseController):
     """
 
     PIN = config.PIN_PH_DOWN_PUMP
+    ADDITIVE = 'ph_down'
     DEFAULT_ML = 2
 
     # def balance()  # When pH sensor working
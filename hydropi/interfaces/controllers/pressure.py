@@ -1,9 +1,13 @@
 """Operate pressure pump to regulate tank pressure."""
 
-import time
+import os
+import json
+import math
 import logging
 
+from hydropi import clock
 from hydropi.config import config
+from hydropi.instrument import metrics
 from hydropi.interfaces.sensors.pressure import PressureSensor
 from hydropi.notifications import telegram
 
@@ -12,51 +16,179 @@ from .controller import AbstractController
 logger = logging.getLogger('hydropi')
 
 
+class PumpCurve:
+    """Online model of pump fill rate against tank pressure.
+
+    Fill rate (PSI per second) is modelled as linear in tank pressure, since
+    the pump slows as the head it pumps against rises:
+
+        rate = a + b * psi
+
+    The coefficients are fit by weighted least squares to the mean rate and
+    mid-point pressure of past refill pulses. Older pulses are discounted by
+    FORGET with each new one, so the curve follows pump wear and changes in
+    tank charge. Until pulses have covered a range of starting pressures, the
+    fill rate is taken as constant.
+
+    The fit is persisted as running sums, so it survives restarts.
+    """
+
+    FORGET = 0.95
+    MIN_OBSERVATIONS = 2
+    MIN_PSI_SPREAD = 5      # Std. dev. of pressures needed to fit the slope
+    CALIBRATION_CONFIGFILE = os.path.join(
+        config.CONFIG_DIR,
+        'calibration/pressure/pump_curve.json')
+
+    def __init__(self, path=CALIBRATION_CONFIGFILE):
+        """Load curve from file."""
+        self.path = path
+        self.sums = self._load()
+
+    def _empty(self):
+        """Return sums with no observations."""
+        return {'n': 0, 'w': 0, 'x': 0, 'y': 0, 'xx': 0, 'xy': 0}
+
+    def _load(self):
+        """Read running sums from file."""
+        if not os.path.exists(self.path):
+            return self._empty()
+        try:
+            with open(self.path) as f:
+                sums = json.load(f)
+            assert set(sums) == set(self._empty())
+            return sums
+        except Exception:
+            logger.warning("Error loading pump curve - removing file")
+            os.remove(self.path)
+            return self._empty()
+
+    def _save(self):
+        """Write running sums to file."""
+        config_dir = os.path.dirname(self.path)
+        if not os.path.exists(config_dir):
+            os.makedirs(config_dir)
+        with open(self.path, 'w') as f:
+            json.dump(self.sums, f)
+
+    def observe(self, psi_start, psi_end, seconds):
+        """Update the fit with a pulse of <seconds> from start to end PSI."""
+        if seconds <= 0 or psi_end <= psi_start:
+            return
+        x = (psi_start + psi_end) / 2
+        y = (psi_end - psi_start) / seconds
+        s = self.sums
+        for k in ('w', 'x', 'y', 'xx', 'xy'):
+            s[k] *= self.FORGET
+        s['n'] += 1
+        s['w'] += 1
+        s['x'] += x
+        s['y'] += y
+        s['xx'] += x * x
+        s['xy'] += x * y
+        self._save()
+        logger.debug(
+            f"Pump curve observed {y:.3f} PSI/s at {x:.1f} PSI:"
+            f" coefficients {self.coefficients()}")
+
+    def coefficients(self):
+        """Return (a, b) for rate = a + b * psi, or None if not yet fit."""
+        s = self.sums
+        if s['n'] < self.MIN_OBSERVATIONS or s['w'] <= 0:
+            return None
+        mean_x = s['x'] / s['w']
+        mean_y = s['y'] / s['w']
+        var_x = s['xx'] / s['w'] - mean_x ** 2
+        if var_x >= self.MIN_PSI_SPREAD ** 2:
+            b = (s['xy'] / s['w'] - mean_x * mean_y) / var_x
+            if b < 0:
+                return mean_y - b * mean_x, b
+        # Pressures too similar to fit a slope (or fit is not physical)
+        return mean_y, 0
+
+    def duration(self, psi_start, psi_target):
+        """Return seconds to pump from start to target PSI, or None."""
+        coefficients = self.coefficients()
+        if coefficients is None or psi_target <= psi_start:
+            return None
+        a, b = coefficients
+        if b == 0:
+            return (psi_target - psi_start) / a if a > 0 else None
+        rate_start = a + b * psi_start
+        rate_target = a + b * psi_target
+        if rate_start <= 0 or rate_target <= 0:
+            # Curve says the pump can't reach the target
+            return None
+        return math.log(rate_target / rate_start) / b
+
+
 class PressurePumpController(AbstractController):
     """Control pressure pump."""
 
     PIN = config.PIN_PRESSURE_PUMP
+    SETTLE_SECONDS = 5          # Pressure reading is noisy while pumping
+    TARGET_MARGIN_PSI = 2       # Aim above MAX so one pulse is enough
+    MIN_PULSE_SECONDS = 3
 
     def refill(self):
         """Activate pump to restore system pressure.
 
-        Refill pressure in pulses of dynamic length, checking pressure status
-        between pulses. The pressure sensor is very inaccurate while the pump
-        is running, so pause and check is a much better strategy if done
-        intelligently.
+        Refill pressure in pulses, checking pressure status between pulses.
+        The pressure sensor is very inaccurate while the pump is running, so
+        pause and check is a much better strategy if done intelligently.
+
+        Pulse duration is predicted from a pump curve learned from previous
+        pulses (see PumpCurve), so that most refills take a single pulse.
         """
-        def _next_duration():
-            """Calculate duration of next fill round."""
-            ps = PressureSensor()
-            psi = ps.read(n=5)
-            if psi > config.MAX_PRESSURE_PSI:
-                return psi, 0
-
-            # Reduce the duration based on remaining fill
-            duration = round(
-                config.PRESSURE_REFILL_DURATION_SECONDS
-                * (config.MAX_PRESSURE_PSI - psi)
-                / (config.MAX_PRESSURE_PSI - config.MIN_PRESSURE_PSI)
-            ) + 5  # Extra 5 seconds ensures that MAX is always reached
+        curve = PumpCurve()
 
+        def _read_psi():
+            psi = PressureSensor().read()
             logger.info(f"Current pressure: {psi}{PressureSensor.UNIT}")
+            return psi
+
+        def _next_duration(psi):
+            """Calculate duration of next fill round."""
+            target = config.MAX_PRESSURE_PSI + self.TARGET_MARGIN_PSI
+            duration = curve.duration(psi, target)
+            if duration is None:
+                # No pump curve yet - reduce the duration based on remaining
+                # fill. Extra 5 seconds ensures that MAX is always reached.
+                duration = (
+                    config.PRESSURE_REFILL_DURATION_SECONDS
+                    * (config.MAX_PRESSURE_PSI - psi)
+                    / (config.MAX_PRESSURE_PSI - config.MIN_PRESSURE_PSI)
+                ) + 5
+            duration = min(
+                max(math.ceil(duration), self.MIN_PULSE_SECONDS),
+                config.PRESSURE_REFILL_DURATION_SECONDS * 3)
             logger.info(f"Refill duration: {duration} seconds")
-            return psi, duration
+            return duration
+
+        def _record(result):
+            """Record refill cycle metrics."""
+            metrics.REFILLS.labels(result).inc()
+            metrics.REFILL_SECONDS.labels().observe(cumulative_duration)
 
         logger.info(
             "ACTION: restore system pressure to"
             f" {config.MAX_PRESSURE_PSI}{PressureSensor.UNIT}")
 
         cumulative_duration = 0
-        psi, duration = _next_duration()
-        while psi < config.MAX_PRESSURE_PSI:
-            self.on()
-            time.sleep(duration)
-            self.off()
-            time.sleep(5)
+        pulses = 0
+        psi = _read_psi()
+        while psi is not None and psi < config.MAX_PRESSURE_PSI:
+            duration = _next_duration(psi)
+            if not self.pulse(duration):
+                _record('interrupted')
+                return logger.info("Pressure restore interrupted by pause")
+            clock.sleep(self.SETTLE_SECONDS)
             cumulative_duration += duration
+            pulses += 1
             last_psi = psi
-            psi, duration = _next_duration()
+            psi = _read_psi()
+            if psi is None:
+                break
             psi_increase = psi - last_psi
             if duration > 10 and psi_increase < 2:
                 logger.error(
@@ -64,13 +196,20 @@ class PressurePumpController(AbstractController):
                     " failure. A notification has been dispatched.")
                 telegram.notify(
                     "Pressure restore has reported an increase of"
-                    f"{psi_increase} {self.UNIT} over a duration of"
-                    f" {duration} seconds."
+                    f" {psi_increase}{PressureSensor.UNIT} over a duration"
+                    f" of {duration} seconds."
                     " Pressure pump has been running for a total of"
                     f" {cumulative_duration} seconds. Please check the"
                     " pump for trapped air.")
+                _record('failed')
                 return
+            curve.observe(last_psi, psi, duration)
 
+        if psi is None:
+            _record('sensor_fault')
+            return logger.error(
+                "ACTION: Halt pressure restore - pressure sensor faulty")
+        _record('completed')
         logger.info(
             f"System pressure restored to {psi}{PressureSensor.UNIT}"
-            f" in {cumulative_duration} seconds")
+            f" in {cumulative_duration} seconds ({pulses} pulses)")
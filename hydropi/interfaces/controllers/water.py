@@ -1,6 +1,5 @@
 """Operate mains water valve to regulate tank depth."""
 
-import time
 import logging
 
 from hydropi.config import config
@@ -31,7 +30,7 @@ class WaterController(AbstractController):
             if depth.full():
                 break
             logger.debug("ACTION: Water valve open")
-            self.on()
-            time.sleep(config.WATER_FILL_INTERVAL_SECONDS)
+            completed = self.pulse(config.WATER_FILL_INTERVAL_SECONDS)
             logger.debug("ACTION: Water valve close")
-            self.off()
+            if not completed:
+                break
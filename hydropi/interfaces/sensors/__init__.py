@@ -1,37 +1,61 @@
-"""Provide a set of interfaces for sensors."""
+"""Provide a set of interfaces for sensors, imported on first access."""
 
-from .ph import PHSensor
-from .ec import ECSensor
-from .depth import DepthSensor
-from .pressure import PressureSensor
-from .temperature import TankTemperatureSensor, PipeTemperatureSensor
+from importlib import import_module
+
+_LAZY = {
+    'PHSensor': '.ph',
+    'ECSensor': '.ec',
+    'DepthSensor': '.depth',
+    'PressureSensor': '.pressure',
+    'TankTemperatureSensor': '.temperature',
+    'PipeTemperatureSensor': '.temperature',
+}
+
+
+def __getattr__(name):
+    """Import sensors on first access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List lazy attributes alongside module globals."""
+    return sorted(set(globals()) | set(_LAZY))
 
 
 def get_ph():
     """Return current pH level."""
+    from .ph import PHSensor
     ph = PHSensor()
     return ph.read()
 
 
 def get_ec():
     """Return current EC (nutrient) level."""
+    from .ec import ECSensor
     ec = ECSensor()
     return ec.read()
 
 
 def get_depth():
     """Return current depth level."""
+    from .depth import DepthSensor
     ds = DepthSensor()
     return ds.read()
 
 
 def get_temperature():
     """Return current temperature."""
+    from .temperature import TankTemperatureSensor
     ts = TankTemperatureSensor()
     return ts.read()
 
 
 def get_pressure():
     """Return current pressure."""
+    from .pressure import PressureSensor
     ps = PressureSensor()
     return ps.read()
@@ -15,10 +15,24 @@ RANGE_LOWER | Lower limital of optimal range
 RANGE_UPPER | Upper limital of optimal range
 DANGER_DIFF | Danger zone variance from optimal range
 
+Adaptive sampling:
+------------------
+If READ_TOLERANCE is set, read() without <n> keeps sampling until the 95%
+confidence bound on the median is within READ_TOLERANCE units, taking at
+least MIN_SAMPLES and at most MAX_SAMPLES. A stable signal is read in a
+handful of samples, while a noisy one gets as many as it needs. The number
+of samples and error achieved are logged and kept as <last_sample>.
+
+Health:
+-------
+Every sample is fed to the channel's health monitor (instrument.health),
+which flags a stuck ADC value, clipping at 0/1023 counts and drift outside
+MIN_VOLTS - MAX_VOLTS. While faulty, read() returns None without sampling,
+except for a probe every HEALTH_PROBE_SECONDS to detect recovery.
+
 """
 
 import time
-import random
 import logging
 import statistics
 try:
@@ -28,11 +42,19 @@ except ModuleNotFoundError:
     print("WARNING: Can't import Pi packages - assume developer mode")
     MCP3008 = io = None
 
+from hydropi import clock
 from hydropi.config import config, STATUS
+from hydropi.instrument import get_tracer, health, metrics, spans
 from hydropi.process.errors import catchme
+from hydropi.simulation import get_plant
 
 logger = logging.getLogger('hydropi')
 
+VOLTS_BUCKETS = (0.3, 0.6, 0.9, 1.2, 1.5, 1.8, 2.1, 2.4, 2.7, 3.0, 3.3)
+ADC_BITS = 1024
+Z_95 = 1.96
+MEDIAN_EFFICIENCY = 1.2533  # Standard error of median / standard error of mean
+
 
 class AnalogInterface:
     """Abstract interface for an analog sensor input."""
@@ -50,6 +72,16 @@ class AnalogInterface:
     INVERSE = False     # Set True if volts are inverse of value
     DEFAULT_MEDIAN_SAMPLES = 5
 
+    # Adaptive sampling
+    READ_TOLERANCE = None   # Units - set to sample until within tolerance
+    MIN_SAMPLES = 5
+    MAX_SAMPLES = 100
+
+    # Health
+    HEALTH_FLAT_SAMPLES = 200   # Identical ADC values to flag stuck channel
+    HEALTH_DRIFT_MARGIN = 0.05  # Fraction of volts range beyond calibration
+    HEALTH_PROBE_SECONDS = 600
+
     REQUIRED_ATTRIBUTES = (
         'CHANNEL',      # ADC channel to read (zero-indexed)
         'TEXT',         # Display text for sensor e.g. "temperature"
@@ -71,6 +103,15 @@ class AnalogInterface:
         be declared as instance attributes in the subclass.
         """
         self._validate()
+        self.last_sample = None
+        self.tracer = get_tracer(type(self).__name__)
+        self.tracer.histogram('volts', VOLTS_BUCKETS)
+        margin = self.HEALTH_DRIFT_MARGIN * (self.MAX_VOLTS - self.MIN_VOLTS)
+        self.health = health.get(
+            type(self).__name__,
+            rails=(0, ADC_BITS - 1),
+            expected=(self.MIN_VOLTS - margin, self.MAX_VOLTS + margin),
+            flat_samples=self.HEALTH_FLAT_SAMPLES)
         self._setup()
         self.RANGE = self.RANGE_UPPER - self.RANGE_LOWER
         self.DANGER_LOWER = self.RANGE_LOWER - self.RANGE
@@ -106,69 +147,169 @@ class AnalogInterface:
     def get_value(self, as_volts=False):
         """Calculate current channel reading."""
         if config.DEVMODE:
-            if as_volts:
-                range = (self.MAX_VOLTS - self.MIN_VOLTS) * 0.25
-                return random.uniform(
-                    self.MIN_VOLTS + range,
-                    self.MAX_VOLTS - range)
-            return random.uniform(self.DANGER_LOWER, self.DANGER_UPPER)
+            return self._get_simulated_value(as_volts)
 
         try:
             # Sometimes RPi 'forgets' the pin IO state
-            bits = self.mcp.read_adc(self.CHANNEL)
+            with spans.sample():
+                bits = self.mcp.read_adc(self.CHANNEL)
         except RuntimeError:
             self._setup()
-            bits = self.mcp.read_adc(self.CHANNEL)
+            spans.add(retries=1)
+            with spans.sample():
+                bits = self.mcp.read_adc(self.CHANNEL)
 
-        logger.debug(f"READ BITS: {bits}")
-        volts = self.VREF * bits / 1024
-        logger.debug(f"READ VOLTS: {round(volts, 6)}")
+        volts = self.VREF * bits / ADC_BITS
         volts_offset = volts + self.V0_OFFSET
-        logger.debug(f"READ VOLTS OFFSET: {round(volts_offset, 6)}")
+        self.health.observe(bits, volts_offset)
+        self.tracer.count('samples')
+        self.tracer.observe('volts', volts_offset)
+        self.tracer.debug(
+            "READ BITS: %s | VOLTS: %.6f | VOLTS OFFSET: %.6f",
+            bits, volts, volts_offset)
         if as_volts:
             return volts_offset
         return self.read_transform(self._volts_to_units(volts_offset))
 
     def _volts_to_units(self, v):
         """Calculate units from analog voltage."""
-        logger.debug("Calculate volts to units from default equation")
+        self.tracer.debug("Calculate volts to units from default equation")
         ref_range = self.MAX_VOLTS - self.MIN_VOLTS
         fraction = (v - self.MIN_VOLTS) / ref_range
         if self.INVERSE:
-            logger.debug("Calculate units against inverse voltage")
+            self.tracer.debug("Calculate units against inverse voltage")
             fraction = 1 - fraction
         return fraction * self.MAX_UNITS
 
+    def _units_to_volts(self, units):
+        """Calculate analog voltage from units (inverse of _volts_to_units)."""
+        fraction = units / self.MAX_UNITS
+        if self.INVERSE:
+            fraction = 1 - fraction
+        return self.MIN_VOLTS + fraction * (self.MAX_VOLTS - self.MIN_VOLTS)
+
+    def _get_simulated_value(self, as_volts=False):
+        """Read channel from the simulated plant through a spoofed ADC."""
+        plant = get_plant()
+        with spans.sample():
+            true_value = plant.sense(self.CHANNEL)
+        units = self.read_untransform(true_value)
+        volts = plant.quantize_volts(
+            self._units_to_volts(units)
+            + plant.adc_noise_volts(self.CHANNEL, self.VREF),
+            self.VREF)
+        self.health.observe(round(volts * ADC_BITS / self.VREF), volts)
+        self.tracer.count('samples')
+        self.tracer.observe('volts', volts)
+        if as_volts:
+            return volts
+        return self.read_transform(self._volts_to_units(volts))
+
     @catchme
+    @spans.timed
     def read(self, n=None):
-        """Return channel reading."""
-        n = n or self.DEFAULT_MEDIAN_SAMPLES
-        if n > 1:
-            r = self._read_median(n)
+        """Return channel reading.
+
+        Take the median of <n> samples, or sample adaptively if <n> is not
+        given and READ_TOLERANCE is set.
+        """
+        started = time.perf_counter()
+        if (self.health.faulty
+                and not self.health.probe_due(self.HEALTH_PROBE_SECONDS)):
+            logger.warning(
+                f"{type(self).__name__} READ skipped: sensor faulty"
+                f" {sorted(self.health.flags)}")
+            return None
+        if n is None and self.READ_TOLERANCE:
+            volts, n, error = self.sample_volts(
+                self._units_to_volts_delta(self.READ_TOLERANCE))
+            if volts is None:
+                return None
+            r = self.read_transform(self._volts_to_units(volts))
+            error = self._volts_to_units_delta(error)
+            detail = f"n={n}, ±{error:.4g}{self.UNIT}"
         else:
-            r = self.get_value()
+            n = n or self.DEFAULT_MEDIAN_SAMPLES
+            if n > 1:
+                r = self._read_median(n)
+            else:
+                r = self.get_value()
+            error = None
+            detail = f"n={n}"
+        self.last_sample = {'n': n, 'error': error}
+        if self.health.faulty:
+            logger.warning(
+                f"{type(self).__name__} READ discarded: sensor faulty"
+                f" {sorted(self.health.flags)}")
+            return None
         rounded = round(r, self.DECIMAL_POINTS)
         logger.info(
             f"{type(self).__name__}"
-            f" READ: {rounded}{self.UNIT} (n={n})")
+            f" READ: {rounded}{self.UNIT} ({detail})")
+        metrics.observe_read(type(self).__name__, rounded, started, n)
         return(rounded)
 
     def read_transform(self, value):
         """Override this method to adjust reading e.g. temp correction."""
         return value
 
+    def read_untransform(self, value):
+        """Override with the inverse of read_transform (for simulation)."""
+        return value
+
     def _read_median(self, n):
         """Return median channel reading from <n> samples."""
         readings = []
         for i in range(n):
             r = self.get_value(as_volts=True)
-            if r:
+            if r is not None:
                 readings.append(r)
-            time.sleep(self.MEDIAN_INTERVAL_SECONDS)
+            clock.sleep(self.MEDIAN_INTERVAL_SECONDS)
         volts = statistics.median(readings)
         logger.debug(f"Median volts (n={n}): {volts}")
         return self.read_transform(self._volts_to_units(volts))
 
+    def sample_volts(self, tolerance, min_n=None, max_n=None):
+        """Sample until the median voltage is known within <tolerance>.
+
+        Stop when the 95% confidence bound on the median is within
+        <tolerance> volts, after at least <min_n> and at most <max_n>
+        samples. Return (median volts, samples taken, error bound in volts).
+        Median volts is None if fewer than two valid samples were taken.
+        """
+        min_n = max(min_n or self.MIN_SAMPLES, 2)
+        max_n = max(max_n or self.MAX_SAMPLES, min_n)
+        readings = []
+        error = float('inf')
+        for i in range(max_n):
+            r = self.get_value(as_volts=True)
+            if r is not None:
+                readings.append(r)
+            if len(readings) >= min_n:
+                error = (
+                    Z_95 * MEDIAN_EFFICIENCY * statistics.stdev(readings)
+                    / len(readings) ** 0.5)
+                if error <= tolerance:
+                    break
+            clock.sleep(self.MEDIAN_INTERVAL_SECONDS)
+        if len(readings) < 2:
+            logger.warning(
+                f"{type(self).__name__}: no valid samples"
+                f" ({len(readings)} of {max_n})")
+            return None, len(readings), error
+        volts = statistics.median(readings)
+        logger.debug(
+            f"Median volts (n={len(readings)}, ±{error:.5f}v): {volts}")
+        return volts, len(readings), error
+
+    def _units_to_volts_delta(self, units):
+        """Convert a difference in units to volts."""
+        return abs(self._units_to_volts(units) - self._units_to_volts(0))
+
+    def _volts_to_units_delta(self, volts):
+        """Convert a difference in volts to units."""
+        return abs(self._volts_to_units(volts) - self._volts_to_units(0))
+
     def get_status_text(self, value):
         """Return appropriate status text for given value."""
         if (value > self.RANGE_LOWER
@@ -183,7 +324,16 @@ class AnalogInterface:
     def get_status(cls):
         """Create interface and return current status data."""
         sensor = cls()
-        current = sensor.read(n=cls.DEFAULT_MEDIAN_SAMPLES)
+        current = sensor.read()
+        if current is None:
+            # Sensor faulty - see health
+            return {
+                'text': cls.TEXT,
+                'status': STATUS.DANGER,
+                'value': None,
+                'percent': None,
+                'unit': cls.UNIT,
+            }
 
         # Represent reading as a percent of absolute limits such that 0.5 is in
         # the middle of the optimal range (for display on dials).
@@ -12,11 +12,8 @@ making it seem shallower than it is. The hottest temperature will then give the
 import os
 import time
 import math
-import random
 import logging
 import statistics
-from bmp280 import BMP280
-from smbus2 import SMBus
 
 try:
     import RPi.GPIO as io
@@ -24,12 +21,16 @@ except ModuleNotFoundError:
     print("WARNING: Can't import Pi packages - assume developer mode")
     io = None
 
+from hydropi import clock
 from hydropi.config import config, STATUS
+from hydropi.instrument import get_tracer, health, metrics, spans
 from hydropi.process.errors import catchme
 from hydropi.interfaces.utils import WeatherAPI
+from hydropi.simulation import get_plant
 from .pressure import PressureSensor
 
 logger = logging.getLogger('hydropi')
+tracer = get_tracer('DepthSensor')
 
 H = 50.0                  # Total height of nutrient bin (reservoir)
 RT = 21.7                 # Radius top
@@ -45,11 +46,6 @@ DEPTH_ADJUST_FROM_C = 10
 
 I2C_PATH = '/dev/i2c-1'
 
-if not config.DEVMODE and not os.path.exists(I2C_PATH):
-    raise OSError(f'Path not found: {I2C_PATH}\n'
-                  'Barometric depth sensor requires I2C to be enabled on the'
-                  ' raspberry pi (run `sudo raspi-config` and reboot).')
-
 
 class DepthSensor:
     """Interface for digital depth sensor.
@@ -73,6 +69,11 @@ class DepthSensor:
     PIN_SDA = config.PIN_DEPTH_SDA
     MEDIAN_INTERVAL_SECONDS = 0.05 or config.MEDIAN_INTERVAL_SECONDS
     DEFAULT_MEDIAN_SAMPLES = 5
+    HEALTH_EXPECTED_HPA = (800, 1300)   # Plausible absolute pressure
+    HEALTH_FLAT_SAMPLES = 100           # BMP280 values are rarely identical
+    HEALTH_PROBE_SECONDS = 600
+
+    _bmp280 = None  # Driver is shared, and set up on first read
 
     def __init__(self):
         """Initialise interface."""
@@ -88,14 +89,29 @@ class DepthSensor:
             1 - config.VOLUME_TOLERANCE * 2)
         self.DANGER_UPPER_L = self.VOLUME_TARGET_L * (
             1 + config.VOLUME_TOLERANCE * 2)
+        self.health = health.get(
+            type(self).__name__,
+            expected=self.HEALTH_EXPECTED_HPA,
+            flat_samples=self.HEALTH_FLAT_SAMPLES)
         if config.DEVMODE:
             logger.warning("DEVMODE: configure sensor without I2C interface")
-            return
-        # Initialise the BMP280
-        self.bus = SMBus(1)
-        self.bmp280 = BMP280(i2c_dev=self.bus)
+
+    @property
+    def bmp280(self):
+        """Return the BMP280 driver, initialising it on first use."""
+        if DepthSensor._bmp280 is None:
+            if not os.path.exists(I2C_PATH):
+                raise OSError(
+                    f'Path not found: {I2C_PATH}\n'
+                    'Barometric depth sensor requires I2C to be enabled on'
+                    ' the raspberry pi (run `sudo raspi-config` and reboot).')
+            from bmp280 import BMP280
+            from smbus2 import SMBus
+            DepthSensor._bmp280 = BMP280(i2c_dev=SMBus(1))
+        return DepthSensor._bmp280
 
     @catchme
+    @spans.timed
     def read(self, n=None, abs_pressure=False, include_pressure_tank=True,
              depth=False):
         """Return current volume in litres.
@@ -109,15 +125,29 @@ class DepthSensor:
 
         depth=True provides tank depth in mm
         """
+        started = time.perf_counter()
+        if (not abs_pressure and self.health.faulty
+                and not self.health.probe_due(self.HEALTH_PROBE_SECONDS)):
+            logger.warning(
+                f"{type(self).__name__} READ skipped: sensor faulty"
+                f" {sorted(self.health.flags)}")
+            return None
         n = n or self.DEFAULT_MEDIAN_SAMPLES
         if n > 1:
             abs_hpa = self._read_median(n)
         else:
             abs_hpa = self._get_pressure_hpa()
+            tracer.count('samples')
+            tracer.observe('hpa', abs_hpa)
 
-        logger.debug(f"Read depth absolute pressure: {abs_hpa} hPa")
+        tracer.debug("Read depth absolute pressure: %s hPa", abs_hpa)
         if abs_pressure:
             return abs_hpa
+        if self.health.faulty:
+            logger.warning(
+                f"{type(self).__name__} READ discarded: sensor faulty"
+                f" {sorted(self.health.flags)}")
+            return None
 
         ambient_hpa = WeatherAPI().get_ambient_pressure_hpa()
         if not ambient_hpa:
@@ -141,9 +171,16 @@ class DepthSensor:
                 f" {round(vol, self.DECIMAL_POINTS)} litres")
             if include_pressure_tank:
                 ps = PressureSensor()
-                vol += ps.get_tank_volume()
+                tank_litres = ps.get_tank_volume()
+                if tank_litres is None:
+                    logger.warning(
+                        f"{type(self).__name__} READ excludes pressure tank:"
+                        " pressure sensor faulty")
+                else:
+                    vol += tank_litres
             r = round(vol, self.DECIMAL_POINTS)
             logger.info(f"{type(self).__name__} READ: {r}{self.UNIT} (n={n})")
+            metrics.observe_read(type(self).__name__, max(r, 0), started)
         return max(r, 0)
 
     def _read_median(self, n):
@@ -153,17 +190,26 @@ class DepthSensor:
             r = self.read(n=1, abs_pressure=True)
             if r is not None:
                 readings.append(r)
-            time.sleep(self.MEDIAN_INTERVAL_SECONDS)
+            clock.sleep(self.MEDIAN_INTERVAL_SECONDS)
 
         return statistics.median(readings)
 
     def _get_pressure_hpa(self):
         """Read pressure from BMP280 and convert to relative pressure."""
-        return self.bmp280.get_pressure()
+        with spans.sample():
+            if config.DEVMODE:
+                hpa = get_plant().depth_hpa()
+            else:
+                hpa = self.bmp280.get_pressure()
+        self.health.observe(hpa)
+        return hpa
 
     def _get_temperature_c(self):
         """Read temperature from BMP280 sensor."""
-        return self.bmp280.get_temperature()
+        with spans.bus_wait():
+            if config.DEVMODE:
+                return get_plant().temperature_c
+            return self.bmp280.get_temperature()
 
     def get_status_text(self, value):
         """Return appropriate status text for given value."""
@@ -179,13 +225,17 @@ class DepthSensor:
     def get_status(cls):
         """Create interface and return current status data."""
         depth = cls()
-        if config.DEVMODE:
-            logger.warning("DEVMODE: Return random reading")
-            current = round(
-                random.uniform(depth.DANGER_LOWER_L, depth.DANGER_UPPER_L),
-                depth.DECIMAL_POINTS)
-        else:
-            current = depth.read()
+        current = depth.read()
+        if current is None:
+            # Sensor faulty - see health
+            return {
+                'text': cls.TEXT,
+                'status': STATUS.DANGER,
+                'value': None,
+                'percent': None,
+                'targetPercent': depth.VOLUME_TARGET_PC,
+                'unit': cls.UNIT,
+            }
 
         # Represent reading as a percent of total volume
         if current > depth.CEILING_L:
@@ -231,9 +281,9 @@ def hpa_to_depth(hpa, temp_c):
     # TODO: apply temperature correction
 
     depth_raw = round(hpa * HPA_TO_DEPTH_M + HPA_TO_DEPTH_C)
-    logger.debug(f"Raw depth from barometric pressure: {depth_raw:.2f}mm")
+    tracer.debug("Raw depth from barometric pressure: %.2fmm", depth_raw)
     depth_adjusted = get_temp_adjusted_depth(depth_raw, temp_c)
-    logger.debug(f"Raw depth from barometric pressure: {depth_raw:.2f}mm")
+    tracer.debug("Temperature adjusted depth: %.2fmm", depth_adjusted)
 
     return depth_adjusted
 
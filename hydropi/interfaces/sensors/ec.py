@@ -6,10 +6,11 @@ except ModuleNotFoundError:
     print("WARNING: Can't import Pi packages - assume developer mode")
     io = None
 
-import time
 import logging
 
+from hydropi import clock
 from hydropi.config import config
+from hydropi.instrument import spans
 from .analog import AnalogInterface
 from .temperature import PipeTemperatureSensor
 
@@ -48,7 +49,8 @@ class ECSensorIsolator:
         logger.debug("EC isolation ON")
         self.switch_power(self.ON)
         # Short pause to let electricity dissipate
-        time.sleep(1)
+        with spans.span('ECSensor.isolation'):
+            clock.sleep(1)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Disable isolation."""
@@ -77,6 +79,7 @@ class ECSensor(AnalogInterface):
     MAX_VOLTS = 3.3
     V0_OFFSET = 0
     DECIMAL_POINTS = None
+    READ_TOLERANCE = 20
 
     isolation = ECSensorIsolator
 
@@ -98,7 +101,17 @@ class ECSensor(AnalogInterface):
         # Worth doing with pipe temperature?
         ts = PipeTemperatureSensor()
         t = ts.read()
+        if t is None:
+            logger.warning("No temperature reading - EC not corrected")
+            return value
         # Polynomial function between temperature and EC offset
         offset = self.TC_A * t ** self.TC_E + self.TC_B * t + self.TC_C
         logger.debug(f"Offset EC value {value} at {t}{ts.UNIT}: {offset}")
         return value + offset
+
+    def read_untransform(self, value):
+        """Remove temperature correction from a true EC value."""
+        t = PipeTemperatureSensor().read()
+        if t is None:
+            return value
+        return value - (self.TC_A * t ** self.TC_E + self.TC_B * t + self.TC_C)
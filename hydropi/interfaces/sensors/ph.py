@@ -25,9 +25,9 @@ import os
 import time
 import json
 import logging
-import statistics
 
 from hydropi.config import config
+from hydropi.instrument import spans
 from .temperature import PipeTemperatureSensor
 from .analog import AnalogInterface
 from .ec import ECSensor
@@ -50,11 +50,13 @@ class PHSensor(AnalogInterface):
     MAX_VOLTS = 3.3
     DECIMAL_POINTS = 2
     DEFAULT_MEDIAN_SAMPLES = 25
+    READ_TOLERANCE = 0.02
 
     # Calibration
-    CALIBRATE_REPLICATES = 5
+    CALIBRATE_REPLICATES = 3
     CALIBRATE_INTERVAL_SECONDS = 2
     CALIBRATE_TOLERANCE = 0.002  # volts
+    CALIBRATE_MAX_SAMPLES = 500
     CALIBRATE_STANDARDS = (4.0, 6.86)
     CALIBRATION_CONFIGFILE = os.path.join(
         config.CONFIG_DIR,
@@ -74,6 +76,7 @@ class PHSensor(AnalogInterface):
         super().__init__()
         self.M, self.C = self._get_coefficients()
 
+    @spans.timed
     def read(self, *args, **kwargs):
         """Override super.read to use ECSensor's isolation switch."""
         with ECSensor.isolation():
@@ -84,11 +87,21 @@ class PHSensor(AnalogInterface):
         # Worth doing with pipe temperature?
         ts = PipeTemperatureSensor()
         t = ts.read()
+        if t is None:
+            logger.warning("No temperature reading - pH not corrected")
+            return value
         # Linear function between temperature and pH offset
         offset = self.TC_M * t + self.TC_C
         logger.debug(f"Offset pH value {value} at {t}{ts.UNIT}: {offset}")
         return value + offset
 
+    def read_untransform(self, value):
+        """Remove temperature correction from a true pH value."""
+        t = PipeTemperatureSensor().read()
+        if t is None:
+            return value
+        return value - (self.TC_M * t + self.TC_C)
+
     def calibrate(self):
         """Calibrate the sensor with standard solutions (pH 4.0 & 6.86).
 
@@ -108,32 +121,37 @@ class PHSensor(AnalogInterface):
 
     def _volts_to_units(self, v):
         """Override units calculation with linear equation."""
-        logger.debug("Calculate volts to units with pH linear equation")
+        self.tracer.debug("Calculate volts to units with pH linear equation")
         return self.M * v + self.C
 
-    def _take_voltage_median(self, n=None):
-        """Return median voltage from <n> samples."""
-        n = n or self.DEFAULT_MEDIAN_SAMPLES
-        data = []
-        for i in range(n):
-            data.append(self.get_value(as_volts=True))
-            time.sleep(self.MEDIAN_INTERVAL_SECONDS)
-        return statistics.median(data)
+    def _units_to_volts(self, units):
+        """Invert the pH linear equation."""
+        return (units - self.C) / self.M
 
     def _take_calibration_reading(self, standard):
-        """Wait for sensor to settle and take a reading."""
-        readings = [self._take_voltage_median()]
+        """Wait for sensor to settle and take a reading.
+
+        Each replicate is sampled adaptively to within half the calibration
+        tolerance. The sensor has settled when the last CALIBRATE_REPLICATES
+        replicates agree within the tolerance.
+        """
+        readings = []
         while True:
-            time.sleep(self.CALIBRATE_INTERVAL_SECONDS)
-            readings.append(self._take_voltage_median())
+            volts, n, error = self.sample_volts(
+                self.CALIBRATE_TOLERANCE / 2,
+                max_n=self.CALIBRATE_MAX_SAMPLES)
+            if volts is None:
+                raise RuntimeError(
+                    f"CALIBRATE pH {standard}: no valid samples from sensor")
+            readings.append(volts)
             logger.info(
-                f"CALIBRATE pH {standard}: Read {round(readings[-1], 4)}v")
-            if len(readings) < self.CALIBRATE_REPLICATES:
-                continue
-            variance = max(readings[-5:]) - min(readings[-5:])
-            if variance > self.CALIBRATE_TOLERANCE:
-                continue
-            return readings[-1]
+                f"CALIBRATE pH {standard}: Read {round(volts, 4)}v"
+                f" (n={n}, ±{error:.4f}v)")
+            recent = readings[-self.CALIBRATE_REPLICATES:]
+            if (len(recent) == self.CALIBRATE_REPLICATES
+                    and max(recent) - min(recent) <= self.CALIBRATE_TOLERANCE):
+                return volts
+            time.sleep(self.CALIBRATE_INTERVAL_SECONDS)
 
     def _set_new_calibration(self, data):
         """Calculate and set new coefficients for pH reading equation."""
@@ -22,6 +22,7 @@ class PressureSensor(AnalogInterface):
     MAX_VOLTS = 3.3
     V0_OFFSET = -0.006152
     DECIMAL_POINTS = None
+    READ_TOLERANCE = 1
     CHANNEL = config.CHANNEL_PRESSURE
 
     def __init__(self):
@@ -30,9 +31,16 @@ class PressureSensor(AnalogInterface):
         self.RANGE_UPPER = config.MAX_PRESSURE_PSI
         super().__init__()
 
-    def get_tank_volume(self):
-        """Estimate tank volume in litres based on the current pressure."""
-        psi = self.read()
+    def get_tank_volume(self, psi=None):
+        """Estimate tank volume in litres based on the current pressure.
+
+        Pressure is read unless given as <psi>. Return None if the sensor
+        is faulty.
+        """
+        if psi is None:
+            psi = self.read()
+        if psi is None:
+            return None
         try:
             litres = (
                 config.PRESSURE_TANK_VOLUME_L
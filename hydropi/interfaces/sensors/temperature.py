@@ -2,11 +2,13 @@
 
 import os
 import time
-import random
 import logging
 
+from hydropi import clock
 from hydropi.config import config
+from hydropi.instrument import health, metrics, spans
 from hydropi.notifications import telegram
+from hydropi.simulation import get_plant
 from .analog import AnalogInterface
 
 logger = logging.getLogger('hydropi')
@@ -26,9 +28,21 @@ class PipeTemperatureSensor():
     DEVICE = '/sys/bus/w1/devices/28-01131b576dcc/w1_slave'
     DECIMAL_POINTS = 1
     W1_MAX_RETRY = 5
+    HEALTH_RAILS = (-55, 85)        # DS18B20 range limits / power-on value
+    HEALTH_EXPECTED_C = (-10, 70)
+    HEALTH_FLAT_SAMPLES = 500
+    HEALTH_FLAT_SECONDS = 43200     # 0.1°C readings repeat when stable
+    HEALTH_PROBE_SECONDS = 600
 
     def __init__(self):
         """Initialize interface."""
+        self.health = health.get(
+            type(self).__name__,
+            rails=self.HEALTH_RAILS,
+            expected=self.HEALTH_EXPECTED_C,
+            flat_samples=self.HEALTH_FLAT_SAMPLES,
+            flat_seconds=self.HEALTH_FLAT_SECONDS,
+            rail_samples=3)
         if config.DEVMODE:
             return logger.warning("DEVMODE: spoofed w1 interface")
         if not os.path.exists(self.DEVICE):
@@ -38,21 +52,41 @@ class PipeTemperatureSensor():
                 f' {self.PIN}, run:\n'
                 f'$ sudo dtoverlay w1-gpio gpiopin={self.PIN} pullup=0')
 
+    @spans.timed
     def read(self):
         """Read temperature."""
+        started = time.perf_counter()
+        if (self.health.faulty
+                and not self.health.probe_due(self.HEALTH_PROBE_SECONDS)):
+            logger.debug(
+                f"{type(self).__name__} READ skipped: sensor faulty"
+                f" {sorted(self.health.flags)}")
+            return None
+        value = self._read()
+        self.health.observe(value)
+        if self.health.faulty:
+            return None
+        metrics.observe_read(type(self).__name__, value, started)
+        return value
+
+    def _read(self):
+        """Read temperature from the OneWire interface."""
         try:
             if config.DEVMODE:
-                logger.warning("DEVMODE: spoofed temperature reading")
-                return round(random.uniform(18, 45), self.DECIMAL_POINTS)
+                with spans.sample():
+                    return round(
+                        get_plant().pipe_temperature_c, self.DECIMAL_POINTS)
             retries = 0
             while True:
-                with open(self.DEVICE) as f:
-                    content = f.read()
+                with spans.sample():
+                    with open(self.DEVICE) as f:
+                        content = f.read()
                 if not content.strip(' \n'):
                     # Device returned null - retry
-                    time.sleep(0.5)
+                    clock.sleep(0.5)
                     if retries <= self.W1_MAX_RETRY:
                         retries += 1
+                        spans.add(retries=1)
                         continue
                 logger.debug(f"READ temperature:\n{content}")
                 data = content.split('\n')[1].split('t=')[1]
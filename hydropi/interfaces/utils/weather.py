@@ -1,8 +1,20 @@
-"""Not really a sensor, but getting atmospheric pressure from an API."""
+"""Not really a sensor, but getting atmospheric pressure from an API.
 
+All WeatherAPI instances share one pooled HTTP session and one cached
+reading. WeatherAPI.com refreshes current conditions every 15 minutes, so a
+reading is reused until the next expected update rather than requested on
+every depth read.
+
+Set WEATHER_API_STUB in config.yml to read from a local stub server instead
+of the real API (see weather_stub.py).
+"""
+
+import time
 import logging
-import requests
+from threading import Lock
+
 from hydropi.config import config
+from hydropi.instrument import spans
 from hydropi.process.errors import catchme
 
 logger = logging.getLogger('hydropi')
@@ -13,18 +25,79 @@ class WeatherAPI:
 
     BASE_URL = "https://api.weatherapi.com/v1/current.json"
     CITY = "Mooloolaba"
+    TIMEOUT_SECONDS = (3.05, 10)    # (connect, read)
+    UPDATE_INTERVAL_SECONDS = 900   # API refreshes current data every 15 min
+    MIN_CACHE_SECONDS = 60          # Don't re-request more often than this
+    STALE_MAX_SECONDS = 3600        # Fall back to cached data up to this age
+
+    session = None                  # Created on first request
+    stub = None
+    _cache = {}
+    _lock = Lock()
 
     def __init__(self):
         self.API_KEY = config.WEATHER_API_KEY
+        if (config.yml.get('WEATHER_API_STUB', False)
+                and WeatherAPI.stub is None):
+            from .weather_stub import WeatherStubServer
+            WeatherAPI.stub = WeatherStubServer()
+            WeatherAPI.BASE_URL = WeatherAPI.stub.start()
+            logger.warning(f"Using WeatherAPI stub server: {self.BASE_URL}")
 
-    @catchme(retry=3, notify=False)
+    @spans.timed
     def get_ambient_pressure_hpa(self):
         """Return current pressure in hPa."""
-        r = requests.get(self.BASE_URL, params={
-            'key': self.API_KEY,
-            'q': self.CITY,
-        })
+        if config.DEVMODE and WeatherAPI.stub is None:
+            # Simulated plant, unless a stub server stands in for the API
+            from hydropi.simulation import get_plant
+            return get_plant().AMBIENT_HPA
+        with self._lock:
+            cache = WeatherAPI._cache
+            now = time.time()
+            if cache and now < cache['expires']:
+                logger.debug("WeatherAPI: return cached pressure")
+                return cache['hpa']
+            hpa = self._fetch_pressure_hpa()
+            if hpa is None and cache:
+                age = now - cache['fetched']
+                if age < self.STALE_MAX_SECONDS:
+                    logger.warning(
+                        "WeatherAPI request failed - using cached pressure"
+                        f" from {round(age / 60)} minutes ago")
+                    return cache['hpa']
+            return hpa
+
+    @catchme(retry=2, notify=False)
+    def _fetch_pressure_hpa(self):
+        """Request current pressure from the API and update the cache."""
+        if WeatherAPI.session is None:
+            import requests
+            WeatherAPI.session = requests.Session()
+        with spans.bus_wait():
+            r = self.session.get(
+                self.BASE_URL,
+                params={
+                    'key': self.API_KEY,
+                    'q': self.CITY,
+                },
+                timeout=self.TIMEOUT_SECONDS,
+            )
         try:
-            return r.json()['current']['pressure_mb']
+            r.raise_for_status()
+            current = r.json()['current']
+            hpa = current['pressure_mb']
         except Exception as exc:
             logger.error(f"Error fetching data from WeatherAPI: {exc}")
+            return
+
+        now = time.time()
+        updated = current.get('last_updated_epoch', now)
+        WeatherAPI._cache = {
+            'hpa': hpa,
+            'fetched': now,
+            'expires': max(
+                now + self.MIN_CACHE_SECONDS,
+                updated + self.UPDATE_INTERVAL_SECONDS,
+            ),
+        }
+        return hpa
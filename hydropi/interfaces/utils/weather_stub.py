@@ -0,0 +1,95 @@
+"""A local stand-in for the WeatherAPI.com current conditions endpoint.
+
+Serves a fixed (or updatable) ambient pressure so that depth readings can be
+exercised without network access or an API key:
+
+    stub = WeatherStubServer(pressure_mb=1013.0)
+    url = stub.start()
+    ...
+    stub.pressure_mb = 1008.5
+    stub.stop()
+
+Or run standalone:
+
+    $ python -m hydropi.interfaces.utils.weather_stub --port 8099
+"""
+
+import json
+import time
+from threading import Thread
+from argparse import ArgumentParser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class WeatherStubServer:
+    """Serve current.json responses from a background thread."""
+
+    def __init__(self, pressure_mb=1013.25, host='127.0.0.1', port=0):
+        """Create server. Port 0 binds to any free port."""
+        self.pressure_mb = pressure_mb
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.httpd = None
+
+    def __enter__(self):
+        """Start server in context."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Stop server on exiting context."""
+        self.stop()
+
+    @property
+    def url(self):
+        """Return URL of the current.json endpoint."""
+        return f"http://{self.host}:{self.port}/v1/current.json"
+
+    def start(self):
+        """Start serving and return the endpoint URL."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                body = json.dumps({
+                    'current': {
+                        'pressure_mb': stub.pressure_mb,
+                        'last_updated_epoch': int(time.time()),
+                    },
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.httpd.server_address[1]
+        Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        """Stop serving."""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+if __name__ == '__main__':
+    ap = ArgumentParser(description='Run a stub WeatherAPI server.')
+    ap.add_argument('--port', type=int, default=8099)
+    ap.add_argument('--pressure', type=float, default=1013.25)
+    args = ap.parse_args()
+    stub = WeatherStubServer(pressure_mb=args.pressure, port=args.port)
+    print(f"Serving stub WeatherAPI at {stub.start()}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
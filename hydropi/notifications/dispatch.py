@@ -0,0 +1,221 @@
+"""Deliver notifications from a background thread.
+
+Callers hand a message to Dispatcher.submit(), which never blocks. A single
+sender thread then:
+
+- Sends each new message immediately, no faster than one per
+  min_interval seconds.
+- Merges repeats of a message that arrive within merge_window seconds of the
+  first, and sends one summary of the repeat count when the window closes.
+- Appends messages that could not be sent (or did not fit in the queue) to an
+  on-disk outbox, which is retried when the thread starts and after each
+  successful send.
+
+Call start() at startup to retry the outbox left by a previous run. The
+outbox lock is only held to read or write the file, never while sending, so
+submit() doesn't wait on the network even when the queue is full.
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+from queue import Queue, Empty, Full
+from threading import Event, Thread, Lock
+
+logger = logging.getLogger('hydropi')
+
+_STOP = object()  # Queued to wake the sender thread on stop
+
+
+class Dispatcher:
+    """Queue and send messages through a send function."""
+
+    OUTBOX_MAX_MESSAGES = 500
+    STOP_TIMEOUT_SECONDS = 5    # Wait for the sender thread on exit
+
+    def __init__(self, send, outbox_path, maxsize=100, min_interval=1,
+                 merge_window=600):
+        """Create dispatcher.
+
+        <send> is called as send(message) from the sender thread and should
+        raise an exception if the message was not delivered.
+        """
+        self.send = send
+        self.outbox_path = outbox_path
+        self.min_interval = min_interval
+        self.merge_window = merge_window
+        self.queue = Queue(maxsize)
+        self.recent = {}  # message: [first_seen, repeat_count]
+        self.last_sent = 0
+        self.lock = Lock()          # Guards self.recent
+        self.outbox_lock = Lock()
+        self.stopping = Event()
+        self.thread = None
+
+    def submit(self, message):
+        """Queue a message for delivery."""
+        self.start()
+        try:
+            self.queue.put_nowait(message)
+        except Full:
+            logger.warning("Notification queue full - writing to outbox")
+            self._write_outbox([message])
+
+    def start(self):
+        """Start the sender thread if not yet running.
+
+        The thread first retries messages left in the outbox.
+        """
+        if self.thread is None:
+            self.thread = Thread(
+                target=self._run, name='notifications', daemon=True)
+            self.thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the sender thread and move undelivered messages to outbox."""
+        self.stopping.set()
+        try:
+            self.queue.put_nowait(_STOP)
+        except Full:
+            pass
+        if self.thread is not None:
+            self.thread.join(self.STOP_TIMEOUT_SECONDS)
+        pending = []
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except Empty:
+                break
+            if message is not _STOP:
+                pending.append(message)
+        with self.lock:
+            pending += [
+                self._repeat_message(message, count)
+                for message, (_, count) in self.recent.items() if count
+            ]
+            self.recent = {}
+        if pending:
+            self._write_outbox(pending)
+
+    def _run(self):
+        """Send queued messages until stopped."""
+        self._flush_outbox()
+        while not self.stopping.is_set():
+            try:
+                message = self.queue.get(timeout=self._next_timeout())
+            except Empty:
+                message = None
+            if message is _STOP:
+                break
+            now = time.monotonic()
+            if message is not None:
+                with self.lock:
+                    new = message not in self.recent
+                    if new:
+                        self.recent[message] = [now, 0]
+                    else:
+                        self.recent[message][1] += 1
+                if new:
+                    self._deliver(message)
+            self._close_windows(now)
+
+    def _next_timeout(self):
+        """Return seconds until the next merge window closes."""
+        with self.lock:
+            if not self.recent:
+                return None
+            first = min(seen for seen, _ in self.recent.values())
+        return max(0, first + self.merge_window - time.monotonic())
+
+    def _close_windows(self, now):
+        """Send repeat summaries for expired merge windows."""
+        with self.lock:
+            expired = [
+                (message, count)
+                for message, (seen, count) in self.recent.items()
+                if now - seen >= self.merge_window
+            ]
+            for message, count in expired:
+                del self.recent[message]
+        for message, count in expired:
+            if count:
+                self._deliver(self._repeat_message(message, count))
+
+    def _repeat_message(self, message, count):
+        """Return summary of a repeated message."""
+        return (
+            f"{message}\n\n(Repeated {count} more time(s) within"
+            f" {self.merge_window} seconds)")
+
+    def _deliver(self, message):
+        """Send a message, or write it to the outbox on failure."""
+        if self._send(message):
+            self._flush_outbox()
+        else:
+            self._write_outbox([message])
+
+    def _send(self, message):
+        """Send a message with rate limiting and return success."""
+        wait = self.last_sent + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self.last_sent = time.monotonic()
+        try:
+            self.send(message)
+            return True
+        except Exception as exc:
+            logger.warning(f"Notification failed - saved to outbox: {exc}")
+            return False
+
+    def _write_outbox(self, messages):
+        """Append messages to the outbox file."""
+        with self.outbox_lock:
+            lines = self._read_outbox() + [
+                json.dumps({'ts': time.time(), 'text': m}) for m in messages
+            ]
+            with open(self.outbox_path, 'w') as f:
+                for line in lines[-self.OUTBOX_MAX_MESSAGES:]:
+                    f.write(line + '\n')
+
+    def _read_outbox(self):
+        """Return outbox lines."""
+        if not os.path.exists(self.outbox_path):
+            return []
+        with open(self.outbox_path) as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def _flush_outbox(self):
+        """Retry sending messages from the outbox.
+
+        The outbox is copied and released before sending, and sent lines are
+        removed afterwards, keeping any written in the meantime.
+        """
+        with self.outbox_lock:
+            lines = self._read_outbox()
+        if not lines:
+            return
+        logger.info(f"Retry {len(lines)} message(s) from outbox")
+        sent = set()
+        for line in lines:
+            try:
+                message = json.loads(line)['text']
+            except (ValueError, KeyError):
+                sent.add(line)
+                continue
+            if self.stopping.is_set() or not self._send(
+                    f"[Delayed] {message}"):
+                break
+            sent.add(line)
+        with self.outbox_lock:
+            remaining = [
+                line for line in self._read_outbox() if line not in sent]
+            if not remaining:
+                if os.path.exists(self.outbox_path):
+                    os.remove(self.outbox_path)
+                return
+            with open(self.outbox_path, 'w') as f:
+                for line in remaining:
+                    f.write(line + '\n')
@@ -1,27 +1,73 @@
-"""Telegram notifications API."""
+"""Telegram notifications API.
 
+Messages are sent from a background thread (see dispatch.Dispatcher) so that
+a slow or unreachable Telegram API never holds up sensor reads or control
+loops.
+"""
+
+import os
 import logging
-import requests
 
 from hydropi.config import config
+from hydropi.instrument import metrics
+from .dispatch import Dispatcher
 
 logger = logging.getLogger('hydropi')
 
 URL = f'https://api.telegram.org/bot{config.TELEGRAM_API_TOKEN}/sendMessage'
+TIMEOUT_SECONDS = (5, 15)       # (connect, read)
+MIN_INTERVAL_SECONDS = 1        # Telegram allows ~1 message/second per chat
+MERGE_WINDOW_SECONDS = 600      # Merge identical messages within this window
+QUEUE_MAX_MESSAGES = 100
+OUTBOX_PATH = os.path.join(config.TEMP_DIR, 'telegram.outbox.jsonl')
+
+session = None  # Created on first send, as requests is slow to import
+
+
+def send(message):
+    """Post a message to the Telegram API and raise on failure."""
+    global session
+    if session is None:
+        import requests
+        session = requests.Session()
+    r = session.post(
+        URL,
+        data={
+            'chat_id': config.TELEGRAM_CHAT_ID,
+            'text': message,
+        },
+        timeout=TIMEOUT_SECONDS,
+    )
+    r.raise_for_status()
+
+
+dispatcher = Dispatcher(
+    send,
+    OUTBOX_PATH,
+    maxsize=QUEUE_MAX_MESSAGES,
+    min_interval=MIN_INTERVAL_SECONDS,
+    merge_window=MERGE_WINDOW_SECONDS,
+)
+
+metrics.gauge(
+    'hydropi_notification_queue_depth',
+    "Telegram notifications waiting to be sent.",
+    collect=lambda: {(): dispatcher.queue.qsize()})
+
+
+def start():
+    """Start the sender, retrying messages left over from the last run."""
+    if config.DEVMODE or not config.TELEGRAM_CHAT_ID:
+        return
+    dispatcher.start()
 
 
 def notify(message):
-    """Send a message over the Telegram API."""
+    """Queue a message to be sent over the Telegram API."""
     if config.DEVMODE:
         return print(f"DEVMODE: spoof telegram message\n{message}")
     if not config.TELEGRAM_CHAT_ID:
         return logger.info(
             "Telegram notification skipped: no credentials set"
             " in config.yml")
-    requests.post(
-        URL,
-        data={
-            'chat_id': config.TELEGRAM_CHAT_ID,
-            'text': message,
-        },
-    )
+    dispatcher.submit(message)
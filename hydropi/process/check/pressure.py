@@ -1,25 +1,45 @@
-"""Check the nutrient pressure tank level and adjust with pressure pump."""
+"""Check the nutrient pressure tank level and adjust with pressure pump.
+
+Besides restoring pressure when it falls below the lower limit, refills are
+scheduled ahead of time from the consumption forecast (see
+pressure_forecast), at the latest safe moment before pressure is predicted to
+run low or before quiet time starts. A refill due before the next sweep is
+started from a timer thread.
+"""
 
 import logging
-from threading import Thread
+from threading import Lock, Thread
 
 # import notifications
+from hydropi import clock
+from hydropi.config import config
+from hydropi.process import pause
 from hydropi.process.check.time import is_quiet_time
+from hydropi.process.check.pressure_forecast import forecast
+from hydropi.process.volume import estimator
 from hydropi.interfaces.sensors.pressure import PressureSensor
-from hydropi.interfaces.controllers.pressure import PressurePumpController
+from hydropi.interfaces.controllers.pressure import (
+    PressurePumpController,
+    PumpCurve,
+)
 from hydropi.process.errors import catchme
 
 logger = logging.getLogger('hydropi')
 
+_refill_lock = Lock()
+_schedule = {'generation': 0}
+
 
 @catchme
 def level():
     """Check pressure level."""
     ps = PressureSensor()
-    stat = ps.read(n=5)
+    stat = ps.read()
 
     if stat is None:
         return
+    forecast.record_reading(stat)
+    estimator.update_pressure_tank(ps.get_tank_volume(stat))
 
     if stat < ps.RANGE_LOWER:
         if stat < ps.DANGER_LOWER:
@@ -37,9 +57,8 @@ def level():
             "System pressure above lower limit of"
             f" {ps.RANGE_LOWER}{ps.UNIT}")
 
-    if stat < ps.RANGE_UPPER and is_quiet_time(within_minutes=15):
-        logger.info("Quiet time approaching.")
-        return restore(stat)
+    if stat < ps.RANGE_UPPER:
+        schedule_refill(stat)
 
     if stat > ps.DANGER_UPPER:
         message = f"System pressure above ALERT level: {stat}{ps.UNIT}"
@@ -57,6 +76,68 @@ def restore(stat):
         return stat
 
     logger.info("Restoring system pressure.")
-    pump = PressurePumpController()
-    Thread(target=pump.refill).start()
+    _schedule['generation'] += 1
+    Thread(target=_refill).start()
     return stat
+
+
+def _refill():
+    """Run a pressure refill, unless one is already running."""
+    if not _refill_lock.acquire(blocking=False):
+        logger.info("Pressure refill already in progress.")
+        return
+    try:
+        forecast.record_refill()
+        PressurePumpController().refill()
+    finally:
+        _refill_lock.release()
+
+
+def refill_seconds():
+    """Return expected seconds to refill from the forecast low threshold."""
+    psi_start = config.MIN_PRESSURE_PSI + forecast.SAFETY_PSI
+    psi_target = (
+        config.MAX_PRESSURE_PSI + PressurePumpController.TARGET_MARGIN_PSI)
+    seconds = PumpCurve().duration(psi_start, psi_target)
+    if seconds is None:
+        return config.PRESSURE_REFILL_DURATION_SECONDS
+    return seconds
+
+
+def schedule_refill(stat):
+    """Schedule a refill from the consumption forecast.
+
+    A refill due before the next sweep is started from a timer thread, which
+    is cancelled if a later sweep reschedules. Otherwise the next sweep will
+    reschedule with a fresh reading.
+    """
+    due = forecast.next_refill(stat, clock.now(), refill_seconds())
+    if due is None:
+        return
+    delay = (due - clock.now()).total_seconds()
+    if delay <= 0:
+        logger.info("Pressure forecast: refill due now.")
+        return restore(stat)
+    if delay > 60 * config.SWEEP_CYCLE_MINUTES:
+        logger.debug(
+            f"Pressure forecast: next refill due at {due.strftime('%H:%M')}")
+        return
+    logger.info(
+        f"Pressure forecast: refill scheduled for {due.strftime('%H:%M')}")
+    _schedule['generation'] += 1
+    Thread(
+        target=_scheduled_refill,
+        args=(_schedule['generation'], delay),
+        daemon=True,
+    ).start()
+
+
+def _scheduled_refill(generation, delay):
+    """Wait <delay> seconds, then refill unless rescheduled or paused."""
+    clock.sleep(delay)
+    if generation != _schedule['generation']:
+        return
+    if pause.paused():
+        logger.info("Skip scheduled pressure refill while paused")
+        return
+    restore(None)
@@ -0,0 +1,199 @@
+"""Forecast pressure tank consumption to schedule refills.
+
+Pressure falls with each mist release, and slowly otherwise (e.g. small
+leaks). PressureForecast learns both rates from the pressure readings taken
+at each sweep and the mist seconds delivered in between:
+
+    psi_drop = psi_per_mist_second * mist_seconds + psi_per_hour * hours
+
+Projecting forward with the mist schedule for day and quiet time, it
+predicts when pressure will reach the lower limit, and plans a refill at the
+latest safe moment before then. The pump doesn't run during quiet time, so
+if pressure is predicted to run low overnight, the refill is planned to
+finish just before quiet time starts.
+"""
+
+import os
+import json
+import logging
+from threading import Lock
+from datetime import timedelta
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.process.check.time import schedule as quiet_schedule
+from hydropi.interfaces.controllers.mist_zones import setting, zones
+
+logger = logging.getLogger('hydropi')
+
+
+class PressureForecast:
+    """Learned pressure consumption model."""
+
+    SMOOTHING = 0.1                     # Weight of each new observation
+    DEFAULT_PSI_PER_MIST_SECOND = 0.5
+    DEFAULT_PSI_PER_HOUR = 0
+    SAFETY_PSI = 5                      # Keep above MIN_PRESSURE_PSI by this
+    LEAD_MARGIN_SECONDS = 120           # Start refill this early
+    STEP_MINUTES = 5
+    HORIZON_HOURS = 24
+    MODEL_CONFIGFILE = os.path.join(
+        config.CONFIG_DIR,
+        'calibration/pressure/consumption.json')
+
+    def __init__(self, path=MODEL_CONFIGFILE, schedule=quiet_schedule):
+        """Load model from file."""
+        self.path = path
+        self.schedule = schedule
+        self.lock = Lock()
+        self.psi_per_mist_second = self.DEFAULT_PSI_PER_MIST_SECOND
+        self.psi_per_hour = self.DEFAULT_PSI_PER_HOUR
+        self.last_psi = None
+        self.last_mono = None
+        self.mist_seconds = 0
+        self._load()
+
+    def _load(self):
+        """Read learned rates from file."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.psi_per_mist_second = data['psi_per_mist_second']
+            self.psi_per_hour = data['psi_per_hour']
+        except Exception:
+            logger.warning("Error loading pressure forecast - removing file")
+            os.remove(self.path)
+
+    def _save(self):
+        """Write learned rates to file."""
+        config_dir = os.path.dirname(self.path)
+        if not os.path.exists(config_dir):
+            os.makedirs(config_dir)
+        with open(self.path, 'w') as f:
+            json.dump({
+                'psi_per_mist_second': self.psi_per_mist_second,
+                'psi_per_hour': self.psi_per_hour,
+            }, f)
+
+    # Observations
+    # -------------------------------------------------------------------------
+
+    def record_mist(self, seconds):
+        """Record a mist release of <seconds>."""
+        with self.lock:
+            self.mist_seconds += seconds or 0
+
+    def record_refill(self):
+        """Forget the last reading, since the pump has changed pressure."""
+        with self.lock:
+            self.last_psi = None
+
+    def record_reading(self, psi):
+        """Learn consumption since the last pressure reading."""
+        now = clock.monotonic()
+        with self.lock:
+            last_psi, last_mono = self.last_psi, self.last_mono
+            mist_seconds = self.mist_seconds
+            self.last_psi, self.last_mono = psi, now
+            self.mist_seconds = 0
+            if last_psi is None or psi is None or psi > last_psi:
+                return
+            hours = (now - last_mono) / 3600
+            if hours <= 0:
+                return
+            drop = last_psi - psi
+            a = self.SMOOTHING
+            if mist_seconds:
+                rate = max(drop - self.psi_per_hour * hours, 0) / mist_seconds
+                self.psi_per_mist_second += a * (
+                    rate - self.psi_per_mist_second)
+            else:
+                self.psi_per_hour += a * (drop / hours - self.psi_per_hour)
+            self._save()
+        logger.debug(
+            "Pressure forecast: consumption"
+            f" {self.psi_per_mist_second:.3f} PSI per mist second,"
+            f" {self.psi_per_hour:.3f} PSI per hour")
+
+    # Prediction
+    # -------------------------------------------------------------------------
+
+    def mist_seconds_per_hour(self, quiet):
+        """Return scheduled mist seconds per hour of all zones."""
+        if quiet:
+            duration, interval = (
+                'MIST_DURATION_NIGHT_SECONDS', 'MIST_INTERVAL_NIGHT_MINUTES')
+        else:
+            duration, interval = (
+                'MIST_DURATION_SECONDS', 'MIST_INTERVAL_MINUTES')
+        return sum(
+            setting(zone, duration) * 60 / setting(zone, interval)
+            for zone in zones())
+
+    def psi_per_step(self, dt):
+        """Return predicted pressure drop over the step starting at <dt>."""
+        hours = self.STEP_MINUTES / 60
+        quiet = self.schedule.is_quiet_at(dt)
+        return hours * (
+            self.psi_per_mist_second * self.mist_seconds_per_hour(quiet)
+            + self.psi_per_hour)
+
+    def trajectory(self, psi, now, hours=HORIZON_HOURS):
+        """Yield (datetime, psi) at each step over the next <hours>."""
+        step = timedelta(minutes=self.STEP_MINUTES)
+        dt = now
+        for i in range(int(hours * 60 / self.STEP_MINUTES)):
+            yield dt, psi
+            psi -= self.psi_per_step(dt)
+            dt += step
+
+    def next_refill(self, psi, now, refill_seconds):
+        """Return datetime to start the next refill, or None if not due.
+
+        <refill_seconds> is the expected duration of the refill.
+        """
+        low = config.MIN_PRESSURE_PSI + self.SAFETY_PSI
+        lead = timedelta(seconds=refill_seconds + self.LEAD_MARGIN_SECONDS)
+        self.schedule.is_quiet()  # Parse live config if due
+        if self.schedule.is_quiet_at(now):
+            return None
+
+        quiet_start = self.schedule.next_transition_after(now)
+        previous = None
+        for dt, predicted in self.trajectory(psi, now):
+            if predicted > low:
+                previous = dt, predicted
+                continue
+            if previous:
+                # Interpolate crossing within the step
+                prev_dt, prev_psi = previous
+                dt = prev_dt + (dt - prev_dt) * (
+                    (prev_psi - low) / (prev_psi - predicted))
+            if quiet_start is None or dt < quiet_start:
+                # Runs low during the day
+                return dt - lead
+            quiet_end = self.schedule.next_transition_after(quiet_start)
+            if dt < quiet_end:
+                # Would run low overnight - fill up just before quiet time
+                self._warn_if_short(quiet_start, quiet_end)
+                return quiet_start - lead
+            # Lasts until the end of quiet time
+            return None
+        return None
+
+    def _warn_if_short(self, quiet_start, quiet_end):
+        """Warn if a full tank won't last through quiet time."""
+        psi = config.MAX_PRESSURE_PSI
+        hours = (quiet_end - quiet_start).total_seconds() / 3600
+        for dt, predicted in self.trajectory(psi, quiet_start, hours):
+            if predicted < config.MIN_PRESSURE_PSI:
+                logger.warning(
+                    "Pressure forecast: a full tank is predicted to fall"
+                    f" below {config.MIN_PRESSURE_PSI}PSI by"
+                    f" {dt.strftime('%H:%M')} during quiet time")
+                return
+
+
+forecast = PressureForecast()
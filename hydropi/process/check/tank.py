@@ -1,4 +1,8 @@
-"""Check nutrient solution tank depth."""
+"""Check nutrient solution tank depth.
+
+Total volume is taken from the volume estimator, which is corrected with a
+depth reading only when the reservoir estimate has become uncertain.
+"""
 
 import logging
 from threading import Thread
@@ -8,18 +12,29 @@ from hydropi.interfaces.sensors.depth import DepthSensor
 from hydropi.interfaces.controllers.water import WaterController
 from hydropi.notifications import telegram
 from hydropi.process.errors import catchme
+from hydropi.process.volume import estimator
 
 logger = logging.getLogger('hydropi')
 
+DEPTH_SAMPLES = 3  # Fewer than DepthSensor default, as filtered by estimator
+
 
 @catchme
 def depth():
     """Check tank depth."""
     sensor = DepthSensor()
-    stat = sensor.read()
-
-    if stat is None:
-        return
+    estimator.predict()
+    if estimator.needs_reservoir_reading():
+        litres = sensor.read(
+            n=DEPTH_SAMPLES,
+            include_pressure_tank=False)
+        if litres is None:
+            return
+        estimator.update_reservoir(litres)
+    else:
+        logger.debug("Skip depth reading: volume estimate is confident")
+    stat = round(estimator.total(), sensor.DECIMAL_POINTS)
+    logger.info(f"Estimated total volume: {stat}{sensor.UNIT}")
 
     if stat < sensor.DANGER_LOWER_L and stat > 0:
         telegram.notify(
@@ -1,21 +1,134 @@
-"""Check if quiet time."""
+"""Check if quiet time.
 
+QUIET_TIME_START and QUIET_TIME_END are parsed once into a QuietSchedule,
+which precomputes the next transition (quiet time starting or ending). Until
+that instant, checking quiet time is a single monotonic clock comparison.
+Config is re-read at most every REFRESH_SECONDS so that live config changes
+are still picked up.
+
+The window may cross midnight (e.g. 20:00 -> 07:00). Transitions are
+converted from local wall time with the system timezone rules, so they land
+on the correct instant across daylight saving changes.
+"""
+
+from threading import Lock
 from datetime import datetime, timedelta
+
+from hydropi import clock
 from hydropi.config import config
 
+TIME_FORMAT = "%H:%M"
+
+
+class QuietSchedule:
+    """Daily quiet time window with precomputed transitions."""
+
+    REFRESH_SECONDS = 60
+
+    def __init__(self, start=None, end=None):
+        """Create schedule.
+
+        Start and end are HH:MM strings. If not given they are read from
+        config (and re-read periodically).
+        """
+        self.live = start is None
+        self.start = self.end = None
+        self._quiet = False
+        self._next_transition = None
+        self._next_transition_mono = 0
+        self._refresh_mono = 0
+        self._lock = Lock()
+        if not self.live:
+            self._parse(start, end)
+
+    def _parse(self, start, end):
+        """Parse window start and end from HH:MM strings."""
+        self.start = datetime.strptime(start, TIME_FORMAT).time()
+        self.end = datetime.strptime(end, TIME_FORMAT).time()
+
+    def is_quiet_at(self, dt):
+        """Return True if the given local datetime is within quiet time."""
+        t = dt.time()
+        if self.start == self.end:
+            return False
+        if self.start < self.end:
+            return self.start <= t < self.end
+        # Window crosses midnight
+        return t >= self.start or t < self.end
+
+    def next_transition_after(self, dt):
+        """Return the local datetime of the next start or end after <dt>."""
+        if self.start == self.end:
+            return None
+        t = self.end if self.is_quiet_at(dt) else self.start
+        candidate = datetime.combine(dt.date(), t)
+        if candidate <= dt:
+            candidate += timedelta(days=1)
+        return candidate
+
+    def _update(self):
+        """Recompute state if a transition or refresh is due."""
+        mono = clock.monotonic()
+        if (mono < self._next_transition_mono
+                and mono < self._refresh_mono):
+            return
+        with self._lock:
+            if self.live:
+                self._parse(config.QUIET_TIME_START, config.QUIET_TIME_END)
+                self._refresh_mono = mono + self.REFRESH_SECONDS
+            else:
+                self._refresh_mono = float('inf')
+            now = clock.now()
+            self._quiet = self.is_quiet_at(now)
+            self._next_transition = self.next_transition_after(now)
+            if self._next_transition is None:
+                self._next_transition_mono = float('inf')
+            else:
+                # Wall time -> monotonic so that clock adjustments (NTP, DST)
+                # between now and the transition don't skew comparisons
+                self._next_transition_mono = mono + (
+                    self._next_transition.timestamp() - clock.timestamp())
+
+    def is_quiet(self):
+        """Return True if currently within quiet time."""
+        self._update()
+        return self._quiet
+
+    def next_transition(self):
+        """Return local datetime when quiet time next starts or ends."""
+        self._update()
+        return self._next_transition
+
+    def seconds_until_transition(self):
+        """Return seconds until quiet time next starts or ends."""
+        self._update()
+        return max(0, self._next_transition_mono - clock.monotonic())
+
+    def minutes_until_quiet(self):
+        """Return minutes until quiet time starts (0 if already quiet)."""
+        if self.is_quiet():
+            return 0
+        return self.seconds_until_transition() / 60
+
+    def sleep_until_transition(self):
+        """Sleep until quiet time next starts or ends."""
+        seconds = self.seconds_until_transition()
+        if seconds != float('inf'):
+            clock.sleep(seconds)
+
+
+schedule = QuietSchedule()
+
 
 def is_quiet_time(within_minutes=0):
-    """Check whether we are currently in quiet time."""
-    now = datetime.now()
-    today = now.strftime("%Y-%m-%d")
-    quiet_start = datetime.strptime(
-        f'{today} {config.QUIET_TIME_START}', "%Y-%m-%d %H:%M")
-    quiet_end = datetime.strptime(
-        f'{today} {config.QUIET_TIME_END}', "%Y-%m-%d %H:%M")
+    """Check whether we are currently in quiet time.
 
+    With <within_minutes>, check instead whether quiet time is due to start
+    within that many minutes.
+    """
     if within_minutes:
-        # Calculate whether quiet time is starting within n minutes
-        quiet_start_within = quiet_start - timedelta(minutes=within_minutes)
-        return now > quiet_start_within and now < quiet_start
-
-    return now > quiet_start or now < quiet_end
+        return (
+            not schedule.is_quiet()
+            and schedule.minutes_until_quiet() < within_minutes
+        )
+    return schedule.is_quiet()
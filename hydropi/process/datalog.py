@@ -0,0 +1,51 @@
+"""Maintain datalog partitions, rollups and retention in the background.
+
+See hydropi.config.datalog for the storage layout.
+"""
+
+import logging
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.config.db import DB
+from hydropi.config.datalog import DatalogStore
+from hydropi.process.errors import catchme
+
+logger = logging.getLogger('hydropi')
+
+INTERVAL_SECONDS = 6 * 3600
+
+
+@catchme
+def connect():
+    """Return a datalog store with its own database connection."""
+    # Own connection, so that maintenance transactions are not interleaved
+    # with the sweep's datalog writes.
+    return DatalogStore(
+        DB(config, assert_schema=False),
+        rollup_after_days=config.DATABASE.get(
+            'DATALOG_ROLLUP_AFTER_DAYS', 31),
+        retention_months=config.DATABASE.get('DATALOG_RETENTION_MONTHS', 24),
+    )
+
+
+@catchme
+def maintain(store):
+    """Run one round of datalog maintenance."""
+    return store.maintain()
+
+
+def run():
+    """Maintain datalog storage every INTERVAL_SECONDS.
+
+    If the database can't be reached, or maintenance fails, connect again on
+    the next interval.
+    """
+    if 'DATABASE' not in config.yml:
+        return
+    store = None
+    while True:
+        store = store or connect()
+        if store and maintain(store) is None:
+            store = None
+        clock.sleep(INTERVAL_SECONDS)
@@ -1,4 +1,10 @@
-"""Perform cyclical release of nutrient solution."""
+"""Perform cyclical release of nutrient solution.
+
+Mist events are taken from the planned timetable of each zone (see
+mist_plan), so each round only waits for the next start. Each pulse runs in
+its own thread once a valve slot is free, so a zone waiting its turn doesn't
+hold up the timetable of the others.
+"""
 
 try:
     import RPi.GPIO as io
@@ -6,15 +12,16 @@ except ModuleNotFoundError:
     print("WARNING: Can't import Pi packages - assume developer mode")
     io = None
 
-import time
 import logging
+from threading import Thread
 
+from hydropi import clock
 from hydropi.config import config
-from hydropi.process.check.time import is_quiet_time
-from hydropi.process.errors import ErrorWatcher
+from hydropi.process.check.pressure_forecast import forecast
+from hydropi.process.errors import ErrorWatcher, catchme
+from hydropi.process.mist_plan import scheduler
 from hydropi.interfaces.controllers.mist import MistController
-from hydropi.interfaces import PipeTemperatureSensor
-from .pause import paused
+from . import pause
 
 logger = logging.getLogger('hydropi')
 
@@ -25,11 +32,21 @@ def mist():
     try:
         while True:
             try:
-                if paused():
+                if pause.paused():
                     logger.debug("Skip mist round while paused")
+                    pause.wait(60 * config.MIST_INTERVAL_MINUTES)
                 else:
-                    MistController().mist()
-                time.sleep(get_sleep_interval())
+                    zone, start, duration = scheduler.next_event()
+                    wait = start - clock.timestamp()
+                    if wait > 0 and pause.wait(wait):
+                        # Pause state changed - re-check before misting
+                        continue
+                    scheduler.done(zone)
+                    Thread(
+                        target=pulse,
+                        args=(zone, duration),
+                        daemon=True,
+                    ).start()
                 ew.reset()
             except Exception as exc:
                 ew.catch(exc, message="ERROR ENCOUNTERED IN DELIVERY")
@@ -40,18 +57,10 @@ def mist():
             io.cleanup()
 
 
-def get_sleep_interval():
-    """Return seconds to sleep between events."""
-    if is_quiet_time():
-        cycle_minutes = config.MIST_INTERVAL_NIGHT_MINUTES
-    else:
-        cycle_minutes = config.MIST_INTERVAL_MINUTES
-        temp = PipeTemperatureSensor().read()
-        if temp > config.MIST_BUMP_FROM_TEMPERATURE_C:
-            # Increase mist frequency as temperature rises
-            cycle_minutes = (
-                cycle_minutes
-                * (1 - config.MIST_BUMP_PER_DEGREE)
-                ** (temp - config.MIST_BUMP_FROM_TEMPERATURE_C)
-            )
-    return 60 * cycle_minutes - config.MIST_DURATION_SECONDS
+@catchme
+def pulse(zone, seconds):
+    """Mist <zone> for <seconds> once a valve slot is free."""
+    with scheduler.valves:
+        if pause.paused():
+            return logger.info(f"Skip mist of zone {zone['name']} (paused)")
+        forecast.record_mist(MistController(zone['pin']).mist(seconds))
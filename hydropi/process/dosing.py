@@ -0,0 +1,247 @@
+"""Compute EC and pH doses from tank volume and learned dose response.
+
+The change in a reading after a dose is taken to be proportional to the
+dose concentration:
+
+    delta = coefficient * ml / litres
+
+e.g. the nutrient coefficient is about 350 uS per ml/L (20ml into 10L gives
++700uS). The coefficient for each additive is fitted by least squares
+(through the origin) over past doses, pairing the reading logged before each
+dose with the first sweep reading after it has been mixed in. Older doses
+are gradually forgotten so that the fit tracks changes in stock solution.
+
+The dose aims for the middle of the target range, capped at a configured
+maximum volume. Until enough doses have been observed, doses computed from
+the default coefficient are halved so that the first doses undershoot.
+
+Only nutrient (EC below EC_MIN) and pH down (pH above PH_MAX) can be dosed.
+An additive is not dosed again until the sweep reading after its last dose
+has been observed, so that a dose still mixing in is not repeated.
+
+Sweeps only dose automatically if AUTO_DOSE is set in config.yml. Otherwise
+call restore() explicitly.
+"""
+
+import os
+import json
+import logging
+from threading import Lock, Thread
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.interfaces.controllers.ec import ECController
+from hydropi.interfaces.controllers.ph import PHController
+from hydropi.interfaces.controllers.dose import DosePlanner
+from hydropi.process.errors import catchme
+from hydropi.process.volume import estimator, RESERVOIR
+
+logger = logging.getLogger('hydropi')
+
+CALIBRATION_DIR = os.path.join(config.CONFIG_DIR, 'calibration/dose')
+
+_restoring = Lock()  # Held while a restore is dosing
+
+
+class DoseResponse:
+    """Learned response of a sensor reading to doses of an additive."""
+
+    FORGET = 0.9                # Weight of previous doses per new dose
+    MIN_OBSERVATIONS = 2
+    UNLEARNED_FRACTION = 0.5    # Scale doses from the default coefficient
+    MAX_AGE_SECONDS = 7200      # Discard doses not re-measured in time
+
+    def __init__(self, additive, default_coefficient, path=None):
+        """Load fit from file."""
+        self.additive = additive
+        self.default_coefficient = default_coefficient
+        self.path = path or os.path.join(CALIBRATION_DIR, f'{additive}.json')
+        self.lock = Lock()
+        self.state = {'n': 0, 'xx': 0, 'xy': 0, 'pending': []}
+        self._load()
+
+    def _load(self):
+        """Read fit from file."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.state.update(json.load(f))
+        except Exception:
+            logger.warning(
+                f"Error loading {self.additive} dose response - removing"
+                " file")
+            os.remove(self.path)
+
+    def _save(self):
+        """Write fit to file."""
+        config_dir = os.path.dirname(self.path)
+        if not os.path.exists(config_dir):
+            os.makedirs(config_dir)
+        with open(self.path, 'w') as f:
+            json.dump(self.state, f)
+
+    def learned(self):
+        """Return True if enough doses have been observed."""
+        return (
+            self.state['n'] >= self.MIN_OBSERVATIONS
+            and self.state['xx'] > 0)
+
+    def coefficient(self):
+        """Return reading change per ml/L of additive."""
+        if not self.learned():
+            return self.default_coefficient
+        k = self.state['xy'] / self.state['xx']
+        if k * self.default_coefficient <= 0:
+            # Response in the wrong direction - fit is not trustworthy
+            return self.default_coefficient
+        return k
+
+    def observe(self, ml_per_l, delta):
+        """Add a dose and the resulting change in reading to the fit."""
+        s = self.state
+        s['n'] += 1
+        s['xx'] = self.FORGET * s['xx'] + ml_per_l ** 2
+        s['xy'] = self.FORGET * s['xy'] + ml_per_l * delta
+        logger.debug(
+            f"Dose response observed {delta:+.3f} for {ml_per_l:.3f} ml/L"
+            f" {self.additive}: coefficient {self.coefficient():.3f}")
+
+    def dose(self, reading, target, litres, max_ml):
+        """Return ml to move <reading> to <target> in <litres>.
+
+        Return 0 if the additive would move the reading away from target.
+        """
+        if not litres or litres <= 0:
+            return 0
+        ml = (target - reading) * litres / self.coefficient()
+        if not self.learned():
+            ml *= self.UNLEARNED_FRACTION
+        if ml <= 0:
+            return 0
+        if ml > max_ml:
+            logger.warning(
+                f"Dose of {ml:.1f}ml {self.additive} capped at {max_ml}ml")
+            ml = max_ml
+        return round(ml, 1)
+
+    def record_dose(self, ml, reading, litres):
+        """Record a delivered dose, to be observed after mixing.
+
+        Call when dosing has finished, as the mixer runs on for
+        MIX_PUMP_SECONDS.
+        """
+        if not ml:
+            return
+        with self.lock:
+            self.state['pending'].append({
+                'ml_per_l': ml / litres,
+                'reading': reading,
+                'mixed_at': clock.timestamp() + config.MIX_PUMP_SECONDS,
+            })
+            self._save()
+
+    def update(self, reading):
+        """Observe the response to pending doses from a sweep reading."""
+        if reading is None:
+            return
+        now = clock.timestamp()
+        with self.lock:
+            pending = self.state['pending']
+            if not pending or pending[-1]['mixed_at'] > now:
+                return
+            if now - pending[-1]['mixed_at'] < self.MAX_AGE_SECONDS:
+                # Doses mixed in together are observed as one
+                ml_per_l = sum(d['ml_per_l'] for d in pending)
+                self.observe(ml_per_l, reading - pending[0]['reading'])
+            self.state['pending'] = []
+            self._save()
+
+    def measuring(self):
+        """Return True if a dose is waiting to be observed."""
+        return bool(self.state['pending'])
+
+
+nutrient = DoseResponse('nutrient', 350)
+ph_down = DoseResponse('ph_down', -1.5)
+
+
+def update(stat):
+    """Update dose responses with the readings from a sweep."""
+    nutrient.update(stat.get('ec'))
+    ph_down.update(stat.get('ph'))
+
+
+def needed(ec=None, ph=None):
+    """Return True if <ec> or <ph> is out of range and can be dosed."""
+    return (
+        (ec is not None and ec < config.EC_MIN
+         and not nutrient.measuring())
+        or (ph is not None and ph > config.PH_MAX
+            and not ph_down.measuring())
+    )
+
+
+def auto(stat):
+    """Start dosing from sweep readings <stat> if AUTO_DOSE is enabled.
+
+    Return the dosing thread, or None if no dose was started.
+    """
+    if not config.yml.get('AUTO_DOSE', False):
+        return None
+    if not needed(ec=stat.get('ec'), ph=stat.get('ph')):
+        return None
+    thread = Thread(
+        target=restore,
+        kwargs={'ec': stat.get('ec'), 'ph': stat.get('ph')},
+    )
+    thread.start()
+    return thread
+
+
+@catchme
+def restore(ec=None, ph=None):
+    """Deliver doses to bring EC and pH into range in a single mix cycle.
+
+    Return volume delivered per additive.
+    """
+    if not _restoring.acquire(blocking=False):
+        logger.info("Dosing already in progress - skip restore")
+        return {}
+    try:
+        return _restore(ec, ph)
+    finally:
+        _restoring.release()
+
+
+def _restore(ec, ph):
+    """Compute and deliver doses for <ec> and <ph>."""
+    if not estimator.updated[RESERVOIR]:
+        logger.warning("Cannot compute dose without tank volume")
+        return {}
+    estimator.predict()
+    litres = estimator.reservoir()
+
+    doses = {}
+    if ec is not None and ec < config.EC_MIN and not nutrient.measuring():
+        logger.info(f"EC {ec} below {config.EC_MIN}: dosing nutrient")
+        doses['nutrient'] = (ECController, nutrient, ec, nutrient.dose(
+            ec, (config.EC_MIN + config.EC_MAX) / 2, litres,
+            config.EC_MAX_DOSE_ML))
+    if ph is not None and ph > config.PH_MAX and not ph_down.measuring():
+        logger.info(f"pH {ph} above {config.PH_MAX}: dosing pH down")
+        doses['ph_down'] = (PHController, ph_down, ph, ph_down.dose(
+            ph, (config.PH_MIN + config.PH_MAX) / 2, litres,
+            config.PH_MAX_DOSE_ML))
+    planner = DosePlanner()
+    for Controller, response, reading, ml in doses.values():
+        if ml:
+            # Only create controllers that will run
+            planner.add(Controller(), ml)
+    if not planner.doses:
+        return {}
+
+    delivered = planner.run()
+    for additive, (Controller, response, reading, ml) in doses.items():
+        response.record_dose(delivered.get(additive), reading, litres)
+    return delivered
@@ -3,10 +3,11 @@
 import os
 import logging
 import traceback
-import time
 import types
 
+from hydropi import clock
 from hydropi.config import config
+from hydropi.instrument import spans
 from hydropi.notifications import telegram
 
 logger = logging.getLogger('hydropi')
@@ -52,7 +53,8 @@ def retry_call(func, n, args, kwargs):
             logger.warning(
                 f"Call to {func.__name__} failed (attempt {count}/{n})."
                 f" Exception: {exc}")
-            time.sleep(RETRY_INTERVAL_SECONDS)
+            spans.add(retries=1)
+            clock.sleep(RETRY_INTERVAL_SECONDS)
 
     return func(*args, **kwargs)
 
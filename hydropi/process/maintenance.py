@@ -7,16 +7,17 @@ except ModuleNotFoundError:
     io = None
 
 import logging
-from time import sleep
 from threading import Thread
 
 from hydropi.config import config
-from hydropi.process import check
+from hydropi.instrument import spans
+from hydropi.process import check, dosing
+from hydropi.process.mist_plan import scheduler
 from hydropi.process.errors import ErrorWatcher
 from hydropi.interfaces import PipeTemperatureSensor
 from hydropi.interfaces import MixPumpController
 from hydropi.notifications import telegram
-from .pause import paused
+from . import pause
 
 logger = logging.getLogger('hydropi')
 
@@ -28,14 +29,15 @@ def sweep():
         ew = ErrorWatcher()
         try:
             while True:
-                if paused():
+                if pause.paused():
                     msg = "MAINTENANCE PAUSED: Skipping sweep round"
                     logger.info(msg)
                     telegram.notify(msg)
-                    sleep(60 * config.SWEEP_CYCLE_MINUTES)
+                    pause.wait(60 * config.SWEEP_CYCLE_MINUTES)
                 else:
                     sweep_and_restore()
-                    sleep(60 * config.SWEEP_CYCLE_MINUTES)
+                    if pause.wait(60 * config.SWEEP_CYCLE_MINUTES):
+                        continue
                     if minutes_without_mix >= config.MIX_EVERY_MINUTES:
                         # Run mix pump to aerate nutrients
                         Thread(target=MixPumpController().mix).start()
@@ -54,13 +56,24 @@ def sweep():
 
 def sweep_and_restore():
     """Perform parameter check and balance."""
-    temp = PipeTemperatureSensor()
-    stat = {
-        'ec': check.ec.level(),
-        'ph': check.ph.level(),
-        'volume_l': check.tank.depth(),
-        'pressure_psi': check.pressure.level(),
-        'temp_c': temp.read(),
-    }
-    if config.db:
-        config.db.log_data(stat)
+    dt = None
+    with spans.span('sweep') as sweep:
+        temp = PipeTemperatureSensor()
+        stat = {
+            'ec': check.ec.level(),
+            'ph': check.ph.level(),
+            # Pressure first, to update the pressure tank volume estimate
+            'pressure_psi': check.pressure.level(),
+            'volume_l': check.tank.depth(),
+            'temp_c': temp.read(),
+        }
+        dosing.update(stat)
+        dosing.auto(stat)
+        scheduler.record_temperature(stat['temp_c'])
+        if config.db:
+            with spans.span('DB.log_data'):
+                dt = config.db.log_data(stat)
+    logger.info(f"Sweep completed in {sweep.wall_s:.1f} seconds")
+    spans.save_last_sweep(sweep)
+    if dt:
+        config.db.log_metrics(dt, sweep.rows())
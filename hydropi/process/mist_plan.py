@@ -0,0 +1,275 @@
+"""Plan upcoming mist events as a timetable.
+
+The timetable holds the start time (epoch seconds) and duration of each mist
+event over the next HORIZON_SECONDS, in two compact arrays. Each event's
+interval to the next follows the config:
+
+- Quiet time:    MIST_INTERVAL_NIGHT_MINUTES, MIST_DURATION_NIGHT_SECONDS
+- Otherwise:     MIST_INTERVAL_MINUTES, MIST_DURATION_SECONDS, with the
+                 interval shortened by MIST_BUMP_PER_DEGREE for each degree
+                 of smoothed temperature above MIST_BUMP_FROM_TEMPERATURE_C
+
+Temperature is recorded by the sweep and smoothed, so the mist loop never
+waits on a sensor: it just waits for the next start. Events after the next
+one are re-planned when the smoothed temperature moves by REPLAN_DEGREES or
+when mist config changes, and the plan is extended as it runs down.
+
+Each mist zone (see controllers.mist_zones) has its own timetable, with
+settings overridden per zone. MistScheduler staggers the zones: their first
+events are offset evenly across the shortest day interval, in groups of
+MIST_MAX_OPEN_VALVES, and no more than MIST_MAX_OPEN_VALVES valves are ever
+open at once. Zones that fall due together wait their turn rather than
+sharing the pressure tank, so each zone gets full spray pressure as beds are
+added.
+
+Timetables are written to TEMP_DIR so that other processes (e.g. the HTTP
+daemon) can show upcoming events.
+"""
+
+import os
+import glob
+import json
+import logging
+from array import array
+from datetime import datetime
+from threading import BoundedSemaphore, Lock
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.process.check.time import QuietSchedule
+from hydropi.interfaces.controllers.mist_zones import setting, zones
+
+logger = logging.getLogger('hydropi')
+
+PLAN_DIR = config.TEMP_DIR
+
+CONFIG_KEYS = (
+    'MIST_INTERVAL_MINUTES',
+    'MIST_INTERVAL_NIGHT_MINUTES',
+    'MIST_DURATION_SECONDS',
+    'MIST_DURATION_NIGHT_SECONDS',
+    'MIST_BUMP_FROM_TEMPERATURE_C',
+    'MIST_BUMP_PER_DEGREE',
+    'QUIET_TIME_START',
+    'QUIET_TIME_END',
+)
+
+
+class MistPlanner:
+    """Timetable of upcoming mist events."""
+
+    HORIZON_SECONDS = 24 * 3600
+    SMOOTHING = 0.3             # Weight of each new temperature reading
+    REPLAN_DEGREES = 0.5        # Re-plan when smoothed temperature moves
+    GRACE_SECONDS = 60          # Late events are still delivered
+    REFRESH_SECONDS = 60        # Check config for changes
+
+    def __init__(self, path=None, zone=None, offset=0):
+        """Create empty plan for <zone>, starting <offset> seconds from now."""
+        self.path = path or plan_path(zone['name'] if zone else 'main')
+        self.zone = zone
+        self.offset = offset
+        self.starts = array('d')
+        self.durations = array('f')
+        self.temperature = None
+        self.planned_temperature = None
+        self.settings = None
+        self.quiet = None
+        self._refresh_mono = 0
+        self._lock = Lock()
+
+    def record_temperature(self, temp_c):
+        """Update smoothed temperature and re-plan on a significant change."""
+        if temp_c is None:
+            return
+        with self._lock:
+            if self.temperature is None:
+                self.temperature = temp_c
+            else:
+                self.temperature += self.SMOOTHING * (
+                    temp_c - self.temperature)
+            moved = (
+                self.planned_temperature is None
+                or abs(self.temperature - self.planned_temperature)
+                >= self.REPLAN_DEGREES)
+        if moved and len(self.starts):
+            self._replan("temperature")
+
+    def _read_settings(self):
+        """Return mist config values as a tuple."""
+        return tuple(setting(self.zone, key) for key in CONFIG_KEYS)
+
+    def _interval(self, dt, settings, temp_c):
+        """Return (seconds to next event, duration) for an event at <dt>."""
+        (interval, night_interval, duration, night_duration,
+         bump_from, bump_per_degree, *_) = settings
+        if self.quiet.is_quiet_at(dt):
+            return 60 * night_interval, night_duration
+        if temp_c is not None and temp_c > bump_from:
+            # Increase mist frequency as temperature rises
+            interval *= (1 - bump_per_degree) ** (temp_c - bump_from)
+        return 60 * interval, duration
+
+    def _extend(self, start):
+        """Append events from <start> up to the planning horizon."""
+        end = clock.timestamp() + self.HORIZON_SECONDS
+        t = start
+        while t < end:
+            interval, duration = self._interval(
+                datetime.fromtimestamp(t), self.settings, self.temperature)
+            self.starts.append(t)
+            self.durations.append(duration)
+            t += max(interval, duration)
+        self.planned_temperature = self.temperature
+
+    def _replan(self, reason):
+        """Re-plan events after the next one."""
+        with self._lock:
+            self.settings = self._read_settings()
+            self.quiet = QuietSchedule(*self.settings[-2:])
+            if len(self.starts):
+                first = self.starts[0]
+                del self.starts[:]
+                del self.durations[:]
+                interval, duration = self._interval(
+                    datetime.fromtimestamp(first), self.settings,
+                    self.temperature)
+                self.starts.append(first)
+                self.durations.append(duration)
+                self._extend(first + max(interval, duration))
+            else:
+                self._extend(clock.timestamp() + self.offset)
+        logger.debug(f"Mist timetable re-planned ({reason})")
+        self.save()
+
+    def _update(self):
+        """Drop past events, then re-plan or extend the plan if due."""
+        now = clock.timestamp()
+        mono = clock.monotonic()
+        with self._lock:
+            i = 0
+            while i < len(self.starts) and (
+                    self.starts[i] < now - self.GRACE_SECONDS):
+                i += 1
+            del self.starts[:i]
+            del self.durations[:i]
+        if not len(self.starts):
+            return self._replan("start")
+        if mono >= self._refresh_mono:
+            self._refresh_mono = mono + self.REFRESH_SECONDS
+            if self._read_settings() != self.settings:
+                return self._replan("config")
+        if self.starts[-1] < now + self.HORIZON_SECONDS / 2:
+            with self._lock:
+                last = self.starts[-1]
+                interval, duration = self._interval(
+                    datetime.fromtimestamp(last), self.settings,
+                    self.temperature)
+                self._extend(last + max(interval, duration))
+            self.save()
+
+    def next_event(self):
+        """Return (start, duration) of the next mist event."""
+        self._update()
+        return self.starts[0], self.durations[0]
+
+    def done(self):
+        """Remove the next event once delivered."""
+        with self._lock:
+            del self.starts[:1]
+            del self.durations[:1]
+
+    def upcoming(self, n=None):
+        """Return upcoming events as dicts."""
+        with self._lock:
+            events = list(zip(self.starts, self.durations))
+        return [
+            {
+                'start': datetime.fromtimestamp(start).isoformat(
+                    timespec='seconds'),
+                'duration_seconds': round(duration, 1),
+            }
+            for start, duration in events[:n]
+        ]
+
+    def save(self):
+        """Write upcoming events to file."""
+        try:
+            with open(self.path, 'w') as f:
+                json.dump({
+                    'temperature_c': self.temperature,
+                    'events': self.upcoming(),
+                }, f)
+        except OSError as exc:
+            logger.warning(f"Could not write mist timetable: {exc}")
+
+
+class MistScheduler:
+    """Stagger the mist timetables of all zones."""
+
+    def __init__(self):
+        """Create scheduler. Zones are planned on first use."""
+        self._planners = None
+        self._lock = Lock()
+        self.valves = None
+
+    @property
+    def planners(self):
+        """Return a planner for each zone, by zone name."""
+        with self._lock:
+            if self._planners is None:
+                self._planners = self._create_planners(zones())
+        return self._planners
+
+    def _create_planners(self, zone_list):
+        """Return planners with first events offset to stagger valves."""
+        max_open = max(1, config.yml.get('MIST_MAX_OPEN_VALVES', 1))
+        self.valves = BoundedSemaphore(max_open)
+        for name in set(load() or ()) - {zone['name'] for zone in zone_list}:
+            # Zone removed from config
+            os.remove(plan_path(name))
+        groups = -(-len(zone_list) // max_open)
+        spacing = 60 * min(
+            setting(zone, 'MIST_INTERVAL_MINUTES') for zone in zone_list
+        ) / groups
+        return {
+            zone['name']: MistPlanner(
+                plan_path(zone['name']),
+                zone=zone,
+                offset=(i // max_open) * spacing)
+            for i, zone in enumerate(zone_list)
+        }
+
+    def record_temperature(self, temp_c):
+        """Update smoothed temperature of each zone plan."""
+        for p in self.planners.values():
+            p.record_temperature(temp_c)
+
+    def next_event(self):
+        """Return (zone, start, duration) of the next event of any zone."""
+        events = [
+            (*p.next_event(), zone) for zone, p in self.planners.items()]
+        start, duration, zone = min(events)
+        return self.planners[zone].zone, start, duration
+
+    def done(self, zone):
+        """Remove the next event of <zone> once dispatched."""
+        self.planners[zone['name']].done()
+
+
+def plan_path(zone_name):
+    """Return path of the timetable file for <zone_name>."""
+    return os.path.join(PLAN_DIR, f'mist.plan.{zone_name}.json')
+
+
+def load():
+    """Return timetables written by MistPlanner.save, by zone name."""
+    plans = {}
+    prefix, suffix = plan_path('*').split('*')
+    for path in sorted(glob.glob(plan_path('*'))):
+        with open(path) as f:
+            plans[path[len(prefix):-len(suffix)]] = json.load(f)
+    return plans or None
+
+
+scheduler = MistScheduler()
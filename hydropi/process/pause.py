@@ -1,28 +1,191 @@
-"""Control pausing of hydropi services."""
+"""Control pausing of hydropi services.
+
+Pause state is shared between processes through a flag file. Rather than
+checking the file on every loop, a watcher thread follows the flag with
+inotify (falling back to polling once per second where inotify is not
+available) and wakes every waiting thread as soon as the state changes:
+
+- wait(seconds) is a sleep that returns early when pause is set or cleared,
+  so loops can react immediately rather than after their full interval.
+- hold(seconds) is a sleep for actuator pulses that returns early if pause
+  is set during the pulse.
+"""
 
 import os
+import time
+import struct
+import ctypes
+import ctypes.util
 import logging
+from threading import Thread, Condition
 
+from hydropi import clock
 from hydropi.config import config
 
 logger = logging.getLogger('hydropi')
 
 FLAG_PATH = os.path.join(config.TEMP_DIR, 'pause.flag')
+POLL_SECONDS = 1
+
+# inotify(7) constants
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_EVENT_HEADER = struct.Struct('iIII')
+
+
+class PauseControl:
+    """Track pause state from a flag file and notify waiting threads."""
+
+    def __init__(self, path):
+        """Create control for the given flag path."""
+        self.path = path
+        self.state = os.path.exists(path)
+        self.generation = 0
+        self.condition = Condition()
+        self.watcher = None
+
+    def paused(self):
+        """Return current pause state."""
+        self._watch()
+        return self.state
+
+    def set(self, state):
+        """Set pause on/off."""
+        if state:
+            logger.debug("ACTION: set paused ON")
+            with open(self.path, 'w') as f:
+                f.write("Flag hydropi services as paused\n")
+            # Could do a GPIO.cleanup() here to REALLY stop everything?
+        else:
+            logger.debug("ACTION: set paused OFF")
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        self._update(bool(state))
+
+    def wait(self, seconds):
+        """Sleep for <seconds> or until pause state changes.
+
+        Return True if woken by a state change.
+        """
+        self._watch()
+        with self.condition:
+            generation = self.generation
+            return clock.wait_for(
+                self.condition,
+                lambda: self.generation != generation,
+                timeout=seconds)
+
+    def hold(self, seconds):
+        """Sleep for <seconds> unless pause is set in the meantime.
+
+        Pulses started while already paused (i.e. manual control) run to
+        completion. Return True if the full duration elapsed.
+        """
+        self._watch()
+        with self.condition:
+            generation = self.generation
+
+            def interrupted():
+                return self.state and self.generation != generation
+
+            return not clock.wait_for(
+                self.condition, interrupted, timeout=seconds)
+
+    def _update(self, state):
+        """Record new state and wake waiting threads if it changed."""
+        with self.condition:
+            if state == self.state:
+                return
+            self.state = state
+            self.generation += 1
+            self.condition.notify_all()
+        logger.info(f"Pause state changed: {'ON' if state else 'OFF'}")
+
+    def _watch(self):
+        """Start the watcher thread if not yet running."""
+        if self.watcher is None:
+            self.watcher = Thread(
+                target=self._run_watcher, name='pause-watcher', daemon=True)
+            self.watcher.start()
+
+    def _run_watcher(self):
+        """Follow the flag file for changes made by any process."""
+        try:
+            fd = self._inotify_fd()
+        except OSError as exc:
+            logger.warning(
+                f"Pause control falling back to polling: {exc}")
+            return self._poll()
+
+        name = os.path.basename(self.path).encode()
+        self._update(os.path.exists(self.path))
+        while True:
+            try:
+                data = self._read_events(fd)
+            except OSError as exc:
+                logger.error(
+                    f"Pause control falling back to polling: {exc}")
+                os.close(fd)
+                return self._poll()
+            offset = 0
+            changed = False
+            while offset < len(data):
+                _, _, _, length = IN_EVENT_HEADER.unpack_from(data, offset)
+                offset += IN_EVENT_HEADER.size
+                if data[offset:offset + length].rstrip(b'\0') == name:
+                    changed = True
+                offset += length
+            if changed:
+                self._update(os.path.exists(self.path))
+
+    def _read_events(self, fd):
+        """Block until inotify events are available and return them."""
+        return os.read(fd, 4096)
+
+    def _poll(self):
+        """Check the flag file every POLL_SECONDS."""
+        while True:
+            self._update(os.path.exists(self.path))
+            time.sleep(POLL_SECONDS)
+
+    def _inotify_fd(self):
+        """Return an inotify file descriptor watching the flag directory."""
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init'):
+            raise OSError("inotify is not available on this platform")
+        fd = libc.inotify_init()
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+        wd = libc.inotify_add_watch(
+            fd,
+            os.path.dirname(self.path).encode(),
+            IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        return fd
+
+
+control = PauseControl(FLAG_PATH)
 
 
 def paused():
     """Determine if currently paused."""
-    return os.path.exists(FLAG_PATH)
+    return control.paused()
 
 
 def set(state):
     """Set pause on/off."""
-    if state:
-        logger.debug("ACTION: set paused ON")
-        with open(FLAG_PATH, 'w') as f:
-            f.write("Flag hydropi services as paused\n")
-        # Could do a GPIO.cleanup() here to REALLY stop everything?
-    else:
-        logger.debug("ACTION: set paused OFF")
-        if os.path.exists(FLAG_PATH):
-            os.remove(FLAG_PATH)
+    control.set(state)
+
+
+def wait(seconds):
+    """Sleep until <seconds> elapse or pause state changes."""
+    return control.wait(seconds)
+
+
+def hold(seconds):
+    """Sleep for an actuator pulse, returning False if paused meanwhile."""
+    return control.hold(seconds)
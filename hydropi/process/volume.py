@@ -0,0 +1,182 @@
+"""Estimate reservoir and pressure tank volume with a Kalman filter.
+
+The state is [reservoir litres, pressure tank litres]. Between readings it
+is predicted from the known flows, using the on-time of each actuator pin
+(from metrics.ACTUATOR_ON_SECONDS):
+
+- Mist valves:      pressure tank -> plants, with some run-off to reservoir
+- Pressure pump:    reservoir -> pressure tank
+- Water valve:      mains -> reservoir
+- Evaporation:      reservoir -> air
+
+Flow rates are uncertain, so each transfer adds process noise to both
+states (correlated, since water leaving one tank enters the other). Readings
+from DepthSensor (reservoir) and PressureSensor (pressure tank) correct the
+prediction in proportion to the confidence in each.
+
+The estimate is always available, so the depth sensor only needs reading
+when the reservoir estimate has become uncertain, and a few samples are
+enough since readings are smoothed by the filter.
+"""
+
+import logging
+from threading import Lock
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.instrument import metrics
+from hydropi.interfaces.controllers.mist_zones import zones
+
+logger = logging.getLogger('hydropi')
+
+RESERVOIR, PRESSURE_TANK = 0, 1
+
+
+class VolumeEstimator:
+    """Two-state Kalman filter for reservoir and pressure tank volume."""
+
+    # Nominal flows (litres per second)
+    MIST_FLOW_LPS = 0.05
+    MIST_RETURN_FRACTION = 0.7
+    PUMP_FLOW_LPS = 0.03
+    WATER_FLOW_LPS = 0.1
+    EVAPORATION_LPH = 0.02
+
+    # Noise (as standard deviation)
+    FLOW_UNCERTAINTY = 0.25         # Fraction of each transfer
+    DRIFT_L_PER_HOUR = 0.05         # Unmodelled change e.g. plant uptake
+    DEPTH_NOISE_L = 0.3             # Includes temperature effects
+    PRESSURE_TANK_NOISE_L = 0.2
+    INITIAL_NOISE_L = 10
+
+    # Read depth sensor when reservoir estimate is less certain than this
+    READ_BELOW_CONFIDENCE_L = 0.25
+
+    def __init__(self):
+        """Create estimator with unknown state."""
+        self.lock = Lock()
+        self.x = [0.0, 0.0]
+        self.P = [
+            [self.INITIAL_NOISE_L ** 2, 0.0],
+            [0.0, self.INITIAL_NOISE_L ** 2],
+        ]
+        self.updated = [False, False]
+        self.last_mono = None
+        self.last_on_seconds = None
+
+    def _on_seconds(self):
+        """Return cumulative on-time of each flow actuator."""
+        pins = {
+            'mist': [zone['pin'] for zone in zones()],
+            'pump': [config.PIN_PRESSURE_PUMP],
+            'water': [config.PIN_WATER_VALVE],
+        }
+        seconds = dict.fromkeys(pins, 0)
+        for (pin, controller), counter in list(
+                metrics.ACTUATOR_ON_SECONDS.children.items()):
+            for name, ps in pins.items():
+                if pin in map(str, ps):
+                    seconds[name] += counter.value
+        return seconds
+
+    def _add_noise(self, a, b, sd):
+        """Add transfer noise of <sd> litres with state coefficients a, b."""
+        var = sd ** 2
+        self.P[0][0] += a * a * var
+        self.P[0][1] += a * b * var
+        self.P[1][0] += a * b * var
+        self.P[1][1] += b * b * var
+
+    def predict(self):
+        """Advance the estimate with flows since the last prediction."""
+        with self.lock:
+            now = clock.monotonic()
+            on_seconds = self._on_seconds()
+            if self.last_mono is None:
+                self.last_mono, self.last_on_seconds = now, on_seconds
+                return
+            hours = (now - self.last_mono) / 3600
+            d = {
+                k: on_seconds[k] - self.last_on_seconds[k]
+                for k in on_seconds
+            }
+            self.last_mono, self.last_on_seconds = now, on_seconds
+
+            mist_l = d['mist'] * self.MIST_FLOW_LPS
+            pump_l = d['pump'] * self.PUMP_FLOW_LPS
+            water_l = d['water'] * self.WATER_FLOW_LPS
+            evaporation_l = hours * self.EVAPORATION_LPH
+            r = self.MIST_RETURN_FRACTION
+
+            self.x[RESERVOIR] += (
+                r * mist_l - pump_l + water_l - evaporation_l)
+            self.x[PRESSURE_TANK] += pump_l - mist_l
+
+            u = self.FLOW_UNCERTAINTY
+            self._add_noise(r, -1, u * mist_l)
+            self._add_noise(-1, 1, u * pump_l)
+            self._add_noise(1, 0, u * water_l)
+            drift = self.DRIFT_L_PER_HOUR * hours ** 0.5
+            self._add_noise(1, 0, drift)
+            self._add_noise(0, 1, drift)
+
+    def _correct(self, i, litres, noise):
+        """Correct state <i> with a reading of <litres>."""
+        if litres is None:
+            return
+        with self.lock:
+            if not self.updated[i]:
+                # First reading sets the state
+                self.x[i] = litres
+                self.P[i][i] = noise ** 2
+                self.P[0][1] = self.P[1][0] = 0.0
+                self.updated[i] = True
+                return
+            S = self.P[i][i] + noise ** 2
+            K = [self.P[0][i] / S, self.P[1][i] / S]
+            residual = litres - self.x[i]
+            self.x = [self.x[j] + K[j] * residual for j in (0, 1)]
+            Pi = [self.P[i][0], self.P[i][1]]
+            self.P = [
+                [self.P[j][k] - K[j] * Pi[k] for k in (0, 1)]
+                for j in (0, 1)
+            ]
+        logger.debug(
+            f"Volume estimate: reservoir {self.x[RESERVOIR]:.2f}L"
+            f" ±{self.std(RESERVOIR):.2f}, pressure tank"
+            f" {self.x[PRESSURE_TANK]:.2f}L ±{self.std(PRESSURE_TANK):.2f}")
+
+    def update_reservoir(self, litres):
+        """Predict to now and correct with a depth sensor reading."""
+        self.predict()
+        self._correct(RESERVOIR, litres, self.DEPTH_NOISE_L)
+
+    def update_pressure_tank(self, litres):
+        """Predict to now and correct with a pressure tank volume reading."""
+        self.predict()
+        self._correct(PRESSURE_TANK, litres, self.PRESSURE_TANK_NOISE_L)
+
+    def std(self, i):
+        """Return standard deviation of state <i> in litres."""
+        return max(self.P[i][i], 0) ** 0.5
+
+    def needs_reservoir_reading(self):
+        """Return True if the reservoir estimate is too uncertain."""
+        return (
+            not self.updated[RESERVOIR]
+            or self.std(RESERVOIR) > self.READ_BELOW_CONFIDENCE_L)
+
+    def reservoir(self):
+        """Return estimated reservoir volume (litres)."""
+        return max(self.x[RESERVOIR], 0)
+
+    def pressure_tank(self):
+        """Return estimated pressure tank volume (litres)."""
+        return max(self.x[PRESSURE_TANK], 0)
+
+    def total(self):
+        """Return estimated total volume (litres)."""
+        return self.reservoir() + self.pressure_tank()
+
+
+estimator = VolumeEstimator()
@@ -0,0 +1,270 @@
+"""Aggregate several hydropi daemons as a fleet.
+
+Each node is a hydropi daemon (see hydropi.server.http) listed in config.yml:
+
+    FLEET_NODES:
+      - name: shed
+        host: 192.168.1.20
+      - name: greenhouse
+        host: 192.168.1.21
+        port: 8082
+
+Port and token default to this node's DAEMON_HTTP_PORT and
+DAEMON_HTTP_TOKEN. Requests go to all nodes concurrently, each with its own
+timeout, so one slow or offline Pi doesn't hold up the rest:
+
+- Status is cached for CACHE_SECONDS. A node that doesn't answer is reported
+  with its last known status, its age and the error.
+- Datalog rows of all nodes are merged into one stream in time order,
+  optionally grouped into time buckets across nodes.
+- Config changes are fanned out to all nodes.
+
+Several daemons on localhost ports can stand in for a fleet:
+
+    $ python -m hydropi.server.http --port 8082 &
+    $ python -m hydropi.server.http --port 8083 &
+    $ python -m hydropi.server.fleet status
+"""
+
+import time
+import heapq
+import logging
+from datetime import datetime
+from threading import Lock
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from hydropi.config import config
+
+logger = logging.getLogger('hydropi')
+
+
+class Node:
+    """A hydropi daemon on the network."""
+
+    def __init__(self, name, host='127.0.0.1', port=None, token=None):
+        """Create node. Port and token default to this node's config."""
+        self.name = str(name)
+        self.host = host
+        self.port = port or config.DAEMON_HTTP_PORT
+        self.token = token or config.yml.get('DAEMON_HTTP_TOKEN')
+
+    def url(self, path):
+        """Return URL of <path> on the node."""
+        return f"http://{self.host}:{self.port}{path}"
+
+
+def get_nodes():
+    """Return nodes listed in FLEET_NODES."""
+    return [Node(**node) for node in config.yml.get('FLEET_NODES') or []]
+
+
+class Fleet:
+    """Query and configure a set of nodes concurrently."""
+
+    TIMEOUT_SECONDS = (3.05, 10)    # (connect, read) for each node
+    CACHE_SECONDS = 30              # Reuse node status this recent
+    STALE_MAX_SECONDS = 3600        # Report last status of a down node
+
+    def __init__(self, nodes=None):
+        """Create fleet of <nodes>, defaulting to FLEET_NODES."""
+        self.nodes = get_nodes() if nodes is None else list(nodes)
+        self.session = None         # Created on first request
+        self._cache = {}
+        self._lock = Lock()
+
+    def _request(self, node, method, path, data=None):
+        """Send a request to <node> and return the JSON response."""
+        headers = {}
+        if node.token:
+            headers['Authorization'] = f'Bearer {node.token}'
+        r = self.session.request(
+            method,
+            node.url(path),
+            json=data,
+            headers=headers,
+            timeout=self.TIMEOUT_SECONDS,
+        )
+        if not r.ok:
+            raise ValueError(f"HTTP {r.status_code}: {r.text.strip()}")
+        return r.json()
+
+    def _each(self, method, path, data=None, nodes=None):
+        """Send a request to each node concurrently.
+
+        Return {node name: (response, error)}. A node that fails or takes
+        longer than TIMEOUT_SECONDS in total has an error message instead of
+        a response.
+        """
+        nodes = self.nodes if nodes is None else nodes
+        if not nodes:
+            return {}
+        if self.session is None:
+            import requests  # Deferred: slow to import
+            self.session = requests.Session()
+        deadline = time.monotonic() + sum(self.TIMEOUT_SECONDS)
+        pool = ThreadPoolExecutor(max_workers=len(nodes))
+        futures = {
+            node.name: pool.submit(self._request, node, method, path, data)
+            for node in nodes
+        }
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = (future.result(
+                    timeout=max(deadline - time.monotonic(), 0)), None)
+            except TimeoutError:
+                results[name] = (None, "Timed out")
+            except Exception as exc:
+                results[name] = (None, str(exc) or type(exc).__name__)
+            if results[name][1]:
+                logger.warning(
+                    f"Fleet: {method} {path} failed on node {name}:"
+                    f" {results[name][1]}")
+        pool.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def status(self):
+        """Return status of each node by name.
+
+        Each entry has the node 'status' (None if it has not been reached
+        within STALE_MAX_SECONDS), its 'age_seconds', and the 'error' of the
+        last request if it failed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            due = [
+                node for node in self.nodes
+                if now >= self._cache.get(node.name, {}).get('expires', 0)
+            ]
+            errors = {}
+            results = self._each('GET', '/', nodes=due)
+            for name, (data, error) in results.items():
+                if error:
+                    errors[name] = error
+                    continue
+                fetched = time.monotonic()
+                self._cache[name] = {
+                    'status': data,
+                    'fetched': fetched,
+                    'expires': fetched + self.CACHE_SECONDS,
+                }
+            now = time.monotonic()
+            fleet = {}
+            for node in self.nodes:
+                cached = self._cache.get(node.name)
+                age = now - cached['fetched'] if cached else None
+                if age is not None and age > self.STALE_MAX_SECONDS:
+                    cached = age = None
+                fleet[node.name] = {
+                    'status': cached['status'] if cached else None,
+                    'age_seconds': None if age is None else round(age, 1),
+                    'error': errors.get(node.name),
+                }
+        return fleet
+
+    def datalog(self, since=None, limit=None, bucket_minutes=None):
+        """Return datalog rows of all nodes after <since>, in time order.
+
+        Each row is tagged with its 'node'. With <bucket_minutes>, rows are
+        grouped into time buckets instead, each holding the last row of each
+        node in the bucket:
+
+            {'datetime': <bucket start>, 'nodes': {<node name>: <row>}}
+
+        Return {'rows': [...], 'errors': {<node name>: <error>}}.
+        """
+        if isinstance(since, datetime):
+            since = since.isoformat()
+        params = {
+            k: v for k, v in (('since', since), ('limit', limit))
+            if v is not None
+        }
+        path = '/datalog' + (f'?{urlencode(params)}' if params else '')
+        streams, errors = [], {}
+        for name, (rows, error) in self._each('GET', path).items():
+            if error:
+                errors[name] = error
+                continue
+            streams.append([
+                (datetime.fromisoformat(row['datetime']), dict(row, node=name))
+                for row in rows or []
+            ])
+        merged = heapq.merge(*streams, key=lambda item: item[0])
+        if bucket_minutes:
+            rows = self._bucket(merged, 60 * bucket_minutes)
+        else:
+            rows = [row for dt, row in merged]
+        return {'rows': rows, 'errors': errors}
+
+    def _bucket(self, merged, seconds):
+        """Group merged (datetime, row) items into buckets of <seconds>."""
+        buckets = []
+        for dt, row in merged:
+            ts = dt.timestamp()
+            start = datetime.fromtimestamp(ts - ts % seconds, dt.tzinfo)
+            if not buckets or buckets[-1]['start'] != start:
+                buckets.append({'start': start, 'nodes': {}})
+            buckets[-1]['nodes'][row['node']] = row
+        return [
+            {'datetime': b['start'].isoformat(), 'nodes': b['nodes']}
+            for b in buckets
+        ]
+
+    def set_config(self, data):
+        """Set live config values <data> on every node.
+
+        Return {node name: error}, where error is None if the node was
+        updated. Cached status is dropped as it may predate the change.
+        """
+        results = self._each('POST', '/config', data)
+        with self._lock:
+            self._cache.clear()
+        return {name: error for name, (response, error) in results.items()}
+
+
+def get_args():
+    """Parse command line arguments."""
+    from argparse import ArgumentParser
+    ap = ArgumentParser(description="Query and configure a hydropi fleet.")
+    sub = ap.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help="Show status of each node")
+    datalog = sub.add_parser('datalog', help="Show merged datalog")
+    datalog.add_argument('--since', help="ISO datetime of earliest row")
+    datalog.add_argument('--limit', type=int, help="Rows per node")
+    datalog.add_argument(
+        '--bucket-minutes',
+        type=int,
+        help="Group rows of all nodes into buckets of this many minutes",
+    )
+    setter = sub.add_parser('set', help="Set config on every node")
+    setter.add_argument(
+        'values',
+        nargs='+',
+        metavar='KEY=VALUE',
+        help="Config values (parsed as YAML)",
+    )
+    return ap.parse_args()
+
+
+def main():
+    """Run a fleet command and print the result as JSON."""
+    import json
+    import yaml
+    args = get_args()
+    fleet = Fleet()
+    if args.command == 'status':
+        result = fleet.status()
+    elif args.command == 'datalog':
+        result = fleet.datalog(args.since, args.limit, args.bucket_minutes)
+    else:
+        data = {}
+        for value in args.values:
+            key, _, value = value.partition('=')
+            data[key] = yaml.safe_load(value)
+        result = fleet.set_config(data)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,27 +3,25 @@
 import os
 
 from hydropi.config import config, STATUS
-from hydropi.interfaces.sensors import (
-    DepthSensor,
-    PressureSensor,
-    ECSensor,
-    PHSensor,
-    # TemperatureSensor,
-)
+from hydropi.instrument import metrics, spans
+from hydropi.interfaces import sensors
 
+DATALOG_LIMIT = 1000
+
+# Sensor classes are imported on first status request
 SENSORS = {
-    'pressure': PressureSensor,
-    'depth': DepthSensor,
-    'ec': ECSensor,
-    'ph': PHSensor,
-    # 'temperature': TemperatureSensor,
+    'pressure': 'PressureSensor',
+    'depth': 'DepthSensor',
+    'ec': 'ECSensor',
+    'ph': 'PHSensor',
+    # 'temperature': 'TemperatureSensor',
 }
 
 
 def get_status():
     """Return current status as data."""
     params = {
-        k: v.get_status()
+        k: getattr(sensors, v).get_status()
         for k, v in SENSORS.items()
     }
     status_list = [
@@ -43,6 +41,30 @@ def get_status():
     }
 
 
+def get_sweep_timings():
+    """Return span timings from the last sweep."""
+    return spans.load_last_sweep()
+
+
+def get_mist_plan():
+    """Return upcoming mist events of each zone."""
+    # Deferred: importing the process package sets up sensors and checks
+    from hydropi.process import mist_plan
+    return mist_plan.load()
+
+
+def get_datalog(since=None, limit=DATALOG_LIMIT):
+    """Return up to <limit> datalog rows after <since>, oldest first."""
+    if not config.db:
+        return []
+    return config.db.get_data(since, limit)
+
+
+def get_metrics():
+    """Return metrics of the control process in OpenMetrics text format."""
+    return metrics.exposition(metrics.load_snapshot())
+
+
 def get_logs():
     """Return most recent log output."""
     MAX_BYTES = 1024 * 1024  # 1MB
@@ -0,0 +1,42 @@
+"""Run the HTTP daemon from the command line.
+
+Several daemons on localhost ports can stand in for a fleet:
+
+    $ python -m hydropi.server.http --port 8082
+    $ python -m hydropi.server.http --port 8083
+"""
+
+from argparse import ArgumentParser
+
+from .server import HOST, PORT, listen
+
+
+def get_args():
+    """Parse command line arguments."""
+    ap = ArgumentParser(description="Run the hydropi HTTP daemon.")
+    ap.add_argument(
+        '--host',
+        default=HOST,
+        help="Address to listen on",
+    )
+    ap.add_argument(
+        '--port',
+        type=int,
+        default=PORT,
+        help="Port to listen on",
+    )
+    return ap.parse_args()
+
+
+def main():
+    """Serve requests until interrupted."""
+    args = get_args()
+    print(f"Serving hydropi daemon at http://{args.host}:{args.port}")
+    try:
+        listen(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
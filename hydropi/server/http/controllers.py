@@ -1,7 +1,9 @@
 """Client-facing HydroPi services."""
 
-import hydropi import process
-from hydropi.interfaces import sensors, controllers
+from hydropi.config import config
+from hydropi.instrument import metrics
+from hydropi.server.handlers import config as config_handler, generic
+from .exceptions import Http400
 
 
 class IndexController:
@@ -9,10 +11,65 @@ class IndexController:
 
     def get(request):
         """Return hydro status."""
-        return {
-            'ph': sensors.get_ph(),
-            'ec': sensors.get_ec(),
-            'depth': sensors.get_depth(),
-            'temperature': sensors.get_temperature(),
-            'pressure': sensors.get_pressure(),
-        }
+        return generic.get_status()
+
+
+class SweepController:
+    """Handle sweep timing requests."""
+
+    def get(request):
+        """Return span timings from the last sweep."""
+        return generic.get_sweep_timings()
+
+
+class MistController:
+    """Handle mist timetable requests."""
+
+    def get(request):
+        """Return upcoming mist events."""
+        return generic.get_mist_plan()
+
+
+class MetricsController:
+    """Handle metrics scrapes."""
+
+    content_type = metrics.CONTENT_TYPE
+
+    def get(request):
+        """Return control process metrics in OpenMetrics text format."""
+        return generic.get_metrics()
+
+
+class DatalogController:
+    """Handle datalog requests."""
+
+    def get(request):
+        """Return datalog rows after ?since=<ISO datetime>, oldest first.
+
+        ?limit= is capped at DATALOG_LIMIT rows.
+        """
+        try:
+            limit = int(request.params.get('limit', generic.DATALOG_LIMIT))
+        except ValueError:
+            raise Http400("Invalid limit")
+        if limit < 1:
+            raise Http400("Limit must be a positive number of rows")
+        limit = min(limit, generic.DATALOG_LIMIT)
+        return generic.get_datalog(request.params.get('since'), limit)
+
+
+class ConfigController:
+    """Handle live config requests."""
+
+    def get(request):
+        """Return config grouped by controller."""
+        return config_handler.get()
+
+    def post(request):
+        """Update config from a JSON object of keys and values."""
+        if not isinstance(request.data, dict):
+            raise Http400("Expected a JSON object of config values")
+        if not config.db:
+            raise Http400("Live config update requires DB connection")
+        config_handler.set(request.data)
+        return config_handler.get()
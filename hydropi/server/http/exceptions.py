@@ -4,16 +4,16 @@
 class Http400(Exception):
     """Bad request."""
 
-    pass
+    status = 400
 
 
 class Http401(Exception):
     """Unauthorized."""
 
-    pass
+    status = 401
 
 
 class Http404(Exception):
     """Not found."""
 
-    pass
+    status = 404
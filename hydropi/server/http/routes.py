@@ -1,36 +1,72 @@
-"""Route requests to HydroPi services."""
+"""Route requests to HydroPi services.
+
+Requests other than GET change the node, so they must carry the
+DAEMON_HTTP_TOKEN (if configured) as a bearer token.
+"""
 
 import json
+import hmac
 import routes
+from urllib.parse import urlsplit, parse_qsl
 
-from .exceptions import Http400, Http404
+from hydropi.config import config
+from .exceptions import Http400, Http401, Http404
 from . import controllers
 
+JSON_CONTENT_TYPE = 'application/json'
+
 map = routes.Mapper()
 map.connect('/', controller="index")
+map.connect('/sweep', controller="sweep")
+map.connect('/mist', controller="mist")
+map.connect('/metrics', controller="metrics")
+map.connect('/datalog', controller="datalog")
+map.connect('/config', controller="config")
 
 
 class Request:
     """Loose representation of a request."""
 
-    def __init__(self, path, method="GET"):
-        """Create request instance."""
-        self.path = path
+    def __init__(self, path, method="GET", data=None, headers=None):
+        """Create request instance, splitting query params from path."""
+        url = urlsplit(path)
+        self.path = url.path
+        self.params = dict(parse_qsl(url.query))
         self.method = method
+        self.data = data
+        self.headers = headers or {}
 
 
 class Response:
     """Loose representation of a request."""
 
-    def __init__(self, status, data=None):
-        """Create response instance."""
+    def __init__(self, status, data=None, content_type=JSON_CONTENT_TYPE):
+        """Create response instance.
+
+        Data is serialized as JSON unless another content type is given.
+        """
         self.status = status
-        self.content = json.dumps(data or '')
+        self.content_type = content_type
+        if content_type == JSON_CONTENT_TYPE:
+            self.content = json.dumps('' if data is None else data)
+        else:
+            self.content = data or ''
+
+
+def authorize(request):
+    """Raise Http401 unless the request may change the node."""
+    token = config.yml.get('DAEMON_HTTP_TOKEN')
+    if request.method == 'GET' or not token:
+        return
+    given = request.headers.get('authorization', '')
+    if not hmac.compare_digest(given, f'Bearer {token}'):
+        raise Http401("Missing or invalid token")
 
 
-def resolve(method, path):
+def resolve(method, path, data=None, headers=None):
     """Resolve request URI to handler."""
-    request = Request(method=method, path=path)
+    request = Request(path, method=method, data=data, headers=headers)
+    authorize(request)
     route = map.match(request.path)
     if not route:
         raise Http404("Route does not exist")
@@ -40,5 +76,6 @@ def resolve(method, path):
     if hasattr(controller, request.method.lower()):
         return Response(
             200,
-            getattr(controller, request.method.lower())(request))
+            getattr(controller, request.method.lower())(request),
+            getattr(controller, 'content_type', JSON_CONTENT_TYPE))
     raise Http400("Method not allowed for this route")
@@ -1,8 +1,13 @@
 """Run a local HTTP server over a socket.
 
-Listen for instructions from other processes.
+Listen for instructions from other processes. Set DAEMON_HTTP_HOST to listen
+on the network, e.g. for a fleet (see hydropi.server.fleet). The daemon
+won't listen on the network without a DAEMON_HTTP_TOKEN, as anyone who can
+reach it could then change config.
 """
 
+import json
+import ipaddress
 from socket import (
     socket,
     AF_INET,
@@ -14,26 +19,43 @@ from socket import (
 from hydropi.config import config
 from . import routes
 
-HOST, PORT = "127.0.0.1", config.DAEMON_HTTP_PORT
+HOST = config.yml.get('DAEMON_HTTP_HOST', "127.0.0.1")
+PORT = config.DAEMON_HTTP_PORT
 SOCKET_OPT_VALUE = 1
 BUFFER_MAX_BYTES = 4096
 CONNECTION_MAX_BACKLOG = 1
+CLIENT_TIMEOUT_SECONDS = 10     # Drop clients that stall mid-request
 
 
-def listen():
+def is_loopback(host):
+    """Return True if <host> is only reachable from this machine."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def listen(host=HOST, port=PORT):
     """Handle incoming requests."""
+    if not is_loopback(host) and not config.yml.get('DAEMON_HTTP_TOKEN'):
+        raise ValueError(
+            f"Refusing to listen on {host} without DAEMON_HTTP_TOKEN set in"
+            " config.yml, as anyone on the network could change config.")
     with socket(AF_INET, SOCK_STREAM) as sock:
         sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, SOCKET_OPT_VALUE)
-        sock.bind((HOST, PORT))
+        sock.bind((host, port))
         sock.listen(CONNECTION_MAX_BACKLOG)
         while True:
             try:
                 client, address = sock.accept()
-                request = client.recv(BUFFER_MAX_BYTES).decode()
-                method, path = request.split('\r\n')[0].split(' ')[:2]
+                client.settimeout(CLIENT_TIMEOUT_SECONDS)
+                method, path, headers, body = read_request(client)
                 print(f"REQUEST METHOD: {method}")
                 print(f"REQUEST PATH: {path}")
-                response = routes.resolve(method, path)
+                data = json.loads(body) if body else None
+                response = routes.resolve(method, path, data, headers)
                 client.sendall(response_success(response))
             except Exception as exc:
                 client.sendall(response_error(exc))
@@ -41,13 +63,40 @@ def listen():
                 client.close()
 
 
+def read_request(client):
+    """Return method, path, headers and body of a request from <client>.
+
+    Header names are lower case.
+    """
+    request = client.recv(BUFFER_MAX_BYTES)
+    while b'\r\n\r\n' not in request:
+        chunk = client.recv(BUFFER_MAX_BYTES)
+        if not chunk:
+            break
+        request += chunk
+    head, _, body = request.partition(b'\r\n\r\n')
+    lines = head.decode().split('\r\n')
+    method, path = lines[0].split(' ')[:2]
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    while len(body) < length:
+        chunk = client.recv(BUFFER_MAX_BYTES)
+        if not chunk:
+            break
+        body += chunk
+    return method, path, headers, body.decode()
+
+
 def response_success(response):
     """Render HTTP error response from exception."""
     print("RESPONSE SUCCESS")
     code = "OK"
     http_response = (
         f"HTTP/1.1 {response.status} {code}\n"
-        "Content-Type: application/json\n\n"
+        f"Content-Type: {response.content_type}\n\n"
         f"{response.content}\n"
     )
     print(f"Response:\n{http_response}")
@@ -0,0 +1,3 @@
+"""Simulated hardware for running hydropi off-device (DEVMODE)."""
+
+from .plant import Plant, get_plant
@@ -0,0 +1,293 @@
+"""Physics-based model of the hydroponics plant for DEVMODE.
+
+The model tracks the physical state of the system and advances it whenever
+it is observed, integrating the effect of whichever relays were switched on
+in the meantime:
+
+- Reservoir volume: drawn by the pressure pump, replenished by the water
+  valve and mist run-off, and slowly lost to evapotranspiration.
+- Pressure tank: filled by the pump against a falling pump curve, drained by
+  the mist valve. Pressure follows from the charged air volume, as in
+  PressureSensor.get_tank_volume().
+- EC/pH: doser pulses land in an unmixed layer, which disperses quickly
+  while the mix pump runs and slowly otherwise. Plant uptake slowly lowers EC
+  and raises pH.
+- Temperature: a daily cycle for the tank, with a solar gain for the pipe.
+
+Sensors read from the model through ADC quantization and noise, so DEVMODE
+runs exercise the same control logic as the real hardware.
+"""
+
+import math
+import random
+import logging
+from threading import Lock
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.interfaces.controllers.mist_zones import zones
+
+logger = logging.getLogger('hydropi')
+
+
+class Plant:
+    """Simulated reservoir, pressure tank and nutrient solution."""
+
+    # Pumps and valves
+    PUMP_FREE_FLOW_LPS = 0.09       # Pressure pump flow at zero head
+    PUMP_SHUTOFF_PSI = 180          # Pressure at which pump flow stops
+    MIST_FLOW_LPS = 0.05            # Mist flow at MIST_REFERENCE_PSI
+    MIST_REFERENCE_PSI = 115
+    MIST_RETURN_FRACTION = 0.7      # Mist run-off draining to reservoir
+    WATER_FLOW_LPS = 0.1            # Mains water valve
+    DOSER_FLOW_MLPS = 0.637         # As AbstractDoseController.FLOW_RATE
+    EVAPORATION_LPH = 0.02
+
+    # Nutrient solution
+    EC_PER_ML_PER_L = 350           # deliver(ml=20) into 10L -> +700uS
+    PH_PER_ML_PER_L = -1.5          # 5ml of 10X pH down in 15L -> -0.5
+    MIX_TAU_SECONDS = 60            # Dispersal time constant with mix pump
+    DIFFUSE_TAU_SECONDS = 3600      # ... and without
+    EC_UPTAKE_PER_HOUR = -2
+    PH_DRIFT_PER_HOUR = 0.008
+    TAP_WATER_EC = 100
+    TAP_WATER_PH = 7.5
+
+    # Environment
+    TANK_TEMPERATURE_MEAN_C = 22
+    TANK_TEMPERATURE_SWING_C = 4
+    PIPE_SOLAR_GAIN_C = 8
+    AMBIENT_HPA = 1013.25
+
+    # Sensor noise (standard deviation in ADC bits)
+    ADC_BITS = 1024
+    ADC_NOISE_BITS = 1.5
+    ADC_PUMP_NOISE_BITS = 12        # Pressure sensor is noisy with pump on
+
+    def __init__(self):
+        """Initialise plant at target levels."""
+        self.relays = {}
+        self.pins = {
+            role: config.yml.get(key)
+            for role, key in (
+                ('pump', 'PIN_PRESSURE_PUMP'),
+                ('mist', 'PIN_MIST_VALVE'),
+                ('water', 'PIN_WATER_VALVE'),
+                ('nutrient', 'PIN_NUTRIENT_PUMP'),
+                ('ph_down', 'PIN_PH_DOWN_PUMP'),
+                ('peroxide', 'PIN_PEROXIDE_PUMP'),
+                ('mix', 'PIN_MIX_PUMP'),
+            )
+        }
+        self.mist_pins = [zone['pin'] for zone in zones()]
+        self.channels = {
+            config.CHANNEL_PH: 'ph',
+            config.CHANNEL_EC: 'ec',
+            config.CHANNEL_PRESSURE: 'psi',
+            config.CHANNEL_TEMPERATURE_PIPE: 'temperature_c',
+        }
+        self.tank_l = self.psi_to_litres(
+            (config.MIN_PRESSURE_PSI + config.MAX_PRESSURE_PSI) / 2)
+        # Target volume includes water held in the pressure tank
+        self.reservoir_l = max(config.VOLUME_TARGET_L - self.tank_l, 1)
+        self.ec = (config.EC_MIN + config.EC_MAX) / 2
+        self.ph = (config.PH_MIN + config.PH_MAX) / 2
+        self.unmixed_ec = 0
+        self.unmixed_ph = 0
+        self.delivered_ml = {'nutrient': 0, 'ph_down': 0, 'peroxide': 0}
+        self.updated = clock.monotonic()
+        self.lock = Lock()
+
+    # Actuators
+    # -------------------------------------------------------------------------
+
+    def set_relay(self, pin, on):
+        """Record relay state for the given output pin."""
+        with self.lock:
+            self._advance()
+            self.relays[pin] = on
+
+    def is_on(self, role):
+        """Return True if the relay for <role> is on."""
+        if role == 'mist':
+            return any(self.relays.get(p, False) for p in self.mist_pins)
+        return self.relays.get(self.pins.get(role), False)
+
+    # Physics
+    # -------------------------------------------------------------------------
+
+    def psi_to_litres(self, psi):
+        """Return pressure tank water volume at <psi>."""
+        base = config.PRESSURE_TANK_BASE_PSI
+        if psi <= base:
+            return 0
+        return config.PRESSURE_TANK_VOLUME_L * (1 - base / psi)
+
+    @property
+    def psi(self):
+        """Return pressure tank pressure from water volume."""
+        fraction = min(self.tank_l / config.PRESSURE_TANK_VOLUME_L, 0.99)
+        return config.PRESSURE_TANK_BASE_PSI / (1 - fraction)
+
+    @property
+    def temperature_c(self):
+        """Return reservoir temperature for the time of day."""
+        return (
+            self.TANK_TEMPERATURE_MEAN_C
+            + self.TANK_TEMPERATURE_SWING_C * self._daylight()
+        )
+
+    @property
+    def pipe_temperature_c(self):
+        """Return temperature in the sun-exposed pipe."""
+        return (
+            self.temperature_c
+            + self.PIPE_SOLAR_GAIN_C * max(0, self._daylight())
+        )
+
+    def _daylight(self):
+        """Return daily cycle from -1 (03:00) to 1 (15:00)."""
+        now = clock.now()
+        hours = now.hour + now.minute / 60
+        return math.sin(2 * math.pi * (hours - 9) / 24)
+
+    def _advance(self):
+        """Integrate plant state up to the current time."""
+        now = clock.monotonic()
+        dt = now - self.updated
+        self.updated = now
+        if dt <= 0:
+            return
+
+        # Pressure pump moves water from reservoir to pressure tank
+        if self.is_on('pump') and self.reservoir_l > 0:
+            flow = self.PUMP_FREE_FLOW_LPS * max(
+                0, 1 - self.psi / self.PUMP_SHUTOFF_PSI)
+            litres = min(flow * dt, self.reservoir_l)
+            self.reservoir_l -= litres
+            self.tank_l += litres
+
+        # Mist valves drain pressure tank, with run-off back to reservoir
+        open_valves = sum(self.relays.get(p, False) for p in self.mist_pins)
+        if open_valves and self.tank_l > 0:
+            flow = open_valves * self.MIST_FLOW_LPS * math.sqrt(
+                self.psi / self.MIST_REFERENCE_PSI)
+            litres = min(flow * dt, self.tank_l)
+            self.tank_l -= litres
+            self.reservoir_l += litres * self.MIST_RETURN_FRACTION
+
+        # Mains water dilutes the solution
+        if self.is_on('water'):
+            litres = self.WATER_FLOW_LPS * dt
+            total = self.reservoir_l + litres
+            self.ec = (self.ec * self.reservoir_l
+                       + self.TAP_WATER_EC * litres) / total
+            self.ph = (self.ph * self.reservoir_l
+                       + self.TAP_WATER_PH * litres) / total
+            self.reservoir_l = total
+
+        # Doser pumps add to the unmixed layer
+        for role in self.delivered_ml:
+            if self.is_on(role):
+                ml = self.DOSER_FLOW_MLPS * dt
+                self.delivered_ml[role] += ml
+                ml_per_l = ml / max(self.reservoir_l, 1)
+                if role == 'nutrient':
+                    self.unmixed_ec += self.EC_PER_ML_PER_L * ml_per_l
+                elif role == 'ph_down':
+                    self.unmixed_ph += self.PH_PER_ML_PER_L * ml_per_l
+
+        # Unmixed additions disperse into the bulk solution
+        tau = (self.MIX_TAU_SECONDS if self.is_on('mix')
+               else self.DIFFUSE_TAU_SECONDS)
+        fraction = 1 - math.exp(-dt / tau)
+        self.ec += self.unmixed_ec * fraction
+        self.ph += self.unmixed_ph * fraction
+        self.unmixed_ec *= 1 - fraction
+        self.unmixed_ph *= 1 - fraction
+
+        # Slow drift from plant uptake and evaporation
+        hours = dt / 3600
+        self.ec = max(0, self.ec + self.EC_UPTAKE_PER_HOUR * hours)
+        self.ph += self.PH_DRIFT_PER_HOUR * hours
+        self.reservoir_l = max(
+            0, self.reservoir_l - self.EVAPORATION_LPH * hours)
+
+    # Sensors
+    # -------------------------------------------------------------------------
+
+    def sense(self, channel):
+        """Return current true value for the given ADC channel."""
+        with self.lock:
+            self._advance()
+            return getattr(self, self.channels[channel])
+
+    def adc_noise_volts(self, channel, vref):
+        """Return random ADC noise in volts for the given channel."""
+        bits = self.ADC_NOISE_BITS
+        if self.channels.get(channel) == 'psi' and self.is_on('pump'):
+            bits = self.ADC_PUMP_NOISE_BITS
+        return random.gauss(0, bits) * vref / self.ADC_BITS
+
+    def quantize_volts(self, volts, vref):
+        """Round voltage to the nearest ADC step, as read by the MCP3008."""
+        bits = min(max(round(volts * self.ADC_BITS / vref), 0),
+                   self.ADC_BITS - 1)
+        return vref * bits / self.ADC_BITS
+
+    def depth_hpa(self):
+        """Return absolute pressure at the depth sensor (hPa)."""
+        from hydropi.interfaces.sensors.depth import (
+            HPA_TO_DEPTH_M,
+            depth_to_volume,
+        )
+        with self.lock:
+            self._advance()
+            litres = self.reservoir_l
+
+        # Invert depth_to_volume by bisection
+        low, high = 0, config.TANK_HEIGHT_MM
+        for i in range(30):
+            mid = (low + high) / 2
+            if depth_to_volume(mid) < litres:
+                low = mid
+            else:
+                high = mid
+        return (
+            self.AMBIENT_HPA
+            + low / HPA_TO_DEPTH_M
+            + random.gauss(0, 0.02)
+        )
+
+    def summary(self):
+        """Return current state as a dict."""
+        with self.lock:
+            self._advance()
+            return {
+                'reservoir_l': round(self.reservoir_l, 3),
+                'tank_l': round(self.tank_l, 3),
+                'psi': round(self.psi, 1),
+                'ec': round(self.ec),
+                'ph': round(self.ph, 3),
+                'temperature_c': round(self.temperature_c, 1),
+                'relays': {
+                    role: self.is_on(role) for role in self.pins
+                },
+                'delivered_ml': {
+                    k: round(v, 1) for k, v in self.delivered_ml.items()
+                },
+            }
+
+
+_plant = None
+_plant_lock = Lock()
+
+
+def get_plant():
+    """Return the shared plant model."""
+    global _plant
+    with _plant_lock:
+        if _plant is None:
+            logger.warning("DEVMODE: sensors read from simulated plant")
+            _plant = Plant()
+    return _plant
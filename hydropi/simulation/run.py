@@ -0,0 +1,71 @@
+"""Run misting and maintenance against the simulated plant in virtual time.
+
+Requires DEVMODE. For example, to simulate a week of operation:
+
+    python -m hydropi.simulation.run --days 7
+"""
+
+import json
+import logging
+from threading import Thread
+from argparse import ArgumentParser
+from datetime import datetime
+
+from hydropi import clock
+from hydropi.config import config
+from .plant import get_plant
+
+logger = logging.getLogger('hydropi')
+
+
+def simulate(days, start=None):
+    """Run mist() and sweep() for <days> of virtual time.
+
+    Return the plant summary at the end of the run.
+    """
+    if not config.DEVMODE:
+        raise RuntimeError("Simulation requires DEVMODE")
+    clock.set_clock(clock.VirtualClock(start))
+
+    # Import after installing the clock so that module state is virtual
+    from hydropi.process.delivery import mist
+    from hydropi.process.maintenance import sweep
+
+    plant = get_plant()
+    for target in (mist, sweep):
+        Thread(target=target, name=target.__name__, daemon=True).start()
+    clock.sleep(days * 24 * 3600)
+    return plant.summary()
+
+
+def get_args():
+    """Parse command line arguments."""
+    ap = ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument(
+        '--days',
+        type=float,
+        default=7,
+        help="Days of operation to simulate",
+    )
+    ap.add_argument(
+        '--start',
+        type=datetime.fromisoformat,
+        help="Virtual start time (ISO format, default now)",
+    )
+    return ap.parse_args()
+
+
+def main():
+    """Run simulation and print the final plant state."""
+    args = get_args()
+    real = clock.Clock()
+    started = real.monotonic()
+    summary = simulate(args.days, args.start)
+    logger.info(
+        f"Simulated {args.days} days in"
+        f" {real.monotonic() - started:.1f} seconds")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Test adaptive sequential sampling of analog sensors."""
+
+import random
+import unittest
+
+from hydropi import clock
+from hydropi.fakes import SkipClock
+from hydropi.interfaces.sensors.analog import AnalogInterface
+
+
+class NoisySensor(AnalogInterface):
+    """Analog sensor returning gaussian noise about 1.5 volts."""
+
+    CHANNEL = 0
+    TEXT = 'test'
+    UNIT = ''
+    MIN_UNITS = 0
+    MAX_UNITS = 100
+    MIN_VOLTS = 0
+    MAX_VOLTS = 3.3
+    RANGE_LOWER = 40
+    RANGE_UPPER = 60
+    READ_TOLERANCE = 0.5
+
+    def __init__(self, sd):
+        """Create sensor with noise of <sd> volts."""
+        self.sd = sd
+        self.samples = 0
+        super().__init__()
+
+    def get_value(self, as_volts=False):
+        """Return a noisy sample."""
+        self.samples += 1
+        return random.gauss(1.5, self.sd)
+
+
+class MissingSensor(NoisySensor):
+    """Analog sensor returning no samples."""
+
+    def get_value(self, as_volts=False):
+        """Return no sample."""
+        self.samples += 1
+        return None
+
+
+class AdaptiveSamplingTestCase(unittest.TestCase):
+    """Sample until the median is within tolerance."""
+
+    def setUp(self):
+        """Skip sleeps between samples."""
+        random.seed(0)
+        self.original_clock = clock.get_clock()
+        clock.set_clock(SkipClock())
+
+    def tearDown(self):
+        """Restore clock."""
+        clock.set_clock(self.original_clock)
+
+    def test_stable_signal_stops_early(self):
+        """A quiet signal is read in MIN_SAMPLES."""
+        sensor = NoisySensor(sd=0.001)
+        sensor.read()
+        self.assertEqual(sensor.last_sample['n'], sensor.MIN_SAMPLES)
+        self.assertLessEqual(sensor.last_sample['error'], 0.5)
+
+    def test_noisy_signal_samples_more(self):
+        """A noisy signal is sampled until the error is within tolerance."""
+        sensor = NoisySensor(sd=0.05)
+        sensor.read()
+        self.assertGreater(sensor.last_sample['n'], sensor.MIN_SAMPLES)
+        self.assertLess(sensor.last_sample['n'], sensor.MAX_SAMPLES)
+        self.assertLessEqual(sensor.last_sample['error'], 0.5)
+
+    def test_max_samples(self):
+        """Sampling stops at MAX_SAMPLES if tolerance can't be reached."""
+        sensor = NoisySensor(sd=1)
+        sensor.read()
+        self.assertEqual(sensor.samples, sensor.MAX_SAMPLES)
+        self.assertGreater(sensor.last_sample['error'], 0.5)
+
+    def test_fixed_n(self):
+        """Explicit <n> takes exactly that many samples."""
+        sensor = NoisySensor(sd=0.001)
+        sensor.read(n=12)
+        self.assertEqual(sensor.samples, 12)
+        self.assertEqual(sensor.last_sample, {'n': 12, 'error': None})
+
+    def test_zero_volts_kept(self):
+        """Samples of 0.0V are valid readings."""
+        sensor = NoisySensor(sd=0)
+        sensor.get_value = lambda as_volts=False: 0.0
+        volts, n, error = sensor.sample_volts(0.01)
+        self.assertEqual(volts, 0.0)
+        self.assertEqual(n, sensor.MIN_SAMPLES)
+
+    def test_no_valid_samples(self):
+        """Without valid samples, sampling stops at max_n with no value."""
+        sensor = MissingSensor(sd=0)
+        volts, n, error = sensor.sample_volts(0.01, max_n=10)
+        self.assertIsNone(volts)
+        self.assertEqual(n, 0)
+        self.assertEqual(sensor.samples, 10)
+        self.assertIsNone(sensor.read())
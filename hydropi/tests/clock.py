@@ -0,0 +1,50 @@
+"""Test the virtual clock."""
+
+import time
+import unittest
+from threading import Thread, Condition
+from datetime import datetime, timedelta
+
+from hydropi.clock import VirtualClock
+
+
+class VirtualClockTestCase(unittest.TestCase):
+    """Advance virtual time across sleeping threads."""
+
+    def setUp(self):
+        """Create clock at a fixed start time."""
+        self.start = datetime(2022, 1, 1, 12, 0)
+        self.clock = VirtualClock(self.start)
+
+    def test_sleep(self):
+        """A long virtual sleep returns almost immediately."""
+        started = time.monotonic()
+        self.clock.sleep(7 * 24 * 3600)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.clock.now(), self.start + timedelta(days=7))
+        self.assertEqual(self.clock.monotonic(), 7 * 24 * 3600)
+
+    def test_threads_wake_in_order(self):
+        """Threads wake at their virtual deadlines, earliest first."""
+        woken = []
+
+        def sleeper(seconds):
+            self.clock.sleep(seconds)
+            woken.append((seconds, self.clock.monotonic()))
+
+        threads = [Thread(target=sleeper, args=(s,)) for s in (300, 60, 120)]
+        for t in threads:
+            t.start()
+        self.clock.sleep(600)
+        for t in threads:
+            t.join()
+        self.assertEqual(woken, [(60, 60), (120, 120), (300, 300)])
+        self.assertEqual(self.clock.monotonic(), 600)
+
+    def test_wait_for_timeout(self):
+        """Condition wait with timeout elapses in virtual time."""
+        condition = Condition()
+        with condition:
+            result = self.clock.wait_for(condition, lambda: False, 3600)
+        self.assertFalse(result)
+        self.assertEqual(self.clock.monotonic(), 3600)
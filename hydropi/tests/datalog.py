@@ -0,0 +1,107 @@
+"""Test datalog partition compaction and retention."""
+
+import unittest
+from unittest import mock
+from datetime import datetime
+
+from hydropi.process import datalog
+from hydropi.config.datalog import (
+    DatalogStore,
+    month_start,
+    partition_month,
+    partition_name,
+)
+
+
+class MockDB:
+    """Mocked DB with a datalog table name."""
+
+    DATALOG_TABLE_NAME = 'datalog'
+
+
+class MockCursor:
+    """Record executed statements."""
+
+    def __init__(self):
+        """Create empty statement log."""
+        self.statements = []
+
+    def execute(self, query, params=()):
+        """Record statement."""
+        self.statements.append(query)
+
+    def fetchall(self):
+        """Return no rows."""
+        return []
+
+
+class PartitionedStore(DatalogStore):
+    """Store with partitions from each month of 2023 and 2024."""
+
+    def _partitions(self, cursor, table):
+        """Return monthly partitions of <table>."""
+        return [
+            (partition_name(table, month), month)
+            for month in (datetime(y, m, 1) for y in (2023, 2024)
+                          for m in range(1, 13))
+        ]
+
+    def _numeric_columns(self, cursor):
+        """Return reading columns."""
+        return ['ec', 'ph']
+
+
+class DatalogTestCase(unittest.TestCase):
+    """Compact whole months and drop partitions past retention."""
+
+    def test_months(self):
+        """Month arithmetic and partition names round trip."""
+        self.assertEqual(
+            month_start(datetime(2024, 1, 31, 12), -1), datetime(2023, 12, 1))
+        self.assertEqual(
+            month_start(datetime(2024, 12, 5), 1), datetime(2025, 1, 1))
+        name = partition_name('datalog_hourly', datetime(2024, 3, 1))
+        self.assertEqual(name, 'datalog_hourly_p202403')
+        self.assertEqual(partition_month(name), datetime(2024, 3, 1))
+        self.assertIsNone(partition_month('datalog_unpartitioned'))
+
+    def test_compact_whole_months(self):
+        """Only months entirely older than the rollup age are compacted."""
+        store = PartitionedStore(MockDB, rollup_after_days=31)
+        compacted = store._compact(MockCursor(), datetime(2024, 6, 15))
+        # 2024-05 ends within 31 days, so 2024-04 is the last compacted
+        self.assertEqual(compacted[0], 'datalog_p202301')
+        self.assertEqual(compacted[-1], 'datalog_p202404')
+
+    def test_retention(self):
+        """Partitions before the retention period are dropped."""
+        store = PartitionedStore(MockDB, retention_months=12)
+        dropped = store._enforce_retention(
+            MockCursor(), datetime(2024, 6, 15))
+        self.assertEqual(
+            [n for n in dropped if n.startswith('datalog_hourly')],
+            [f'datalog_hourly_p2023{m:02}' for m in range(1, 6)])
+        self.assertEqual(len(dropped), 10)
+
+
+class StopLoop(Exception):
+    """Raised to end the maintenance loop."""
+
+
+class DatalogRunTestCase(unittest.TestCase):
+    """Maintenance keeps running while the database is down."""
+
+    @mock.patch('hydropi.process.errors.telegram.notify')
+    @mock.patch.object(datalog, 'DatalogStore')
+    @mock.patch.object(datalog, 'DB')
+    def test_database_down(self, db, store, notify):
+        """Connection is retried on the next interval."""
+        db.side_effect = [ConnectionError("down"), MockDB()]
+        store.return_value.maintain.return_value = (0, 0)
+        sleep = mock.Mock(side_effect=[None, None, StopLoop])
+        with mock.patch.dict(datalog.config.yml, DATABASE={}), \
+                mock.patch.object(datalog.clock, 'sleep', sleep):
+            with self.assertLogs('hydropi', 'ERROR'):
+                self.assertRaises(StopLoop, datalog.run)
+        self.assertEqual(db.call_count, 2)
+        self.assertEqual(store.return_value.maintain.call_count, 2)
@@ -1,10 +1,16 @@
 """Test the database interface."""
 
 import os
+import yaml
+import shutil
 import sqlite3
 import psycopg2
+import tempfile
 import unittest
+from unittest import mock
+from hydropi.config import config
 from hydropi.config.db import DB
+from hydropi.config.main import Config
 
 
 class MockConfig:
@@ -125,7 +131,73 @@ class DatabaseTestCase(unittest.TestCase):
             k in self.db.keys()
         )
 
+    def test_values_are_not_interpolated(self):
+        """String values containing SQL syntax are stored verbatim."""
+        value = "it's; DROP TABLE config; --"
+        self.db.set('KEY_A', value)
+        self.assertEqual(self.db.get('KEY_A'), value)
+        self.db.set('KEY_A', 'foo')
+        self.assertEqual(self.db.get('KEY_A'), 'foo')
+        self.assertEqual(self.db.keys(), ['KEY_A'])
+
+    def test_can_sync_config(self):
+        """DB can add absent and remove redundant keys in one sync."""
+        self.db.set('KEY_OLD', 'old')
+        self.db.set('KEY_INT', 2)
+        added, removed = self.db.sync(self.data)
+        self.assertEqual(added, sorted(set(self.data) - {'KEY_INT'}))
+        self.assertEqual(removed, ['KEY_OLD'])
+        self.assertEqual(set(self.db.keys()), set(self.data))
+        # Existing values are kept
+        self.assertEqual(self.db.get('KEY_INT'), 2)
+        for k in ('KEY_A', 'KEY_FLOAT', 'KEY_BOOL'):
+            self.assertEqual(self.db.get(k), self.data[k])
+        self.assertEqual(self.db.sync(self.data), ([], []))
+
     def test_will_error_on_config_schema_mismatch(self):
         """DB will alert config table wrong schema."""
         self.db.CONFIG_KEY_FIELD = 'wrong'
         self.assertRaises(ValueError, self.db._assert_schema)
+
+
+class ConfigConnectTestCase(unittest.TestCase):
+    """Config falls back to config.yml if the database can't be reached."""
+
+    def setUp(self):
+        """Write config.yml for a database that doesn't exist."""
+        self.tmp = tempfile.mkdtemp()
+        yml = dict(config.yml, CONFIG_DIR=self.tmp)
+        yml['DATABASE'] = dict(
+            MockConfig.DATABASE, PG_DBNAME='hydropi_does_not_exist')
+        self.fname = os.path.join(self.tmp, 'config.yml')
+        with open(self.fname, 'w') as f:
+            yaml.safe_dump(yml, f)
+
+    def tearDown(self):
+        """Remove config dir."""
+        shutil.rmtree(self.tmp)
+
+    def test_fallback_to_yml(self):
+        """Connection is not retried within the back-off interval."""
+        with mock.patch.dict(os.environ, {'DISABLE_HYDROPI_LOG': '1'}):
+            cfg = Config(self.fname)
+        with self.assertLogs('hydropi', 'ERROR'):
+            self.assertEqual(cfg.EC_MIN, config.yml['EC_MIN'])
+        self.assertIsNone(cfg.db)
+        with self.assertNoLogs('hydropi', 'ERROR'):
+            self.assertEqual(cfg.EC_MIN, config.yml['EC_MIN'])
+            self.assertIsNone(cfg.db)
+
+    def test_retry_after_backoff(self):
+        """Connection is retried once the back-off interval has passed."""
+        with mock.patch.dict(os.environ, {'DISABLE_HYDROPI_LOG': '1'}):
+            cfg = Config(self.fname)
+        with self.assertLogs('hydropi', 'ERROR'):
+            self.assertIsNone(cfg.db)
+        cfg._db_failed_at -= cfg.DB_RETRY_SECONDS
+        db = mock.Mock()
+        db.sync.return_value = ([], [])
+        with mock.patch('hydropi.config.main.DB', return_value=db):
+            with self.assertLogs('hydropi', 'INFO'):
+                self.assertIs(cfg.db, db)
+        self.assertIsNone(cfg._db_failed_at)
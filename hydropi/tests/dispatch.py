@@ -0,0 +1,127 @@
+"""Test background delivery of notifications with an on-disk outbox."""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from threading import Event
+
+from hydropi.notifications.dispatch import Dispatcher
+
+
+class StubSender:
+    """Record sent messages, optionally failing or waiting to send."""
+
+    def __init__(self, fail=False):
+        """Create sender."""
+        self.fail = fail
+        self.sent = []
+        self.release = Event()
+        self.release.set()
+
+    def __call__(self, message):
+        """Send a message."""
+        self.release.wait(5)
+        if self.fail:
+            raise ConnectionError("offline")
+        self.sent.append(message)
+
+
+class DispatcherTestCase(unittest.TestCase):
+    """Messages that can't be sent are kept in the outbox and replayed."""
+
+    def setUp(self):
+        """Create outbox directory."""
+        self.tmp = tempfile.mkdtemp()
+        self.outbox = os.path.join(self.tmp, 'outbox.jsonl')
+        self.dispatchers = []
+
+    def tearDown(self):
+        """Stop dispatchers and remove outbox directory."""
+        for dispatcher in self.dispatchers:
+            dispatcher.stop()
+        shutil.rmtree(self.tmp)
+
+    def dispatcher(self, send, maxsize=10):
+        """Return a dispatcher that sends without rate limiting."""
+        dispatcher = Dispatcher(
+            send, self.outbox, maxsize=maxsize, min_interval=0)
+        self.dispatchers.append(dispatcher)
+        return dispatcher
+
+    def outbox_messages(self):
+        """Return messages in the outbox."""
+        if not os.path.exists(self.outbox):
+            return []
+        with open(self.outbox) as f:
+            return [json.loads(line)['text'] for line in f]
+
+    def wait_for(self, condition):
+        """Wait until <condition>() is true."""
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "Timed out")
+            time.sleep(0.01)
+
+    def test_failed_send_to_outbox(self):
+        """A message that fails to send is written to the outbox."""
+        sender = StubSender(fail=True)
+        dispatcher = self.dispatcher(sender)
+        dispatcher.submit('low pressure')
+        self.wait_for(lambda: self.outbox_messages() == ['low pressure'])
+
+    def test_queue_full(self):
+        """Submit doesn't block while sending, and overflow is kept."""
+        sender = StubSender()
+        sender.release.clear()
+        dispatcher = self.dispatcher(sender, maxsize=1)
+        dispatcher.submit('first')
+        self.wait_for(lambda: dispatcher.queue.empty())
+        # Sender thread is now waiting on the send of 'first'
+        started = time.monotonic()
+        for message in ('second', 'third'):
+            dispatcher.submit(message)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.outbox_messages(), ['third'])
+        sender.release.set()
+        self.wait_for(lambda: len(sender.sent) == 3)
+        self.assertEqual(
+            sender.sent, ['first', '[Delayed] third', 'second'])
+        self.assertFalse(os.path.exists(self.outbox))
+
+    def test_stop_persists_pending(self):
+        """Queued messages and repeat counts are saved on stop."""
+        sender = StubSender()
+        sender.release.clear()
+        dispatcher = self.dispatcher(sender)
+        dispatcher.STOP_TIMEOUT_SECONDS = 0.1
+        dispatcher.submit('tank low')
+        self.wait_for(lambda: dispatcher.queue.empty())
+        dispatcher.submit('tank low')
+        dispatcher.submit('pump fault')
+        dispatcher.stop()
+        self.assertEqual(self.outbox_messages(), ['tank low', 'pump fault'])
+        sender.release.set()
+
+    def test_replay_on_start(self):
+        """The outbox of a previous run is sent when the thread starts."""
+        dispatcher = self.dispatcher(StubSender(fail=True))
+        dispatcher._write_outbox(['tank low', 'pump fault'])
+
+        sender = StubSender()
+        dispatcher = self.dispatcher(sender)
+        dispatcher.start()
+        self.wait_for(lambda: len(sender.sent) == 2)
+        self.assertEqual(
+            sender.sent, ['[Delayed] tank low', '[Delayed] pump fault'])
+        self.wait_for(lambda: not os.path.exists(self.outbox))
+
+    def test_replay_keeps_unsent(self):
+        """Messages still unsent after a failed replay stay in the outbox."""
+        sender = StubSender(fail=True)
+        dispatcher = self.dispatcher(sender)
+        dispatcher._write_outbox(['tank low', 'pump fault'])
+        dispatcher._flush_outbox()
+        self.assertEqual(self.outbox_messages(), ['tank low', 'pump fault'])
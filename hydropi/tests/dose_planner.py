@@ -0,0 +1,80 @@
+"""Test batch dosing within a single mix cycle."""
+
+import unittest
+
+from hydropi.config import config
+from hydropi.fakes import backends
+from hydropi.interfaces import DosePlanner, ECController, PHController
+from hydropi.interfaces.controllers.dose import AbstractDoseController
+
+
+class SpareDoseController(AbstractDoseController):
+    """Doser pump for a third additive on a spare relay."""
+
+    ADDITIVE = 'spare'
+    PIN = config.SPARE_RELAY_PIN_A
+
+
+class DosePlannerTestCase(unittest.TestCase):
+    """Pack doses onto doser lanes and report delivered volumes."""
+
+    def setUp(self):
+        """Allow two doser pumps at once."""
+        self.original_config = dict(config.yml)
+        config.yml['DOSER_MAX_CONCURRENT'] = 2
+
+    def tearDown(self):
+        """Restore config."""
+        config.yml.clear()
+        config.yml.update(self.original_config)
+
+    def test_lanes_longest_first(self):
+        """Longest doses are spread across lanes first."""
+        planner = DosePlanner()
+        planner.add(PHController(), 2)
+        planner.add(ECController(), 20)
+        planner.add(SpareDoseController(), 15)
+        lanes = planner.lanes()
+        self.assertEqual(
+            [[ml for c, ml in lane] for lane in lanes],
+            [[20], [15, 2]])
+
+    def test_same_pump_merged(self):
+        """Doses of one additive never run on two lanes at once."""
+        planner = DosePlanner()
+        planner.add(ECController(), 20)
+        planner.add(PHController(), 2)
+        planner.add(ECController(), 15)
+        lanes = planner.lanes()
+        self.assertEqual(
+            [[ml for c, ml in lane] for lane in lanes],
+            [[35], [2]])
+
+    def test_sequential(self):
+        """One lane runs every dose in turn."""
+        config.yml['DOSER_MAX_CONCURRENT'] = 1
+        planner = DosePlanner()
+        planner.add(PHController(), 2)
+        planner.add(ECController(), 20)
+        self.assertEqual(len(planner.lanes()), 1)
+
+    def test_sequential_by_default(self):
+        """Without DOSER_MAX_CONCURRENT, doses run one at a time."""
+        del config.yml['DOSER_MAX_CONCURRENT']
+        planner = DosePlanner()
+        planner.add(PHController(), 2)
+        planner.add(ECController(), 20)
+        self.assertEqual(len(planner.lanes()), 1)
+
+    def test_delivered_per_additive(self):
+        """Run returns total volume delivered per additive."""
+        planner = DosePlanner()
+        planner.add(ECController(), 10)
+        planner.add(ECController(), 5)
+        planner.add(PHController())
+        with backends():
+            delivered = planner.run()
+        self.assertEqual(delivered, {
+            'nutrient': 15,
+            'ph_down': PHController.DEFAULT_ML,
+        })
@@ -0,0 +1,131 @@
+"""Test dose computation from the learned dose response."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.fakes import SkipClock
+from hydropi.process import dosing
+from hydropi.process.volume import VolumeEstimator
+from hydropi.process.dosing import DoseResponse
+
+
+class DoseResponseTestCase(unittest.TestCase):
+    """Fit response coefficient from doses and compute one-shot doses."""
+
+    def setUp(self):
+        """Create response in a temporary calibration dir."""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'dose', 'nutrient.json')
+        self.response = DoseResponse('nutrient', 350, self.path)
+        self.original_clock = clock.get_clock()
+        clock.set_clock(SkipClock())
+
+    def tearDown(self):
+        """Remove calibration dir and restore clock."""
+        clock.set_clock(self.original_clock)
+        shutil.rmtree(self.tmp)
+
+    def dose_and_measure(self, ml, ec, litres, coefficient):
+        """Record a dose and the reading after it has mixed in."""
+        self.response.record_dose(ml, ec, litres)
+        self.response.update(ec)  # Not yet mixed in
+        clock.sleep(config.MIX_PUMP_SECONDS + 300)
+        self.response.update(ec + coefficient * ml / litres)
+
+    def test_unlearned_dose_undershoots(self):
+        """Doses from the default coefficient are scaled down."""
+        # 700uS in 10L at 350 uS per ml/L -> 20ml, halved
+        self.assertEqual(self.response.dose(1300, 2000, 10, 40), 10)
+
+    def test_learn_coefficient(self):
+        """Coefficient is fitted from dose -> reading deltas."""
+        self.dose_and_measure(10, 1500, 12, 250)
+        self.dose_and_measure(15, 1400, 11, 250)
+        self.dose_and_measure(5, 1800, 12, 250)
+        self.assertAlmostEqual(self.response.coefficient(), 250)
+        self.assertEqual(self.response.dose(1500, 2000, 10, 40), 20)
+        reloaded = DoseResponse('nutrient', 350, self.path)
+        self.assertAlmostEqual(reloaded.coefficient(), 250)
+
+    def test_stale_dose_ignored(self):
+        """Doses not re-measured soon after mixing are discarded."""
+        self.response.record_dose(10, 1500, 12)
+        clock.sleep(config.MIX_PUMP_SECONDS + self.response.MAX_AGE_SECONDS)
+        self.response.update(1700)
+        self.assertEqual(self.response.state['n'], 0)
+        self.assertEqual(self.response.state['pending'], [])
+
+    def test_safety_cap(self):
+        """Doses are capped at the maximum volume."""
+        self.assertEqual(self.response.dose(100, 2000, 20, 40), 40)
+
+    def test_no_dose_away_from_target(self):
+        """No dose is given when the additive would overshoot further."""
+        self.assertEqual(self.response.dose(2100, 2000, 10, 40), 0)
+        ph_down = DoseResponse('ph_down', -1.5, self.path + '.ph')
+        self.assertEqual(ph_down.dose(5.5, 6.0, 10, 10), 0)
+        self.assertGreater(ph_down.dose(6.6, 6.0, 10, 10), 0)
+
+
+class DoseNeededTestCase(unittest.TestCase):
+    """Dose only out-of-range readings that can be corrected."""
+
+    def setUp(self):
+        """Use responses in a temporary calibration dir."""
+        self.tmp = tempfile.mkdtemp()
+        self.responses = dosing.nutrient, dosing.ph_down
+        dosing.nutrient = DoseResponse(
+            'nutrient', 350, os.path.join(self.tmp, 'nutrient.json'))
+        dosing.ph_down = DoseResponse(
+            'ph_down', -1.5, os.path.join(self.tmp, 'ph_down.json'))
+        self.original_config = dict(config.yml)
+
+    def tearDown(self):
+        """Restore responses and config and remove calibration dir."""
+        dosing.nutrient, dosing.ph_down = self.responses
+        config.yml.clear()
+        config.yml.update(self.original_config)
+        shutil.rmtree(self.tmp)
+
+    def test_in_range(self):
+        """No dose is needed in range or outside of it the wrong way."""
+        self.assertFalse(dosing.needed(ec=config.EC_MIN, ph=config.PH_MAX))
+        self.assertFalse(dosing.needed(ec=config.EC_MAX + 100))
+        self.assertFalse(dosing.needed(ph=config.PH_MIN - 0.5))
+        self.assertFalse(dosing.needed())
+
+    def test_out_of_range(self):
+        """Low EC or high pH needs a dose."""
+        self.assertTrue(dosing.needed(ec=config.EC_MIN - 100))
+        self.assertTrue(dosing.needed(ph=config.PH_MAX + 0.2))
+
+    def test_not_while_measuring(self):
+        """An additive isn't dosed again until its last dose is observed."""
+        dosing.nutrient.record_dose(10, config.EC_MIN - 100, 20)
+        self.assertFalse(dosing.needed(ec=config.EC_MIN - 100))
+        self.assertTrue(dosing.needed(
+            ec=config.EC_MIN - 100, ph=config.PH_MAX + 0.2))
+
+    def test_auto_dose_off_by_default(self):
+        """Sweeps don't dose unless AUTO_DOSE is set."""
+        config.yml.pop('AUTO_DOSE', None)
+        with mock.patch.object(dosing, 'restore') as restore:
+            self.assertIsNone(dosing.auto({'ec': config.EC_MIN - 100}))
+        restore.assert_not_called()
+
+    def test_auto_dose(self):
+        """With AUTO_DOSE, a low reading starts a dose in a thread."""
+        config.yml['AUTO_DOSE'] = True
+        with mock.patch.object(dosing, 'restore') as restore:
+            dosing.auto({'ec': config.EC_MIN - 100, 'ph': None}).join()
+        restore.assert_called_once_with(ec=config.EC_MIN - 100, ph=None)
+
+    def test_no_dose_without_volume(self):
+        """No dose is computed before the reservoir has been measured."""
+        with mock.patch.object(dosing, 'estimator', VolumeEstimator()):
+            self.assertEqual(dosing.restore(ec=config.EC_MIN - 100), {})
@@ -0,0 +1,87 @@
+"""Test the structured JSON-lines event log."""
+
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from hydropi.config.eventlog import (
+    EVENT_LOG_FILENAME,
+    JsonLinesFormatter,
+    SamplingFilter,
+    query,
+    start_listener,
+)
+
+
+def record(module, level=logging.DEBUG, msg='reading'):
+    """Return a log record from <module>."""
+    r = logging.LogRecord(
+        'hydropi', level, f'{module}.py', 1, msg, None, None)
+    r.module = module
+    return r
+
+
+class SamplingFilterTestCase(unittest.TestCase):
+    """Thin DEBUG records per module."""
+
+    def test_rate(self):
+        """A rate of 0.2 keeps every fifth DEBUG record."""
+        f = SamplingFilter({'analog': 0.2})
+        kept = [f.filter(record('analog')) for i in range(10)]
+        self.assertEqual(kept, [True, False, False, False, False] * 2)
+
+    def test_unlisted_and_info_kept(self):
+        """Other modules and INFO records are always kept."""
+        f = SamplingFilter({'analog': 0})
+        self.assertFalse(f.filter(record('analog')))
+        self.assertTrue(f.filter(record('analog', logging.INFO)))
+        self.assertTrue(f.filter(record('depth')))
+
+    def test_no_rates(self):
+        """Without EVENT_LOG_SAMPLING every record is kept."""
+        f = SamplingFilter(None)
+        self.assertTrue(all(f.filter(record('analog')) for i in range(5)))
+
+
+class EventLogSinkTestCase(unittest.TestCase):
+    """Write records as JSON lines from a listener thread and query them."""
+
+    def setUp(self):
+        """Create log directory."""
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove log directory."""
+        shutil.rmtree(self.tmp)
+
+    def test_write_and_query(self):
+        """Records are written one JSON object per line and filtered."""
+        handler = logging.FileHandler(f'{self.tmp}/{EVENT_LOG_FILENAME}')
+        handler.setFormatter(JsonLinesFormatter())
+        handler.addFilter(SamplingFilter({'analog': 0.5}))
+        queue_handler, listener = start_listener([handler])
+        for i in range(4):
+            queue_handler.handle(record('analog', msg=f'sample {i}'))
+        queue_handler.handle(record('pressure', logging.WARNING, 'low'))
+        listener.stop()
+        handler.close()
+
+        with open(f'{self.tmp}/{EVENT_LOG_FILENAME}') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(
+            [e['msg'] for e in lines], ['sample 0', 'sample 2', 'low'])
+        self.assertEqual(
+            set(lines[0]), {'ts', 'lvl', 'mod', 'thr', 'msg'})
+
+        events = list(query(self.tmp, level='warning'))
+        self.assertEqual([e['mod'] for e in events], ['pressure'])
+        events = list(query(
+            self.tmp, module='analog',
+            since=datetime.now() - timedelta(minutes=1)))
+        self.assertEqual(len(events), 2)
+        event, = query(self.tmp, contains='sample 2')
+        self.assertEqual(event['lvl'], 'DEBUG')
+
@@ -0,0 +1,193 @@
+"""Test the fleet aggregator against stub daemons on localhost ports."""
+
+import json
+import time
+import unittest
+from unittest import mock
+from threading import Thread
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from hydropi.config import config
+from hydropi.server.fleet import Fleet, Node
+from hydropi.server.handlers import generic
+from hydropi.server.http import routes, server
+from hydropi.server.http.exceptions import Http400, Http401
+
+START = datetime.fromisoformat('2024-01-10T12:00:00+10:00')
+
+
+class StubNode:
+    """Serve canned daemon responses from a background thread."""
+
+    def __init__(self, name, offset_minutes=0, delay=0):
+        """Create node with datalog rows every 10 minutes from START."""
+        self.name = name
+        self.delay = delay
+        self.requests = []
+        self.config = {}
+        self.rows = [
+            {
+                'datetime': (
+                    START + timedelta(minutes=offset_minutes + 10 * i)
+                ).isoformat(),
+                'ec': i,
+            }
+            for i in range(3)
+        ]
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                time.sleep(stub.delay)
+                if self.path == '/':
+                    self.reply({'text': 'NORMAL', 'node': stub.name})
+                else:
+                    self.reply(stub.rows)
+
+            def do_POST(self):
+                length = int(self.headers['Content-Length'])
+                stub.config.update(json.loads(self.rfile.read(length)))
+                self.reply(stub.config)
+
+            def reply(self, data):
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.node = Node(name, port=self.httpd.server_address[1])
+
+    def stop(self):
+        """Stop serving."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FleetTestCase(unittest.TestCase):
+    """Query stub nodes concurrently with timeouts and caching."""
+
+    def setUp(self):
+        """Start two stub nodes with interleaved datalogs."""
+        self.stubs = [StubNode('a'), StubNode('b', offset_minutes=5)]
+        self.fleet = Fleet([s.node for s in self.stubs])
+        self.fleet.TIMEOUT_SECONDS = (0.2, 0.2)
+
+    def tearDown(self):
+        """Stop stub nodes."""
+        for stub in self.stubs:
+            stub.stop()
+
+    def test_status_cached(self):
+        """Status of each node is fetched once per CACHE_SECONDS."""
+        for i in range(3):
+            fleet = self.fleet.status()
+        self.assertEqual(fleet['a']['status']['node'], 'a')
+        self.assertEqual(fleet['b']['status']['node'], 'b')
+        self.assertEqual([len(s.requests) for s in self.stubs], [1, 1])
+
+    def test_slow_node_times_out(self):
+        """A slow node doesn't hold up the others beyond its timeout."""
+        self.fleet.status()
+        self.fleet._cache.clear()
+        self.fleet._cache['b'] = {
+            'status': {'node': 'b'}, 'fetched': time.monotonic(), 'expires': 0}
+        self.stubs[1].delay = 1.5
+        started = time.monotonic()
+        fleet = self.fleet.status()
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertIsNone(fleet['a']['error'])
+        # Last known status is reported with the error
+        self.assertEqual(fleet['b']['status'], {'node': 'b'})
+        self.assertIn('timed out', fleet['b']['error'].lower())
+
+    def test_offline_node(self):
+        """An offline node is reported with an error."""
+        self.stubs[1].stop()
+        fleet = self.fleet.status()
+        self.assertIsNone(fleet['b']['status'])
+        self.assertIsNotNone(fleet['b']['error'])
+        self.stubs[1] = StubNode('b')
+
+    def test_datalog_merged(self):
+        """Datalog rows of all nodes are merged in time order."""
+        datalog = self.fleet.datalog(since=START, limit=10)
+        self.assertEqual(
+            [(r['node'], r['ec']) for r in datalog['rows']],
+            [('a', 0), ('b', 0), ('a', 1), ('b', 1), ('a', 2), ('b', 2)])
+        self.assertEqual(
+            self.stubs[0].requests[-1],
+            '/datalog?since=2024-01-10T12%3A00%3A00%2B10%3A00&limit=10')
+
+    def test_datalog_bucketed(self):
+        """Rows are grouped by time across nodes."""
+        rows = self.fleet.datalog(bucket_minutes=10)['rows']
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['datetime'], START.isoformat())
+        self.assertEqual(sorted(rows[0]['nodes']), ['a', 'b'])
+
+    def test_set_config(self):
+        """Config changes are sent to every node."""
+        errors = self.fleet.set_config({'MIST_INTERVAL_MINUTES': 4})
+        self.assertEqual(errors, {'a': None, 'b': None})
+        for stub in self.stubs:
+            self.assertEqual(stub.config, {'MIST_INTERVAL_MINUTES': 4})
+
+
+class DaemonRoutesTestCase(unittest.TestCase):
+    """Daemon routes take query params and require a token for changes."""
+
+    def setUp(self):
+        """Set a daemon token."""
+        config.yml['DAEMON_HTTP_TOKEN'] = 'secret'
+
+    def tearDown(self):
+        """Remove daemon token."""
+        del config.yml['DAEMON_HTTP_TOKEN']
+
+    def test_query_params(self):
+        """Query params are split from the routed path."""
+        request = routes.Request('/datalog?since=2024-01-10&limit=5')
+        self.assertEqual(request.path, '/datalog')
+        self.assertEqual(request.params, {'since': '2024-01-10', 'limit': '5'})
+
+    def test_token_required(self):
+        """Changes without the daemon token are refused."""
+        with self.assertRaises(Http401):
+            routes.resolve('POST', '/config', {})
+        with self.assertRaises(Http401):
+            routes.resolve(
+                'POST', '/config', {}, {'authorization': 'Bearer wrong'})
+
+    def test_limit_clamped(self):
+        """Datalog limit is capped, and must be positive."""
+        with mock.patch.object(
+                generic, 'get_datalog', return_value=[]) as get_datalog:
+            routes.resolve('GET', '/datalog?limit=1000000')
+            get_datalog.assert_called_with(None, generic.DATALOG_LIMIT)
+            routes.resolve('GET', '/datalog?limit=5')
+            get_datalog.assert_called_with(None, 5)
+        for limit in ('-1', '0', 'many'):
+            with self.assertRaises(Http400):
+                routes.resolve('GET', f'/datalog?limit={limit}')
+
+    def test_network_requires_token(self):
+        """The daemon won't listen on the network without a token."""
+        self.assertTrue(server.is_loopback('127.0.0.1'))
+        self.assertTrue(server.is_loopback('localhost'))
+        self.assertFalse(server.is_loopback('0.0.0.0'))
+        self.assertFalse(server.is_loopback('192.168.1.20'))
+        del config.yml['DAEMON_HTTP_TOKEN']
+        try:
+            with self.assertRaises(ValueError):
+                server.listen('0.0.0.0', 0)
+        finally:
+            config.yml['DAEMON_HTTP_TOKEN'] = 'secret'
@@ -0,0 +1,101 @@
+"""Test OpenMetrics exposition."""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from hydropi.instrument import metrics
+
+RECORD_AND_SAVE = """
+import sys
+from hydropi.instrument import metrics
+metrics.ACTUATOR_ACTIVATIONS.labels(17, 'MistController').inc(4)
+metrics.save_snapshot(sys.argv[1])
+"""
+
+
+class MetricsTestCase(unittest.TestCase):
+    """Render metric families as OpenMetrics text."""
+
+    def test_counter(self):
+        """Counters are suffixed _total with one sample per label set."""
+        c = metrics.counter(
+            'test_relay_switches', "Relay switches.", labels=('pin',))
+        c.labels(14).inc()
+        c.labels(14).inc(2)
+        c.labels(15).inc()
+        text = metrics.exposition()
+        self.assertIn('# TYPE test_relay_switches counter\n', text)
+        self.assertIn('test_relay_switches_total{pin="14"} 3\n', text)
+        self.assertIn('test_relay_switches_total{pin="15"} 1\n', text)
+        self.assertTrue(text.endswith('# EOF\n'))
+
+    def test_histogram(self):
+        """Histogram buckets are cumulative and end with +Inf."""
+        h = metrics.histogram('test_latency_seconds', "Latency.", (0.1, 1))
+        for value in (0.05, 0.5, 0.7, 5):
+            h.labels().observe(value)
+        text = metrics.exposition()
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('test_latency_seconds_bucket{le="1.0"} 3\n', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 4\n', text)
+        self.assertIn('test_latency_seconds_count 4\n', text)
+        self.assertIn('test_latency_seconds_sum 6.25\n', text)
+
+    def test_collected_gauge(self):
+        """Gauges with a collect function are evaluated at render time."""
+        depth = [3]
+        metrics.gauge(
+            'test_queue_depth', "Queue depth.",
+            collect=lambda: {(): depth[0]})
+        self.assertIn('test_queue_depth 3\n', metrics.exposition())
+        depth[0] = 0
+        self.assertIn('test_queue_depth 0\n', metrics.exposition())
+
+    def test_label_escaping(self):
+        """Quotes in label values are escaped."""
+        g = metrics.gauge('test_labelled', "Labelled.", labels=('name',))
+        g.labels('say "hi"').set(1)
+        self.assertIn(
+            'test_labelled{name="say \\"hi\\""} 1\n',
+            metrics.exposition())
+
+
+class SnapshotTestCase(unittest.TestCase):
+    """Serve metrics recorded by another process."""
+
+    def setUp(self):
+        """Create snapshot directory."""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, metrics.SNAPSHOT_FILENAME)
+
+    def tearDown(self):
+        """Remove snapshot directory."""
+        shutil.rmtree(self.tmp)
+
+    def test_no_snapshot(self):
+        """Local metrics are served until a snapshot has been saved."""
+        self.assertIsNone(metrics.load_snapshot(self.path))
+        self.assertNotIn(
+            'hydropi_metrics_snapshot_age_seconds', metrics.exposition())
+
+    def test_cross_process(self):
+        """Metrics saved by the control process replace local families."""
+        metrics.ACTUATOR_ACTIVATIONS.labels(17, 'MistController').inc()
+        subprocess.run(
+            [sys.executable, '-c', RECORD_AND_SAVE, self.path], check=True)
+        text = metrics.exposition(metrics.load_snapshot(self.path))
+        self.assertIn(
+            'hydropi_actuator_activations_total'
+            '{pin="17",controller="MistController"} 4\n', text)
+        self.assertEqual(
+            text.count('# TYPE hydropi_actuator_activations counter'), 1)
+        self.assertIn('hydropi_metrics_snapshot_age_seconds ', text)
+        # Families only known to this process are still served
+        metrics.counter('test_local_only', "Local.")
+        text = metrics.exposition(metrics.load_snapshot(self.path))
+        self.assertIn('test_local_only_total 0\n', text)
+        self.assertTrue(text.endswith('# EOF\n'))
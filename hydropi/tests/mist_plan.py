@@ -0,0 +1,164 @@
+"""Test the mist timetable planner."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.fakes import SkipClock
+from hydropi.process import mist_plan
+from hydropi.process.mist_plan import MistPlanner, MistScheduler
+from hydropi.process.check.pressure_forecast import PressureForecast
+
+
+class MistConfigTestCase(unittest.TestCase):
+    """Set mist config at 10:00."""
+
+    def setUp(self):
+        """Set mist config and skip clock to 10:00."""
+        self.tmp = tempfile.mkdtemp()
+        self.original_clock = clock.get_clock()
+        clock.set_clock(SkipClock())
+        now = clock.now()
+        clock.sleep((
+            datetime.combine(now.date() + timedelta(days=1),
+                             datetime.min.time()).replace(hour=10)
+            - now).total_seconds())
+        self.original_config = dict(config.yml)
+        config.yml.update({
+            'MIST_INTERVAL_MINUTES': 10,
+            'MIST_INTERVAL_NIGHT_MINUTES': 60,
+            'MIST_DURATION_SECONDS': 5,
+            'MIST_DURATION_NIGHT_SECONDS': 3,
+            'MIST_BUMP_FROM_TEMPERATURE_C': 25,
+            'MIST_BUMP_PER_DEGREE': 0.04,
+            'QUIET_TIME_START': '20:00',
+            'QUIET_TIME_END': '06:00',
+        })
+
+    def tearDown(self):
+        """Restore config and clock."""
+        config.yml.clear()
+        config.yml.update(self.original_config)
+        clock.set_clock(self.original_clock)
+        shutil.rmtree(self.tmp)
+
+
+class MistPlannerTestCase(MistConfigTestCase):
+    """Plan mist events from config and smoothed temperature."""
+
+    def setUp(self):
+        """Create planner at 10:00."""
+        super().setUp()
+        self.planner = MistPlanner(os.path.join(self.tmp, 'plan.json'))
+
+    def intervals(self):
+        """Return seconds between the first few events."""
+        starts = self.planner.starts
+        return [round(b - a) for a, b in zip(starts[:5], starts[1:6])]
+
+    def test_day_and_night(self):
+        """Events follow day and quiet time interval and duration."""
+        start, duration = self.planner.next_event()
+        self.assertAlmostEqual(start, clock.timestamp(), places=1)
+        self.assertEqual(duration, 5)
+        self.assertEqual(self.intervals(), [600] * 5)
+        events = self.planner.upcoming()
+        night = [e for e in events if e['duration_seconds'] == 3]
+        # Hourly from 20:00 to 05:00
+        self.assertEqual(len(night), 10)
+        self.assertEqual(night[0]['start'][11:16], '20:00')
+        self.assertEqual(night[-1]['start'][11:16], '05:00')
+
+    def test_temperature_replans(self):
+        """Warm temperature shortens intervals after the next event."""
+        first, duration = self.planner.next_event()
+        self.planner.record_temperature(30)
+        self.assertEqual(self.planner.starts[0], first)
+        self.assertEqual(self.intervals()[0], round(600 * 0.96 ** 5))
+        # Small moves are smoothed and don't re-plan
+        self.planner.record_temperature(30.4)
+        self.assertEqual(self.planner.planned_temperature, 30)
+
+    def test_delivered_event_removed(self):
+        """The loop advances once an event is done."""
+        first, duration = self.planner.next_event()
+        self.planner.done()
+        clock.sleep(600)
+        start, duration = self.planner.next_event()
+        self.assertAlmostEqual(start, first + 600)
+
+    def test_config_change_replans(self):
+        """Changed mist config is picked up after REFRESH_SECONDS."""
+        self.planner.next_event()
+        config.yml['MIST_INTERVAL_MINUTES'] = 5
+        clock.sleep(self.planner.REFRESH_SECONDS)
+        self.planner.next_event()
+        self.assertEqual(self.intervals()[0], 300)
+
+
+class MistSchedulerTestCase(MistConfigTestCase):
+    """Stagger mist zones so that few valves are open at once."""
+
+    def setUp(self):
+        """Configure four zones, one with its own duration."""
+        super().setUp()
+        self.original_plan_dir = mist_plan.PLAN_DIR
+        mist_plan.PLAN_DIR = self.tmp
+        config.yml['MIST_ZONES'] = [
+            {'name': 'bed1', 'pin': 15},
+            {'name': 'bed2', 'pin': 24, 'duration_seconds': 8},
+            {'name': 'bed3', 'pin': 1},
+            {'name': 'bed4', 'pin': 7},
+        ]
+
+    def tearDown(self):
+        """Restore plan directory."""
+        mist_plan.PLAN_DIR = self.original_plan_dir
+        super().tearDown()
+
+    def dispatch(self, n):
+        """Return (zone name, seconds from now, duration) of <n> events."""
+        scheduler = MistScheduler()
+        now = clock.timestamp()
+        events = []
+        for i in range(n):
+            zone, start, duration = scheduler.next_event()
+            scheduler.done(zone)
+            events.append((zone['name'], round(start - now), duration))
+        return events
+
+    def test_staggered(self):
+        """Zones are offset evenly across the interval, one at a time."""
+        self.assertEqual(self.dispatch(5), [
+            ('bed1', 0, 5),
+            ('bed2', 150, 8),
+            ('bed3', 300, 5),
+            ('bed4', 450, 5),
+            ('bed1', 600, 5),
+        ])
+
+    def test_max_open_valves(self):
+        """Zones are grouped by the number of valves allowed open."""
+        config.yml['MIST_MAX_OPEN_VALVES'] = 2
+        starts = [start for zone, start, duration in self.dispatch(4)]
+        self.assertEqual(starts, [0, 0, 300, 300])
+
+    def test_saved_per_zone(self):
+        """Each zone timetable is saved, and removed zones are cleared."""
+        self.dispatch(1)
+        self.assertEqual(
+            sorted(mist_plan.load()), ['bed1', 'bed2', 'bed3', 'bed4'])
+        config.yml['MIST_ZONES'] = config.yml['MIST_ZONES'][:1]
+        self.dispatch(1)
+        self.assertEqual(sorted(mist_plan.load()), ['bed1'])
+
+    def test_forecast_counts_zones(self):
+        """Forecast pressure consumption includes every zone."""
+        forecast = PressureForecast(os.path.join(self.tmp, 'forecast.json'))
+        self.assertEqual(
+            forecast.mist_seconds_per_hour(False), 3 * 30 + 48)
+        self.assertEqual(forecast.mist_seconds_per_hour(True), 4 * 3)
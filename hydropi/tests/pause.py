@@ -0,0 +1,91 @@
+"""Test pause control through the shared flag file."""
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from threading import Timer
+
+from hydropi.process import pause
+from hydropi.process.pause import PauseControl
+
+
+class PauseControlTestCase(unittest.TestCase):
+    """Waits and pulses react to the flag file as soon as it changes."""
+
+    def setUp(self):
+        """Create flag directory."""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'pause.flag')
+        self.control = PauseControl(self.path)
+
+    def tearDown(self):
+        """Remove flag directory."""
+        shutil.rmtree(self.tmp)
+
+    def touch_later(self, seconds=0.2):
+        """Create the flag file from another thread after <seconds>."""
+        def touch():
+            with open(self.path, 'w') as f:
+                f.write("Paused by another process\n")
+        Timer(seconds, touch).start()
+
+    def assert_woken(self, control):
+        """Assert that a long wait returns early when the flag appears."""
+        self.touch_later()
+        started = time.monotonic()
+        self.assertTrue(control.wait(10))
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(control.paused())
+
+    def test_wait_times_out(self):
+        """Wait returns False if the state doesn't change."""
+        self.assertFalse(self.control.wait(0.1))
+
+    def test_wait_woken_by_flag(self):
+        """A flag file written by another process interrupts a wait."""
+        self.assert_woken(self.control)
+
+    def test_wait_woken_by_set(self):
+        """Clearing pause interrupts a wait."""
+        self.control.set(True)
+        Timer(0.2, self.control.set, (False,)).start()
+        self.assertTrue(self.control.wait(10))
+        self.assertFalse(self.control.paused())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_hold_cut_short(self):
+        """A pulse is cut short when pause is set."""
+        self.touch_later()
+        started = time.monotonic()
+        self.assertFalse(self.control.hold(10))
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_hold_while_paused(self):
+        """A pulse started while paused runs to completion."""
+        self.control.set(True)
+        self.assertTrue(self.control.hold(0.1))
+
+    def test_polling_fallback(self):
+        """Without inotify the flag file is polled."""
+        with mock.patch.object(
+                self.control, '_inotify_fd', side_effect=OSError("no")):
+            self.assert_woken(self.control)
+
+    def test_read_error_falls_back_to_polling(self):
+        """Pause keeps working if reading inotify events fails."""
+        with mock.patch.object(
+                self.control, '_read_events', side_effect=OSError("bad")):
+            with self.assertLogs('hydropi', 'ERROR'):
+                self.control.paused()
+                time.sleep(0.1)
+            self.assert_woken(self.control)
+
+    def test_module_wait(self):
+        """Module functions use the shared control."""
+        with mock.patch.object(pause, 'control', self.control):
+            self.touch_later()
+            self.assertTrue(pause.wait(10))
+            self.assertTrue(pause.paused())
@@ -0,0 +1,94 @@
+"""Test the pressure tank consumption forecast."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from hydropi import clock
+from hydropi.fakes import SkipClock
+from hydropi.process.check.time import QuietSchedule
+from hydropi.process.check.pressure_forecast import PressureForecast
+
+# Sample config: 36 mist seconds per hour by day, 3 per hour in quiet time,
+# MIN_PRESSURE_PSI 100 so refills are due below 105 PSI.
+REFILL_SECONDS = 60
+
+
+def at(hhmm):
+    """Return datetime for HH:MM on a fixed day."""
+    return datetime.combine(
+        datetime(2024, 1, 10),
+        datetime.strptime(hhmm, '%H:%M').time())
+
+
+class PressureForecastTestCase(unittest.TestCase):
+    """Learn consumption and plan refills around quiet time."""
+
+    def setUp(self):
+        """Create forecast in a temporary calibration dir."""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'pressure', 'consumption.json')
+        self.forecast = PressureForecast(
+            self.path,
+            schedule=QuietSchedule('20:00', '07:00'))
+        self.lead = timedelta(
+            seconds=REFILL_SECONDS + self.forecast.LEAD_MARGIN_SECONDS)
+        self.original_clock = clock.get_clock()
+        clock.set_clock(SkipClock())
+
+    def tearDown(self):
+        """Remove calibration dir and restore clock."""
+        clock.set_clock(self.original_clock)
+        shutil.rmtree(self.tmp)
+
+    def test_learn_mist_consumption(self):
+        """Rate converges on PSI drop per mist second and persists."""
+        psi = 130
+        self.forecast.record_reading(psi)
+        for i in range(60):
+            self.forecast.record_mist(6)
+            clock.sleep(600)
+            psi -= 6 * 0.8
+            self.forecast.record_reading(psi)
+            if psi < 105:
+                self.forecast.record_refill()
+                psi = 130
+                self.forecast.record_reading(psi)
+        self.assertAlmostEqual(
+            self.forecast.psi_per_mist_second, 0.8, places=2)
+        reloaded = PressureForecast(self.path)
+        self.assertAlmostEqual(
+            reloaded.psi_per_mist_second,
+            self.forecast.psi_per_mist_second)
+
+    def test_learn_leak(self):
+        """Pressure drop without misting is learned as a leak rate."""
+        self.forecast.record_reading(130)
+        for psi in range(129, 100, -1):
+            clock.sleep(3600)
+            self.forecast.record_reading(psi)
+        self.assertAlmostEqual(self.forecast.psi_per_hour, 1, places=1)
+
+    def test_refill_before_daytime_low(self):
+        """Refill starts ahead of the predicted low threshold."""
+        # 18 PSI per hour -> 24 PSI to lose takes 80 minutes
+        due = self.forecast.next_refill(129, at('12:00'), REFILL_SECONDS)
+        self.assertEqual(due, at('13:20') - self.lead)
+
+    def test_refill_before_quiet_time(self):
+        """Refill finishes just before quiet time if the night runs low."""
+        due = self.forecast.next_refill(125, at('19:30'), REFILL_SECONDS)
+        self.assertEqual(due, at('20:00') - self.lead)
+
+    def test_no_refill_if_pressure_lasts_the_night(self):
+        """No refill is planned while pressure lasts until quiet time end."""
+        self.forecast.psi_per_mist_second = 0.3
+        due = self.forecast.next_refill(129, at('19:55'), REFILL_SECONDS)
+        self.assertIsNone(due)
+
+    def test_no_refill_during_quiet_time(self):
+        """The pump is never scheduled during quiet time."""
+        self.assertIsNone(
+            self.forecast.next_refill(101, at('23:00'), REFILL_SECONDS))
@@ -0,0 +1,65 @@
+"""Test the learned pressure pump curve."""
+
+import os
+import math
+import shutil
+import tempfile
+import unittest
+
+from hydropi.interfaces.controllers.pressure import PumpCurve
+
+
+def simulate_pulse(psi, seconds, a=1.2, b=-0.006):
+    """Return pressure after pumping for <seconds> with rate = a + b * psi."""
+    return -a / b + (psi + a / b) * math.exp(b * seconds)
+
+
+class PumpCurveTestCase(unittest.TestCase):
+    """Fit pump curve from refill pulses and predict pulse durations."""
+
+    def setUp(self):
+        """Create curve in a temporary calibration dir."""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'pressure', 'pump_curve.json')
+        self.curve = PumpCurve(self.path)
+
+    def tearDown(self):
+        """Remove calibration dir."""
+        shutil.rmtree(self.tmp)
+
+    def test_no_prediction_without_data(self):
+        """Duration is unknown until enough pulses have been observed."""
+        self.assertIsNone(self.curve.duration(100, 130))
+        self.curve.observe(100, 130, 60)
+        self.assertIsNone(self.curve.duration(100, 130))
+
+    def test_constant_rate(self):
+        """Pulses from similar pressures give a constant fill rate."""
+        self.curve.observe(100, 130, 60)
+        self.curve.observe(101, 130, 58)
+        a, b = self.curve.coefficients()
+        self.assertEqual(b, 0)
+        self.assertAlmostEqual(self.curve.duration(100, 130), 60, delta=1)
+
+    def test_fit_curve(self):
+        """Pulses across a range of pressures fit the falling fill rate."""
+        for psi, seconds in ((60, 40), (80, 40), (100, 30), (110, 20)):
+            self.curve.observe(psi, simulate_pulse(psi, seconds), seconds)
+        a, b = self.curve.coefficients()
+        self.assertLess(b, 0)
+        expected = 45
+        target = simulate_pulse(90, expected)
+        self.assertAlmostEqual(
+            self.curve.duration(90, target), expected, delta=1.5)
+
+    def test_persist(self):
+        """Fit is reloaded from file."""
+        self.curve.observe(100, 130, 60)
+        self.curve.observe(100, 130, 60)
+        curve = PumpCurve(self.path)
+        self.assertEqual(curve.coefficients(), self.curve.coefficients())
+
+    def test_ignore_failed_pulse(self):
+        """Pulses that didn't raise pressure are not used."""
+        self.curve.observe(100, 99, 30)
+        self.assertEqual(self.curve.sums['n'], 0)
@@ -0,0 +1,52 @@
+"""Test the quiet time schedule."""
+
+import unittest
+from datetime import datetime
+
+from hydropi.process.check.time import QuietSchedule
+
+
+class QuietScheduleTestCase(unittest.TestCase):
+    """Determine quiet time and transitions from fixed windows."""
+
+    def test_window_across_midnight(self):
+        """Window from evening to morning includes midnight."""
+        qs = QuietSchedule('20:00', '07:00')
+        self.assertTrue(qs.is_quiet_at(datetime(2022, 1, 1, 23, 0)))
+        self.assertTrue(qs.is_quiet_at(datetime(2022, 1, 1, 3, 0)))
+        self.assertTrue(qs.is_quiet_at(datetime(2022, 1, 1, 20, 0)))
+        self.assertFalse(qs.is_quiet_at(datetime(2022, 1, 1, 7, 0)))
+        self.assertFalse(qs.is_quiet_at(datetime(2022, 1, 1, 12, 0)))
+
+    def test_window_within_day(self):
+        """Window that doesn't cross midnight."""
+        qs = QuietSchedule('12:00', '14:30')
+        self.assertTrue(qs.is_quiet_at(datetime(2022, 1, 1, 13, 0)))
+        self.assertFalse(qs.is_quiet_at(datetime(2022, 1, 1, 14, 30)))
+        self.assertFalse(qs.is_quiet_at(datetime(2022, 1, 1, 23, 0)))
+
+    def test_next_transition(self):
+        """Next transition is the next start or end as appropriate."""
+        qs = QuietSchedule('20:00', '07:00')
+        self.assertEqual(
+            qs.next_transition_after(datetime(2022, 1, 1, 12, 0)),
+            datetime(2022, 1, 1, 20, 0))
+        self.assertEqual(
+            qs.next_transition_after(datetime(2022, 1, 1, 22, 0)),
+            datetime(2022, 1, 2, 7, 0))
+        self.assertEqual(
+            qs.next_transition_after(datetime(2022, 1, 2, 3, 0)),
+            datetime(2022, 1, 2, 7, 0))
+
+    def test_empty_window(self):
+        """Equal start and end means no quiet time."""
+        qs = QuietSchedule('07:00', '07:00')
+        self.assertFalse(qs.is_quiet_at(datetime(2022, 1, 1, 7, 0)))
+        self.assertIsNone(qs.next_transition_after(datetime(2022, 1, 1)))
+        self.assertFalse(qs.is_quiet())
+
+    def test_live_state_agrees_with_window(self):
+        """Cached state agrees with the window for the current time."""
+        qs = QuietSchedule('20:00', '07:00')
+        self.assertEqual(qs.is_quiet(), qs.is_quiet_at(datetime.now()))
+        self.assertLessEqual(qs.seconds_until_transition(), 24 * 3600)
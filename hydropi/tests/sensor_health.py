@@ -0,0 +1,171 @@
+"""Test streaming sensor health diagnostics."""
+
+import random
+import unittest
+
+from hydropi import clock
+from hydropi.config import STATUS
+from hydropi.fakes import SkipClock
+from hydropi.instrument.health import ChannelHealth, FLAT, RAIL, DRIFT
+from hydropi.interfaces.sensors.analog import AnalogInterface
+from hydropi.interfaces.sensors.depth import DepthSensor
+from hydropi.interfaces.sensors.pressure import PressureSensor
+
+
+class StuckSensor(AnalogInterface):
+    """Analog sensor returning a fixed number of volts."""
+
+    CHANNEL = 0
+    TEXT = 'test'
+    UNIT = ''
+    MIN_UNITS = 0
+    MAX_UNITS = 100
+    MIN_VOLTS = 0
+    MAX_VOLTS = 3.3
+    RANGE_LOWER = 40
+    RANGE_UPPER = 60
+    HEALTH_FLAT_SAMPLES = 20
+
+    def __init__(self):
+        """Create sensor stuck at 1.5 volts."""
+        self.volts = 1.5
+        self.samples = 0
+        super().__init__()
+        self.health.reset()
+
+    def get_value(self, as_volts=False):
+        """Return the stuck value."""
+        self.samples += 1
+        self.health.observe(round(self.volts * 1024 / 3.3), self.volts)
+        return self.volts
+
+
+class FaultySensor(StuckSensor):
+    """Analog sensor with a fault flagged."""
+
+    def read(self, *args, **kwargs):
+        """Return None, as for a faulty sensor."""
+        return None
+
+
+class ChannelHealthTestCase(unittest.TestCase):
+    """Detect flat-line, rail clipping and drift from raw samples."""
+
+    def setUp(self):
+        """Seed noise."""
+        random.seed(0)
+
+    def test_variance(self):
+        """Running variance matches the sample variance."""
+        health = ChannelHealth('test')
+        values = [random.gauss(2, 0.1) for i in range(100)]
+        for v in values:
+            health.observe(v)
+        mean = sum(values) / len(values)
+        variance = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+        self.assertAlmostEqual(health.mean, mean)
+        self.assertAlmostEqual(health.variance, variance)
+
+    def test_flat_line(self):
+        """A repeated raw value is flagged, and cleared when it changes."""
+        health = ChannelHealth('test', flat_samples=10)
+        for i in range(9):
+            health.observe(512)
+        self.assertFalse(health.faulty)
+        health.observe(512)
+        self.assertEqual(health.flags, {FLAT})
+        health.observe(513)
+        self.assertFalse(health.faulty)
+
+    def test_flat_line_seconds(self):
+        """With flat_seconds, a repeated value must also last that long."""
+        original_clock = clock.get_clock()
+        clock.set_clock(SkipClock())
+        try:
+            health = ChannelHealth('test', flat_samples=10, flat_seconds=60)
+            for i in range(20):
+                health.observe(21.5)
+            self.assertFalse(health.faulty)
+            clock.sleep(60)
+            health.observe(21.5)
+            self.assertEqual(health.flags, {FLAT})
+        finally:
+            clock.set_clock(original_clock)
+
+    def test_rail(self):
+        """Samples at the ADC rails are flagged."""
+        health = ChannelHealth('test', rails=(0, 1023), rail_samples=5)
+        for i in range(5):
+            health.observe(1023 - i % 2)
+        self.assertNotIn(RAIL, health.flags)
+        for i in range(5):
+            health.observe(1023)
+        self.assertIn(RAIL, health.flags)
+        health.observe(800)
+        self.assertNotIn(RAIL, health.flags)
+
+    def test_drift(self):
+        """A slow move outside the expected range is flagged."""
+        health = ChannelHealth('test', expected=(1.0, 2.0))
+        for i in range(health.DRIFT_MIN_SAMPLES):
+            health.observe(random.gauss(1.5, 0.05))
+        self.assertFalse(health.faulty)
+        for i in range(500):
+            health.observe(random.gauss(2.5, 0.05))
+        self.assertEqual(health.flags, {DRIFT})
+        # A single spike doesn't clear the fault
+        health.observe(1.5)
+        self.assertIn(DRIFT, health.flags)
+
+
+class FaultySensorTestCase(unittest.TestCase):
+    """Faulty sensors are not acted on, and are probed for recovery."""
+
+    def setUp(self):
+        """Skip sleeps between samples."""
+        self.original_clock = clock.get_clock()
+        clock.set_clock(SkipClock())
+
+    def tearDown(self):
+        """Restore clock."""
+        clock.set_clock(self.original_clock)
+
+    def test_faulty_read_skipped(self):
+        """A flat-lined sensor reads None until a probe shows recovery."""
+        sensor = StuckSensor()
+        self.assertIsNotNone(sensor.read(n=10))
+        self.assertIsNone(sensor.read(n=10))
+        self.assertTrue(sensor.health.faulty)
+
+        # Probed once after the fault, then not sampled until next probe
+        sensor.samples = 0
+        self.assertIsNone(sensor.read(n=10))
+        self.assertEqual(sensor.samples, 10)
+        self.assertIsNone(sensor.read(n=10))
+        self.assertEqual(sensor.samples, 10)
+
+        clock.sleep(sensor.HEALTH_PROBE_SECONDS)
+        sensor.volts = 1.6
+        self.assertIsNotNone(sensor.read(n=10))
+        self.assertFalse(sensor.health.faulty)
+
+    def test_faulty_status(self):
+        """Status of a faulty sensor is DANGER with no value."""
+        status = FaultySensor.get_status()
+        self.assertEqual(status['status'], STATUS.DANGER)
+        self.assertIsNone(status['value'])
+        self.assertIsNone(status['percent'])
+
+    def test_faulty_pressure_channel(self):
+        """Depth is read without the pressure tank if pressure is faulty."""
+        pressure_health = PressureSensor().health
+        pressure_health.flags.add(RAIL)
+        pressure_health.probed = clock.monotonic()
+        try:
+            self.assertIsNone(PressureSensor().get_tank_volume())
+            with self.assertLogs('hydropi', 'WARNING') as logs:
+                litres = DepthSensor().read()
+            self.assertIsInstance(litres, float)
+            self.assertIn('excludes pressure tank', '\n'.join(logs.output))
+        finally:
+            pressure_health.reset()
@@ -0,0 +1,24 @@
+"""Test sampled read tracing."""
+
+import unittest
+
+from hydropi.config import config
+from hydropi.instrument.trace import Tracer
+
+
+class TracerConfigTestCase(unittest.TestCase):
+    """TRACE_SAMPLES may be absent from an existing config.yml."""
+
+    def setUp(self):
+        """Remove TRACE_SAMPLES."""
+        self.original_config = dict(config.yml)
+        config.yml.pop('TRACE_SAMPLES', None)
+
+    def tearDown(self):
+        """Restore config."""
+        config.yml.clear()
+        config.yml.update(self.original_config)
+
+    def test_tracer_disabled(self):
+        """Sample tracing is off without TRACE_SAMPLES."""
+        self.assertFalse(Tracer('test').enabled)
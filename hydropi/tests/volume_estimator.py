@@ -0,0 +1,74 @@
+"""Test the reservoir and pressure tank volume estimator."""
+
+import unittest
+
+from hydropi import clock
+from hydropi.config import config
+from hydropi.fakes import SkipClock
+from hydropi.instrument import metrics
+from hydropi.process.volume import VolumeEstimator, RESERVOIR, PRESSURE_TANK
+
+
+def run_actuator(pin, seconds):
+    """Record on-time for an output pin, as a controller would."""
+    metrics.ACTUATOR_ON_SECONDS.labels(pin, 'TestController').inc(seconds)
+    clock.sleep(seconds)
+
+
+class VolumeEstimatorTestCase(unittest.TestCase):
+    """Predict volume from actuator flows and correct with readings."""
+
+    def setUp(self):
+        """Create estimator from initial readings."""
+        self.original_clock = clock.get_clock()
+        clock.set_clock(SkipClock())
+        self.estimator = VolumeEstimator()
+        self.estimator.update_reservoir(10)
+        self.estimator.update_pressure_tank(8)
+
+    def tearDown(self):
+        """Restore clock."""
+        clock.set_clock(self.original_clock)
+
+    def test_predict_from_flows(self):
+        """Pump and mist flows move volume between tanks."""
+        e = self.estimator
+        run_actuator(config.PIN_PRESSURE_PUMP, 100)
+        e.predict()
+        self.assertAlmostEqual(e.pressure_tank(), 8 + 100 * e.PUMP_FLOW_LPS)
+        self.assertAlmostEqual(
+            e.reservoir(), 10 - 100 * e.PUMP_FLOW_LPS, places=2)
+
+        run_actuator(config.PIN_MIST_VALVE, 20)
+        e.predict()
+        mist_l = 20 * e.MIST_FLOW_LPS
+        self.assertAlmostEqual(
+            e.pressure_tank(), 8 + 100 * e.PUMP_FLOW_LPS - mist_l)
+        self.assertLess(e.total(), 18)
+
+    def test_uncertainty_grows_without_readings(self):
+        """Flows make the estimate less certain until corrected."""
+        e = self.estimator
+        self.assertTrue(e.needs_reservoir_reading())
+        e.update_reservoir(10)  # Second reading is within tolerance
+        self.assertFalse(e.needs_reservoir_reading())
+        before = e.std(RESERVOIR)
+        for i in range(20):
+            run_actuator(config.PIN_MIST_VALVE, 3)
+            run_actuator(config.PIN_PRESSURE_PUMP, 30)
+        e.predict()
+        self.assertGreater(e.std(RESERVOIR), before)
+        self.assertTrue(e.needs_reservoir_reading())
+        e.update_reservoir(e.reservoir())
+        self.assertLess(e.std(RESERVOIR), e.DEPTH_NOISE_L)
+
+    def test_pressure_reading_corrects_reservoir(self):
+        """Transfers correlate the tanks, so one reading informs both."""
+        e = self.estimator
+        run_actuator(config.PIN_PRESSURE_PUMP, 100)
+        e.predict()
+        reservoir = e.reservoir()
+        # Pump delivered less than predicted
+        e.update_pressure_tank(e.pressure_tank() - 1)
+        self.assertGreater(e.reservoir(), reservoir)
+        self.assertLess(e.std(PRESSURE_TANK), e.PRESSURE_TANK_NOISE_L)
@@ -0,0 +1,53 @@
+"""Test the WeatherAPI client against a local stub server."""
+
+import unittest
+
+from hydropi.config import config
+from hydropi.interfaces.utils import WeatherAPI
+from hydropi.interfaces.utils.weather_stub import WeatherStubServer
+
+
+class WeatherAPITestCase(unittest.TestCase):
+    """Fetch and cache ambient pressure."""
+
+    def setUp(self):
+        """Point the client at a fresh stub server."""
+        self.stub = WeatherStubServer(pressure_mb=1009.5)
+        self.base_url = WeatherAPI.BASE_URL
+        WeatherAPI.BASE_URL = self.stub.start()
+        WeatherAPI.stub = self.stub
+        WeatherAPI._cache = {}
+
+    def tearDown(self):
+        """Restore client and stop the stub server."""
+        self.stub.stop()
+        WeatherAPI.BASE_URL = self.base_url
+        WeatherAPI.stub = None
+        WeatherAPI._cache = {}
+
+    def test_can_read_pressure(self):
+        """Client returns pressure from the API."""
+        self.assertEqual(WeatherAPI().get_ambient_pressure_hpa(), 1009.5)
+
+    def test_will_cache_between_instances(self):
+        """Repeat reads within the update interval don't hit the API."""
+        for i in range(3):
+            WeatherAPI().get_ambient_pressure_hpa()
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_will_use_stale_reading_when_offline(self):
+        """A cached reading is returned if the API can't be reached."""
+        WeatherAPI().get_ambient_pressure_hpa()
+        WeatherAPI._cache['expires'] = 0
+        self.stub.stop()
+        self.assertEqual(WeatherAPI().get_ambient_pressure_hpa(), 1009.5)
+
+    def test_stub_key_optional(self):
+        """Config without WEATHER_API_STUB reads from the API as usual."""
+        original_config = dict(config.yml)
+        config.yml.pop('WEATHER_API_STUB', None)
+        try:
+            self.assertEqual(WeatherAPI().get_ambient_pressure_hpa(), 1009.5)
+        finally:
+            config.yml.clear()
+            config.yml.update(original_config)
@@ -2,6 +2,8 @@
 
 """Monitor hydroponics system to maintain state and deliver nutrients."""
 
+from hydropi.instrument import startup
+
 try:
     import RPi.GPIO as io
 except ModuleNotFoundError:
@@ -13,10 +15,10 @@ from threading import Thread
 from argparse import ArgumentParser
 from importlib import import_module
 
+with startup.stage('import config'):
+    from hydropi.config import config
 from hydropi import interfaces
-from hydropi.config import config
-from hydropi.process.delivery import mist
-from hydropi.process.maintenance import sweep
+from hydropi.instrument import metrics
 
 import signal
 signal.signal(signal.SIGINT, signal.default_int_handler)
@@ -24,9 +26,19 @@ signal.signal(signal.SIGINT, signal.default_int_handler)
 logger = logging.getLogger('hydropi')
 
 
-def main():
+def main(profile=False):
     """Monitor and maintain the system."""
+    with startup.stage('import process'):
+        from hydropi.process import datalog
+        from hydropi.process.delivery import mist
+        from hydropi.process.maintenance import sweep
+        from hydropi.notifications import telegram
+    if profile:
+        logger.info("Startup profile:\n" + startup.report())
     try:
+        telegram.start()
+        Thread(target=datalog.run, daemon=True).start()
+        Thread(target=metrics.run_snapshots, daemon=True).start()
         Thread(target=mist).start()
         sweep()
     finally:
@@ -45,15 +57,25 @@ def get_args():
         type=str,
         help="Test an interface class",
     )
+    ap.add_argument(
+        '--startup-profile',
+        dest='startup_profile',
+        action='store_true',
+        help="Report time and imports of each startup stage",
+    )
     return ap.parse_args()
 
 
-def test(component):
+def test(component, profile=False):
     """Test the given interface class."""
     module, classname = component.rsplit('.', 1)
-    m = import_module(module)
+    with startup.stage(f'import {module}'):
+        m = import_module(module)
     C = getattr(m, classname)
-    obj = C()
+    with startup.stage(f'init {classname}'):
+        obj = C()
+    if profile:
+        print(startup.report())
     if not hasattr(obj, 'test'):
         raise AttributeError(
             f"Failed: Class '{component}' has no test method."
@@ -65,6 +87,6 @@ def test(component):
 if __name__ == '__main__':
     args = get_args()
     if args.test_component:
-        test(args.test_component)
+        test(args.test_component, profile=args.startup_profile)
     else:
-        main()
+        main(profile=args.startup_profile)
@@ -16,16 +16,19 @@ setuptools.setup(
     install_requires=requirements,
     packages=[
         'hydropi',
+        'hydropi.benchmarks',
         'hydropi.config',
         'hydropi.interfaces',
         'hydropi.interfaces.sensors',
         'hydropi.interfaces.controllers',
         'hydropi.interfaces.utils',
+        'hydropi.instrument',
         'hydropi.notifications',
         'hydropi.process',
         'hydropi.process.check',
         'hydropi.server',
         'hydropi.server.handlers',
+        'hydropi.simulation',
     ],
     zip_safe=True,
 )